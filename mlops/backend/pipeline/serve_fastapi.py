@@ -1,4 +1,5 @@
 import os
+import sys
 import joblib
 import numpy as np
 import pandas as pd
@@ -11,6 +12,14 @@ from pydantic import BaseModel, Field
 import logging
 from dotenv import load_dotenv
 
+#Dimension calendario y especificacion de features compartidas con el entrenamiento
+#(pipeline/calendario.py y pipeline/features.py). En la imagen Docker se copian junto
+#a este fichero; en local se usan las de mlops/pipeline
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'pipeline'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from calendario import calendario_fechas
+from features import calcular_features
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -67,35 +76,12 @@ class PredictionResponse(BaseModel):
     features: Optional[Dict[str, Dict[str, float]]] = None
 
 # Funciones de generación de características
-def generate_time_features(date: datetime) -> Dict[str, float]:
-    features = {}
-    day_of_year = date.timetuple().tm_yday
-    features['dia_del_anio_sin'] = np.sin(2 * np.pi * day_of_year / 365)
-    features['dia_del_anio_cos'] = np.cos(2 * np.pi * day_of_year / 365)
-    day = date.day
-    features['dia_embarque_sin'] = np.sin(2 * np.pi * day / 31)
-    features['dia_embarque_cos'] = np.cos(2 * np.pi * day / 31)
-    features['hora_embarque_sin'] = 0
-    features['hora_embarque_cos'] = 1
-    features['is_weekend'] = 1 if date.weekday() >= 5 else 0
-    month = date.month
-    features['mes_embarque_sin'] = np.sin(2 * np.pi * month / 12)
-    features['mes_embarque_cos'] = np.cos(2 * np.pi * month / 12)
-    week = date.isocalendar()[1]
-    features['week_of_year_sin'] = np.sin(2 * np.pi * week / 52)
-    features['week_of_year_cos'] = np.cos(2 * np.pi * week / 52)
-    season_mapping = {12:4,1:4,2:4,3:1,4:1,5:1,6:2,7:2,8:2,9:3,10:3,11:3}
-    season = season_mapping[month]
-    for s in range(1,5): features[f'season_{s}'] = 1 if season==s else 0
-    weekday = date.weekday()
-    for i, name in enumerate(['monday','tuesday','wednesday','thursday','friday','saturday','sunday']):
-        features[f'is_{name}'] = 1 if weekday==i else 0
-    features['weekday_sin'] = np.sin(2 * np.pi * weekday / 7)
-    features['weekday_cos'] = np.cos(2 * np.pi * weekday / 7)
-    for festivo in ['is_festivo_nacional','is_festivo_local','is_eid_aladha','is_eid_aladha_prev',
-                    'is_eid_aladha_post','is_eid_alfitr','is_eid_alfitr_prev','is_eid_alfitr_post','is_mawlid_nabi']:
-        features[festivo] = 0
-    return features
+def generate_time_features(dates: List[datetime]) -> pd.DataFrame:
+    #Festivos y ventanas de Eid desde la dimension calendario; variables ciclicas y
+    #one-hot con el mismo kernel que el entrenamiento, en una pasada para todas las fechas
+    df = calendario_fechas(dates)
+    #La prediccion es diaria: las fechas van a hora 0
+    return pd.concat([df, calcular_features(df['fecha'])], axis=1)
 
 # Prepara datos para LSTM
 def prepare_prediction_data(start_date_str: str, end_date_str: str, target_type: str):
@@ -113,8 +99,7 @@ def prepare_prediction_data(start_date_str: str, end_date_str: str, target_type:
             extra = lookback - len(dates)
             new_start = start - timedelta(days=extra)
             dates = [new_start + timedelta(days=i) for i in range(lookback)]
-    feats = [generate_time_features(d) for d in dates]
-    df = pd.DataFrame(feats)
+    df = generate_time_features(dates)
     cols = feature_cols_pasajeros if target_type=='pasajeros' else feature_cols_vehiculos
     for m in set(cols)-set(df.columns): df[m] = 0
     df = df[cols]
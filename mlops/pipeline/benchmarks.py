@@ -0,0 +1,434 @@
+# pipeline/benchmarks.py
+
+import os
+import glob
+import time
+import shutil
+import filecmp
+import tempfile
+import tracemalloc
+import logging
+import argparse
+import multiprocessing
+import numpy as np
+import pandas as pd
+from generador_sintetico import MEZCLA_TIPOBILLETE
+from esquema import (TIPOS_PASAJEROS, TIPOS_VEHICULOS, COLUMNAS_POR_ETAPA, CLAVE_DUPLICADOS,
+                     COLUMNAS_DEDUPLICACION, dtypes_lectura, aplicar_esquema, incluir_clave_billete)
+from generador_sintetico import generar
+from raw_store import read_raw_dataset, write_raw_dataset
+from indice_claves import construir_indice, actualizar_indice, leer_supervivientes, ruta_indice
+from preprocessing_01 import (totales_por_salida, preprocessing_01, columnas_lectura, limpiar_billetes,
+                              deduplicar)
+from preprocessing_02 import preprocessing_02
+from preprocessing import preprocessing
+from esquema import leer_tabla, memoria_mb
+from tabla_diaria import COLUMNAS_FEATURES, TARGETS, leer_tabla_diaria
+from secuencias import matriz_float32, ventanas, objetivos, ventanas_por_lookback, memoria_ventanas_mb
+
+#Benchmarks de las etapas del pipeline sobre datos sinteticos.
+#Cada benchmark compara la version anterior con la actual y comprueba que dan lo mismo
+
+
+def cronometrar(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def billetes_sinteticos(filas: int, salidas: int, semilla: int = 0) -> pd.DataFrame:
+    #Solo las columnas que usa el calculo de totales (con la mezcla real de tipos de billete)
+    rng = np.random.default_rng(semilla)
+    probabilidades = np.array(list(MEZCLA_TIPOBILLETE.values()))
+    return pd.DataFrame({
+        "con_bacoope": rng.integers(1, salidas + 1, filas),
+        "con_tipobillete": rng.choice(np.array(list(MEZCLA_TIPOBILLETE), dtype=object), filas,
+                                      p=probabilidades / probabilidades.sum()),
+    })
+
+
+def totales_groupby_apply(df: pd.DataFrame) -> pd.DataFrame:
+    #Version anterior de preprocessing_01: una Series por salida y merge con todo el DataFrame
+    totales = df.groupby('con_bacoope').apply(lambda grupo: pd.Series({
+        'total_pasajeros': grupo['con_tipobillete'].isin(TIPOS_PASAJEROS).sum(),
+        'total_vehiculos': grupo['con_tipobillete'].isin(TIPOS_VEHICULOS).sum()
+    })).reset_index()
+    return pd.merge(df, totales, on='con_bacoope', how='left')
+
+
+def bench_totales_ocupacion(filas: int = 10_000_000, salidas: int = 26_000) -> dict:
+    """
+    Totales de ocupacion por salida: groupby.apply + merge frente a factorize + bincount
+    """
+    df = billetes_sinteticos(filas, salidas)
+    anterior, t_anterior = cronometrar(totales_groupby_apply, df.copy())
+    actual, t_actual = cronometrar(totales_por_salida, df.copy())
+
+    columnas = ["total_pasajeros", "total_vehiculos"]
+    iguales = anterior[columnas].reset_index(drop=True).equals(actual[columnas].reset_index(drop=True))
+    resultado = {
+        "benchmark": "totales_ocupacion", "filas": filas, "salidas": salidas,
+        "anterior_s": round(t_anterior, 2), "actual_s": round(t_actual, 2),
+        "aceleracion": round(t_anterior / t_actual, 1), "iguales": iguales,
+    }
+    logging.info(f"Totales de ocupacion: {resultado}")
+    return resultado
+
+
+def medir_memoria(funcion, *args):
+    #Tiempo y pico de memoria (MB) de Python/numpy durante la llamada (tracemalloc añade sobrecoste al tiempo)
+    tracemalloc.start()
+    resultado, segundos = cronometrar(funcion, *args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico / 1024 / 1024
+
+
+def bench_preprocessing_01_bloques(filas: int = 1_000_000, chunksize: int = 100_000) -> dict:
+    """
+    preprocessing_01 en memoria frente a por bloques (dos pasadas) sobre un
+    dataset raw sintetico: tiempo, pico de memoria y salida identica
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = generar(filas, formato="parquet", ruta=os.path.join(tmp, "raw"))
+        salida_memoria = os.path.join(tmp, "memoria.csv")
+        salida_bloques = os.path.join(tmp, "bloques.csv")
+        _, t_memoria, mb_memoria = medir_memoria(preprocessing_01, raw, salida_memoria, None)
+        _, t_bloques, mb_bloques = medir_memoria(preprocessing_01, raw, salida_bloques, chunksize)
+        iguales = filecmp.cmp(salida_memoria, salida_bloques, shallow=False)
+
+    resultado = {
+        "benchmark": "preprocessing_01_bloques", "filas": filas, "chunksize": chunksize,
+        "memoria_s": round(t_memoria, 2), "memoria_pico_mb": round(mb_memoria),
+        "bloques_s": round(t_bloques, 2), "bloques_pico_mb": round(mb_bloques),
+        "iguales": iguales,
+    }
+    logging.info(f"preprocessing_01 por bloques: {resultado}")
+    return resultado
+
+
+def secuencial_01_02(raw: str, intermedio: str, salida: str) -> None:
+    #Flujo anterior: preprocessing_01 escribe el CSV intermedio y preprocessing_02 lo vuelve a leer
+    preprocessing_01(raw, intermedio, None)
+    preprocessing_02(intermedio, salida, os.path.join(os.path.dirname(salida), "diario_secuencial.csv"))
+
+
+def bench_preprocessing_fusionado(filas: int = 100_000) -> dict:
+    """
+    preprocessing_01 -> CSV -> preprocessing_02 frente al preprocesamiento
+    fusionado en memoria: tiempo, pico de memoria y salida final identica
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = generar(filas, formato="parquet", ruta=os.path.join(tmp, "raw"))
+        salida_secuencial = os.path.join(tmp, "secuencial.csv")
+        salida_fusionado = os.path.join(tmp, "fusionado.csv")
+        _, t_secuencial, mb_secuencial = medir_memoria(
+            secuencial_01_02, raw, os.path.join(tmp, "intermedio.csv"), salida_secuencial)
+        _, t_fusionado, mb_fusionado = medir_memoria(preprocessing, raw, salida_fusionado, None, None,
+                                                     "pandas", os.path.join(tmp, "diario.csv"))
+        iguales = filecmp.cmp(salida_secuencial, salida_fusionado, shallow=False)
+
+    resultado = {
+        "benchmark": "preprocessing_fusionado", "filas": filas,
+        "secuencial_s": round(t_secuencial, 2), "secuencial_pico_mb": round(mb_secuencial),
+        "fusionado_s": round(t_fusionado, 2), "fusionado_pico_mb": round(mb_fusionado),
+        "iguales": iguales,
+    }
+    logging.info(f"Preprocesamiento fusionado: {resultado}")
+    return resultado
+
+
+def comparar_csv(ruta_a: str, ruta_b: str, tolerancia: float = 1e-12) -> list:
+    """
+    Compara dos CSV columna a columna: mismas columnas en el mismo orden, mismas
+    filas y mismos valores (los decimales con tolerancia absoluta, p.ej. sin/cos
+    calculados con otra libm). Devuelve las diferencias encontradas (vacia si iguales)
+    """
+    a = pd.read_csv(ruta_a, low_memory=False)
+    b = pd.read_csv(ruta_b, low_memory=False)
+    if list(a.columns) != list(b.columns):
+        return [f"columnas: {list(a.columns)} != {list(b.columns)}"]
+    if len(a) != len(b):
+        return [f"filas: {len(a)} != {len(b)}"]
+    diferencias = []
+    for col in a.columns:
+        if pd.api.types.is_float_dtype(a[col]) or pd.api.types.is_float_dtype(b[col]):
+            iguales = np.allclose(a[col].astype(float), b[col].astype(float), rtol=0, atol=tolerancia, equal_nan=True)
+        else:
+            iguales = a[col].equals(b[col])
+        if not iguales:
+            diferencias.append(col)
+    return diferencias
+
+
+def bench_motor_duckdb(filas: int = 200_000, input_path: str = None) -> dict:
+    """
+    Paridad y tiempo del motor DuckDB frente al motor pandas: ejecuta ambos sobre
+    el mismo raw (sintetico, o input_path) y compara columna a columna la salida
+    final y el checkpoint de preprocessing_01
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = input_path or generar(filas, formato="parquet", ruta=os.path.join(tmp, "raw"))
+        rutas = {motor: (os.path.join(tmp, f"{motor}_02.csv"), os.path.join(tmp, f"{motor}_01.csv"))
+                 for motor in ("pandas", "duckdb")}
+        tiempos = {}
+        for motor, (salida, checkpoint) in rutas.items():
+            resultado, tiempos[motor] = cronometrar(preprocessing, raw, salida, checkpoint, None, motor,
+                                                    os.path.join(tmp, f"{motor}_diario.csv"))
+        diferencias_01 = comparar_csv(rutas["pandas"][1], rutas["duckdb"][1])
+        diferencias_02 = comparar_csv(rutas["pandas"][0], rutas["duckdb"][0])
+
+    resultado = {
+        "benchmark": "motor_duckdb", "filas": resultado["filas_01"],
+        "pandas_s": round(tiempos["pandas"], 2), "duckdb_s": round(tiempos["duckdb"], 2),
+        "aceleracion": round(tiempos["pandas"] / tiempos["duckdb"], 1),
+        "iguales": not diferencias_01 and not diferencias_02,
+        "diferencias_01": diferencias_01, "diferencias_02": diferencias_02,
+    }
+    logging.info(f"Motor DuckDB: {resultado}")
+    return resultado
+
+
+def serie_por_billete(input_path: str, target: str) -> pd.DataFrame:
+    #Carga anterior del entrenamiento: CSV por billete completo y agregado diario en cada ejecucion
+    df = pd.read_csv(input_path, usecols=lambda c: c in COLUMNAS_POR_ETAPA["training"], low_memory=False)
+    df["fecha_embarque"] = pd.to_datetime(df["fecha_embarque"], errors="coerce")
+    fechas = pd.date_range(start=df["fecha_embarque"].min(), end=df["fecha_embarque"].max(), freq="D")
+    conteo = (df[df["tipo_agrupacion"] == TARGETS[target]].groupby("fecha_embarque").size()
+              .reindex(fechas, fill_value=0).rename(target))
+    variables = (df.drop(columns=["tipo_agrupacion"]).drop_duplicates("fecha_embarque")
+                 .set_index("fecha_embarque").reindex(fechas).fillna(method="ffill").fillna(0))
+    return variables.join(conteo).rename_axis("fecha_embarque").reset_index()
+
+
+def bench_tabla_diaria(filas: int = 200_000) -> dict:
+    """
+    Carga del entrenamiento: CSV por billete + agregado diario (anterior) frente a
+    la tabla diaria materializada por el preprocesamiento. Comprueba que ambas
+    dan la misma serie para cada target en float32 (la precision del modelo)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = generar(filas, formato="parquet", ruta=os.path.join(tmp, "raw"))
+        por_billete, diario_path = os.path.join(tmp, "por_billete.csv"), os.path.join(tmp, "diario.parquet")
+        preprocessing(raw, por_billete, None, None, "pandas", diario_path)
+        series, t_billete = cronometrar(lambda: {t: serie_por_billete(por_billete, t) for t in TARGETS})
+        diario, t_diario = cronometrar(leer_tabla_diaria, diario_path)
+        iguales = all(
+            serie["fecha_embarque"].equals(diario["fecha_embarque"])
+            and np.array_equal(serie[COLUMNAS_FEATURES + [t]].to_numpy(dtype="float32"),
+                               diario[COLUMNAS_FEATURES + [t]].to_numpy(dtype="float32"))
+            for t, serie in series.items()
+        )
+        kb_billete, kb_diario = os.path.getsize(por_billete) / 1024, os.path.getsize(diario_path) / 1024
+
+    resultado = {
+        "benchmark": "tabla_diaria", "filas": filas, "dias": len(diario),
+        "por_billete_s": round(t_billete, 3), "por_billete_kb": round(kb_billete),
+        "diario_s": round(t_diario, 3), "diario_kb": round(kb_diario),
+        "aceleracion": round(t_billete / t_diario, 1),
+        "iguales": iguales,
+    }
+    logging.info(f"Tabla diaria: {resultado}")
+    return resultado
+
+
+def bench_formato_salida(filas: int = 200_000) -> dict:
+    """
+    Salida de preprocessing_02 en CSV frente a Parquet con tipos compactos:
+    tamaño, tiempo de lectura, memoria por etapa y mismos valores al releer
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = generar(filas, formato="parquet", ruta=os.path.join(tmp, "raw"))
+        rutas = {formato: os.path.join(tmp, f"salida.{formato}") for formato in ("csv", "parquet")}
+        for formato, ruta in rutas.items():
+            resultado = preprocessing(raw, ruta, None, None, "pandas", os.path.join(tmp, f"diario.{formato}"))
+        tablas, tiempos = {}, {}
+        for formato, ruta in rutas.items():
+            tablas[formato], tiempos[formato] = cronometrar(leer_tabla, ruta)
+        kb = {formato: os.path.getsize(ruta) / 1024 for formato, ruta in rutas.items()}
+        #Lo que ocupaba la salida con enteros de 64 bits y float64 (antes de los tipos compactos)
+        anchos = tablas["parquet"].astype({col: "int64" if dtype.kind == "i" else "float64"
+                                           for col, dtype in tablas["parquet"].dtypes.items()
+                                           if dtype.kind in "if"})
+        #Las fechas del CSV se leen en ns y las del Parquet conservan la unidad (us): se igualan antes de comparar
+        fechas = {col: "datetime64[ns]" for col, dtype in tablas["parquet"].dtypes.items() if dtype.kind == "M"}
+        iguales = tablas["csv"].astype(fechas).equals(tablas["parquet"].astype(fechas))
+
+    resultado = {
+        "benchmark": "formato_salida", "filas": resultado["filas_02"],
+        "csv_kb": round(kb["csv"]), "parquet_kb": round(kb["parquet"]),
+        "csv_lectura_s": round(tiempos["csv"], 2), "parquet_lectura_s": round(tiempos["parquet"], 2),
+        "memoria_64bits_mb": memoria_mb(anchos), "memoria_mb": resultado["memoria_mb"],
+        "iguales": iguales,
+    }
+    logging.info(f"Formato de salida: {resultado}")
+    return resultado
+
+
+def filas_incrementales(df: pd.DataFrame, filas: int, semilla: int = 0) -> pd.DataFrame:
+    #Lote incremental: re-escaneos de cupones ya ingeridos (la mitad) y cupones nuevos, con con_clave posteriores
+    rng = np.random.default_rng(semilla)
+    nuevas = df.sample(filas, random_state=semilla).reset_index(drop=True)
+    nuevas["con_fecha"] = nuevas["con_fecha"] + pd.to_timedelta(rng.integers(1, 30, filas), unit="m")
+    nuevas["con_clave"] = df["con_clave"].max() + 1 + np.arange(filas)
+    nuevas.loc[filas // 2:, "con_codigo"] = "N" + nuevas.loc[filas // 2:, "con_codigo"].astype(str)
+    return incluir_clave_billete(nuevas)
+
+
+def bench_deduplicacion(filas: int = 1_000_000, filas_incremento: int = 20_000) -> dict:
+    """
+    Deduplicacion de preprocessing_01: drop_duplicates sobre las tres cadenas
+    (anterior) frente a la clave de 64 bits guardada y al semi-join con el indice
+    de claves. Despues añade un lote incremental y comprueba que actualizar el
+    indice con solo las filas nuevas da los mismos supervivientes que reconstruirlo
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = generar(filas, formato="parquet", ruta=os.path.join(tmp, "raw"))
+        columnas = columnas_lectura(raw)
+        df = limpiar_billetes(aplicar_esquema(read_raw_dataset(raw, columns=columnas, dtype=dtypes_lectura(columnas))))
+
+        anterior, t_anterior = cronometrar(
+            lambda: df.drop_duplicates(subset=CLAVE_DUPLICADOS, keep='last').drop(columns=COLUMNAS_DEDUPLICACION))
+        por_clave, t_clave = cronometrar(deduplicar, df)
+        por_indice, t_indice = cronometrar(lambda: deduplicar(df, leer_supervivientes(raw)))
+        iguales = anterior.equals(por_clave) and anterior.equals(por_indice)
+
+        #Ingesta incremental: ficheros inc- en las particiones afectadas
+        write_raw_dataset(filas_incrementales(read_raw_dataset(raw), filas_incremento), raw, prefijo="inc-000000000001")
+        nuevos = glob.glob(os.path.join(raw, "anio=*", "mes=*", "inc-*.parquet"))
+        _, t_actualizar = cronometrar(actualizar_indice, raw, nuevos)
+        incremental = pd.read_parquet(ruta_indice(raw))
+        shutil.copy(ruta_indice(raw), os.path.join(tmp, "incremental.parquet"))
+        _, t_construir = cronometrar(construir_indice, raw)
+        completo = pd.read_parquet(ruta_indice(raw))
+        ordenar = lambda indice: indice.sort_values("clave_billete", ignore_index=True)
+        iguales_incremental = ordenar(incremental).equals(ordenar(completo))
+
+    resultado = {
+        "benchmark": "deduplicacion", "filas": len(df), "supervivientes": len(anterior),
+        "drop_duplicates_s": round(t_anterior, 3), "clave_s": round(t_clave, 3), "indice_s": round(t_indice, 3),
+        "filas_incremento": filas_incremento,
+        "actualizar_indice_s": round(t_actualizar, 3), "construir_indice_s": round(t_construir, 3),
+        "iguales": iguales and iguales_incremental,
+    }
+    logging.info(f"Deduplicacion: {resultado}")
+    return resultado
+
+
+def serie_sintetica(filas: int, semilla: int = 0) -> pd.DataFrame:
+    #Serie con las columnas de procesar_dataset_completo (variables, target y target normalizado)
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame(rng.random((filas, len(COLUMNAS_FEATURES))), columns=COLUMNAS_FEATURES)
+    df.insert(0, "fecha_embarque", pd.date_range("2022-01-01", periods=filas, freq="H"))
+    df["total_pasajeros"] = rng.integers(0, 5000, filas)
+    df["total_pasajeros_norm"] = df["total_pasajeros"] / df["total_pasajeros"].max()
+    return df
+
+
+def secuencias_iloc(df: pd.DataFrame, target_col: str, lookback: int):
+    #Version anterior de crear_secuencias: un slice de DataFrame y una copia por ventana
+    features = df.columns.difference(['fecha_embarque', target_col, f'{target_col}_norm'])
+    X, y = [], []
+    for i in range(lookback, len(df)):
+        X.append(df.iloc[i-lookback:i][features].values.astype('float32'))
+        y.append(df.iloc[i][f'{target_col}_norm'])
+    return np.array(X), np.array(y)
+
+
+def bench_secuencias(filas: int = 10_000, lookbacks=(7, 14, 28), stride: int = 1) -> dict:
+    """
+    Ventanas del LSTM: bucle con iloc (anterior) frente a vistas con strides sobre
+    una matriz float32. Comprueba X e y identicos y compara la memoria de
+    materializar las ventanas de varios lookback con la de la matriz compartida
+    """
+    df = serie_sintetica(filas)
+    target, lookback = "total_pasajeros", lookbacks[0]
+    (X_iloc, y_iloc), t_iloc = cronometrar(secuencias_iloc, df, target, lookback)
+
+    def vistas():
+        features = df.columns.difference(['fecha_embarque', target, f'{target}_norm'])
+        matriz = matriz_float32(df, features)
+        return matriz, ventanas_por_lookback(matriz, df[f'{target}_norm'].to_numpy(), lookbacks, stride)
+    (matriz, por_lookback), t_vistas = cronometrar(vistas)
+    X, y = por_lookback[lookback]
+    iguales = np.array_equal(X_iloc[::stride], X) and np.array_equal(y_iloc[::stride], y)
+
+    resultado = {
+        "benchmark": "secuencias", "filas": filas, "lookbacks": list(lookbacks), "stride": stride,
+        "iloc_s": round(t_iloc, 3), "vistas_s": round(t_vistas, 4),
+        "aceleracion": round(t_iloc / t_vistas),
+        "materializadas_mb": round(sum(X.nbytes for X, _ in por_lookback.values()) / 2**20, 1),
+        "vistas_mb": max(memoria_ventanas_mb(X) for X, _ in por_lookback.values()),
+        "iguales": iguales,
+    }
+    logging.info(f"Secuencias: {resultado}")
+    return resultado
+
+
+def entrenar_entrada(entrada: str, filas: int, lookback: int, epochs: int, batch_size: int, cache_dir: str) -> dict:
+    """
+    Entrena el modelo del pipeline unas epocas con una entrada (numpy o tf_data).
+    Se ejecuta en un proceso aparte para que el pico de memoria sea solo el suyo
+    """
+    from lstm_module_temp import (crear_modelo_lstm, compilar_modelo, matriz_secuencias, crear_secuencias,
+                                  split_temporal)
+    from entrada_tf import datos_fit, MedidorEpocas
+
+    df = serie_sintetica(filas)
+    matriz, serie = matriz_secuencias(df, "total_pasajeros")
+    X, y = crear_secuencias(df, "total_pasajeros", lookback, 1, matriz, serie)
+    split = split_temporal(X, y)
+    model = compilar_modelo(crear_modelo_lstm((lookback, matriz.shape[1])))
+    medidor = MedidorEpocas()
+    history = model.fit(**datos_fit(entrada, matriz, serie, split, lookback, 1, batch_size, 0, cache_dir),
+                        epochs=epochs, callbacks=[medidor], verbose=0)
+    return {**medidor.resumen(), "val_loss": round(history.history["val_loss"][-1], 5)}
+
+
+def bench_entrada_tf(filas: int = 50_000, lookback: int = 7, epochs: int = 3, batch_size: int = 32) -> dict:
+    """
+    Entrada de model.fit: arrays de ventanas (anterior) frente a tf.data con
+    ventaneo en el grafo, cache en fichero y prefetch. Tiempo por epoca (la primera
+    aparte) y pico de memoria de cada proceso. Las dos entrenan el mismo modelo
+    sobre las mismas ventanas, pero con distinto barajado, asi que no se exige
+    la misma val_loss
+    """
+    contexto = multiprocessing.get_context("spawn")
+    medidas = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for entrada in ("numpy", "tf_data"):
+            with contexto.Pool(1) as pool:
+                medidas[entrada] = pool.apply(entrenar_entrada, (entrada, filas, lookback, epochs, batch_size, tmp))
+
+    resultado = {
+        "benchmark": "entrada_tf", "filas": filas, "lookback": lookback, "epochs": epochs,
+        **{f"{entrada}_{medida}": valor for entrada, valores in medidas.items() for medida, valor in valores.items()},
+        "aceleracion_epoca": round(medidas["numpy"]["epoch_time_s_mean"] / medidas["tf_data"]["epoch_time_s_mean"], 2),
+    }
+    logging.info(f"Entrada de entrenamiento: {resultado}")
+    return resultado
+
+
+BENCHMARKS = {
+    "totales_ocupacion": bench_totales_ocupacion,
+    "preprocessing_01_bloques": bench_preprocessing_01_bloques,
+    "preprocessing_fusionado": bench_preprocessing_fusionado,
+    "motor_duckdb": bench_motor_duckdb,
+    "tabla_diaria": bench_tabla_diaria,
+    "formato_salida": bench_formato_salida,
+    "deduplicacion": bench_deduplicacion,
+    "secuencias": bench_secuencias,
+    "entrada_tf": bench_entrada_tf,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline sobre datos sinteticos")
+    parser.add_argument("benchmark", choices=list(BENCHMARKS) + ["todos"], nargs="?", default="todos")
+    parser.add_argument("--filas", type=int, help="Filas del benchmark (por defecto, las de cada uno)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    nombres = list(BENCHMARKS) if args.benchmark == "todos" else [args.benchmark]
+    for nombre in nombres:
+        print(BENCHMARKS[nombre](**({"filas": args.filas} if args.filas else {})))
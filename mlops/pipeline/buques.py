@@ -0,0 +1,74 @@
+# pipeline/buques.py
+
+import numpy as np
+import pandas as pd
+
+#Dimension de buques: (nombre, capacidad_pasajeros, capacidad_vehiculos), una fila por buque.
+#Las correcciones son retroactivas: corrigen capacidades mal registradas (no cambios reales
+#del buque), asi que sustituyen al valor anterior para todo el historico. El valor previo
+#queda en el comentario '#corregido'
+REGISTRO_BUQUES = [
+    ("AL ANDALUS EXPRESS",     215, 150),  #corregido (antes 80/90)
+    ("ALCANTARA 2",            575, 120),
+    ("ALGECIRAS JET",          428,  52),
+    ("AVEMAR DOS",             855, 174),
+    ("BAHAMA MAMA",           1000, 350),
+    ("BLUE STAR CHIOS",       1715, 425),
+    ("BUDA BRIDGE",            359,  91),
+    ("CECILIA PAYNE",          800, 200),  #corregido (antes 740/200)
+    ("CEUTA JET",              428,  52),
+    ("CIUDAD DE CEUTA",        866, 220),
+    ("CIUDAD DE MALAGA",       943, 300),
+    ("DENIA CIUTAT CREATIVA",  399, 430),
+    ("FORTUNY",               1250, 140),
+    ("HELLENIC HIGHSPEED",     727, 175),  #corregido (antes 727/156)
+    ("JAUME I",                655, 144),  #corregido (antes 623/130)
+    ("JAUME III",              623, 130),
+    ("JJ SISTER",              806, 220),
+    ("JUAN J. SISTER",         806, 220),
+    ("KATTEGAT",               974, 344),  #corregido (antes 1000/344)
+    ("LEVANTE JET",            675, 151),  #corregido (antes 672/151)
+    ("MED STAR",              1212, 450),
+    ("MOROCCO STAR",           935, 225),
+    ("MOROCCO SUN",           1001, 280),
+    ("NAPOLES",               1600, 481),
+    ("NISSOS CHIOS",          1750, 425),  #corregido (antes 1715/425)
+    ("PASSIO PER FORMENTERA",  800, 105),
+    ("PATRIA SEAWAYS",         260, 480),  #corregido (antes 277/60)
+    ("POETA LOPEZ ANGLADA",   1257, 243),
+    ("PONIENTE JET",           640, 180),
+    ("REGINA BALTICA",        1675, 350),
+    ("SOROLLA",               1250, 140),
+    ("STENA EUROPE",          1386, 564),  #corregido (antes 1220/310)
+    ("STENA VINGA",            400, 200),
+    ("TANGER EXPRESS",         900, 344),
+    ("TARIFA JET",             800, 175),  #corregido (antes 900/200)
+    ("VILLA DE AGAETE",        868, 220),
+    ("VOLCAN DE TAMASITE",    1500, 300),  #corregido (antes 1469/403)
+    ("VOLCAN DE TAUCE",        347, 320),  #corregido (antes 347/0)
+    ("WASA EXPRESS",          1500, 450),  #corregido (antes 700/300)
+]
+
+
+def tabla_buques() -> pd.DataFrame:
+    """
+    Devuelve el registro de buques como tabla de dimension
+    """
+    return pd.DataFrame(REGISTRO_BUQUES, columns=["buq_nombre", "capacidad_pasajeros", "capacidad_vehiculos"])
+
+
+def asignar_capacidades(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Añade capacidad_pasajeros / capacidad_vehiculos con un unico join vectorizado
+    (por nombre de buque) contra el registro.
+    Los buques sin registro quedan con capacidad 0.
+    """
+    registro = tabla_buques()
+    #Posicion de cada fila en el registro (-1: buque sin registro)
+    posicion = pd.Index(registro["buq_nombre"]).get_indexer(df["buq_nombre"].to_numpy(dtype=object))
+    encontrado = posicion >= 0
+    for columna in ("capacidad_pasajeros", "capacidad_vehiculos"):
+        capacidad = np.zeros(len(df), dtype="int64")
+        capacidad[encontrado] = registro[columna].to_numpy()[posicion[encontrado]]
+        df[columna] = capacidad
+    return df
@@ -0,0 +1,282 @@
+# pipeline/busqueda_hiperparametros.py
+
+import os
+import math
+import logging
+import tempfile
+import multiprocessing
+from datetime import datetime
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import mlflow
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+from secuencias import ventanas, objetivos
+from entrenamiento_paralelo import cpus_disponibles, configurar_hilos, cargar_modulo
+from tabla_diaria import TABLA_DIARIA_PATH, leer_tabla_diaria
+
+#Busqueda de hiperparametros del LSTM: configuraciones aleatorias del espacio de busqueda
+#entrenadas en un pool de procesos y podadas por successive halving sobre val_loss. La
+#tabla diaria se convierte una vez en matriz de variables y targets, que los procesos
+#comparten en memoria compartida (cada trial recorta sus ventanas como vistas)
+
+#Espacio de busqueda: hiperparametro -> "valores" (uno de la lista) o "log_uniforme" [min, max]
+ESPACIO_BUSQUEDA = {
+    "lookback": {"valores": [7, 14, 21, 28]},
+    "lstm_units": {"valores": [32, 64, 128]},
+    "dropout_rate": {"valores": [0.1, 0.2, 0.3]},
+    "learning_rate": {"log_uniforme": [1e-4, 1e-2]},
+    "batch_size": {"valores": [16, 32, 64]},
+}
+BUSQUEDA_TRIALS = int(os.getenv("BUSQUEDA_TRIALS", "27"))
+BUSQUEDA_WORKERS = int(os.getenv("BUSQUEDA_WORKERS", "0")) or max(len(cpus_disponibles()) // 2, 1)
+#Successive halving: epocas de la primera ronda, epocas maximas y factor de reduccion (eta)
+BUSQUEDA_EPOCAS_MIN = int(os.getenv("BUSQUEDA_EPOCAS_MIN", "10"))
+BUSQUEDA_EPOCAS_MAX = int(os.getenv("BUSQUEDA_EPOCAS_MAX", "90"))
+BUSQUEDA_ETA = int(os.getenv("BUSQUEDA_ETA", "3"))
+#Fichero del modulo de entrenamiento (modelo, secuencias y configuracion)
+MODULO_ENTRENAMIENTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "(pv)lstm_training.py")
+
+
+def muestrear_configuraciones(espacio: dict, n: int, semilla: int = 0) -> list:
+    #n configuraciones aleatorias (reproducibles con la semilla)
+    rng = np.random.default_rng(semilla)
+    configuraciones = []
+    for _ in range(n):
+        config = {}
+        for nombre, spec in espacio.items():
+            if "valores" in spec:
+                config[nombre] = spec["valores"][rng.integers(len(spec["valores"]))]
+            elif "log_uniforme" in spec:
+                minimo, maximo = np.log10(spec["log_uniforme"])
+                config[nombre] = float(10 ** rng.uniform(minimo, maximo))
+            else:
+                raise ValueError(f"{nombre}: especificacion desconocida {spec}")
+        configuraciones.append(config)
+    return configuraciones
+
+
+def rondas_halving(epocas_min: int, epocas_max: int, eta: int) -> list:
+    #Epocas acumuladas al final de cada ronda: epocas_min * eta^k, la ultima con epocas_max
+    rondas = [epocas_min]
+    while rondas[-1] < epocas_max:
+        rondas.append(min(rondas[-1] * eta, epocas_max))
+    return rondas
+
+
+def compartir_arrays(arrays: dict):
+    """
+    Copia cada array una vez a un bloque de memoria compartida. Devuelve los
+    bloques (hay que cerrarlos y liberarlos al terminar) y el descriptor
+    nombre -> (bloque, forma, dtype) con el que los procesos los adjuntan
+    """
+    bloques, descriptor = [], {}
+    for nombre, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        bloque = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=bloque.buf)[...] = array
+        bloques.append(bloque)
+        descriptor[nombre] = (bloque.name, array.shape, array.dtype.str)
+    return bloques, descriptor
+
+
+def adjuntar_arrays(descriptor: dict):
+    #Arrays de solo lectura sobre los bloques compartidos (sin copia)
+    bloques, arrays = [], {}
+    for nombre, (bloque_nombre, forma, dtype) in descriptor.items():
+        bloque = shared_memory.SharedMemory(name=bloque_nombre)
+        array = np.ndarray(forma, dtype=dtype, buffer=bloque.buf)
+        array.flags.writeable = False
+        bloques.append(bloque)
+        arrays[nombre] = array
+    return bloques, arrays
+
+
+#Estado de cada proceso del pool (lo fija iniciar_trabajador)
+TRABAJADOR = {}
+
+
+def iniciar_trabajador(ruta_modulo: str, descriptor: dict, intra_op: int, inter_op: int) -> None:
+    #Una vez por proceso: hilos, modulo de entrenamiento y arrays compartidos
+    configurar_hilos(cpus_disponibles(), intra_op, inter_op)
+    TRABAJADOR["modulo"] = cargar_modulo(ruta_modulo)
+    mlflow.set_tracking_uri(TRABAJADOR["modulo"].MLFLOW_URI)
+    TRABAJADOR["bloques"], TRABAJADOR["arrays"] = adjuntar_arrays(descriptor)
+
+
+def ejecutar_trial(trial: dict, target: str, epocas: int, checkpoint_dir: str) -> dict:
+    """
+    Entrena un trial hasta 'epocas' epocas acumuladas:
+    1) Ventanas de su lookback como vistas sobre la matriz compartida
+    2) Modelo nuevo en la primera ronda; en las siguientes se reanuda desde su
+       checkpoint (pesos y estado del optimizador)
+    3) Registra val_loss por epoca en el run del trial y guarda el checkpoint
+    Devuelve la mejor val_loss del trial hasta ahora
+    """
+    import tensorflow as tf
+    modulo, arrays = TRABAJADOR["modulo"], TRABAJADOR["arrays"]
+    config = trial["config"]
+    matriz, serie = arrays["matriz"], arrays[target]
+    X, y = ventanas(matriz, config["lookback"]), objetivos(serie, config["lookback"])
+    split = modulo.split_temporal(X, y)
+
+    checkpoint = os.path.join(checkpoint_dir, f"trial_{target}_{trial['id']:03d}.h5")
+    if trial["epocas"] == 0:
+        model = modulo.crear_modelo_lstm((config["lookback"], matriz.shape[1]), config["dropout_rate"],
+                                         config["lstm_units"])
+        model = modulo.compilar_modelo(model, config["learning_rate"])
+    else:
+        model = tf.keras.models.load_model(checkpoint)
+    history = model.fit(
+        **modulo.datos_fit("numpy", matriz, serie, split, config["lookback"], 1, config["batch_size"]),
+        epochs=epocas,
+        initial_epoch=trial["epocas"],
+        verbose=0
+    )
+    model.save(checkpoint)
+
+    cliente = mlflow.MlflowClient()
+    for epoca, val_loss in enumerate(history.history["val_loss"], start=trial["epocas"] + 1):
+        cliente.log_metric(trial["run_id"], "val_loss", val_loss, step=epoca)
+    return {"id": trial["id"], "val_loss": min([trial["val_loss"]] + history.history["val_loss"])}
+
+
+def buscar_target(pool, nombre: str, target: str, configuraciones: list, padre_id: str,
+                  checkpoint_dir: str, rondas: list, eta: int) -> dict:
+    """
+    Successive halving de un target:
+    1) Un run anidado por trial bajo el run de la busqueda
+    2) En cada ronda los trials vivos entrenan (en paralelo) hasta las epocas de la ronda
+    3) Sigue el mejor 1/eta por val_loss; el resto se poda (tag podado)
+    Devuelve el mejor trial de la ultima ronda
+    """
+    cliente = mlflow.MlflowClient()
+    experimento = cliente.get_run(padre_id).info.experiment_id
+    trials = []
+    for i, config in enumerate(configuraciones):
+        run = cliente.create_run(experimento, run_name=f"trial_{nombre}_{i:03d}", tags={MLFLOW_PARENT_RUN_ID: padre_id})
+        for param, valor in config.items():
+            cliente.log_param(run.info.run_id, param, valor)
+        trials.append({"id": i, "config": config, "run_id": run.info.run_id, "epocas": 0, "val_loss": math.inf})
+
+    vivos = trials
+    try:
+        for k, epocas in enumerate(rondas):
+            futuros = [pool.submit(ejecutar_trial, trial, target, epocas, checkpoint_dir) for trial in vivos]
+            for trial, futuro in zip(vivos, futuros):
+                trial["val_loss"] = futuro.result()["val_loss"]
+                trial["epocas"] = epocas
+            vivos = sorted(vivos, key=lambda t: t["val_loss"])
+            if k + 1 == len(rondas):
+                break
+            seguir = max(len(vivos) // eta, 1)
+            for trial in vivos[seguir:]:
+                cliente.set_tag(trial["run_id"], "podado", "true")
+                cliente.log_metric(trial["run_id"], "best_val_loss", trial["val_loss"])
+                cliente.set_terminated(trial["run_id"])
+            vivos = vivos[:seguir]
+            logging.info(f"{nombre}: ronda {k + 1}/{len(rondas)} ({epocas} epocas), siguen {len(vivos)} trials, "
+                         f"mejor val_loss {vivos[0]['val_loss']:.5f}")
+    except Exception:
+        for trial in trials:
+            if cliente.get_run(trial["run_id"]).info.status == "RUNNING":
+                cliente.set_terminated(trial["run_id"], status="FAILED")
+        raise
+    for trial in vivos:
+        cliente.set_tag(trial["run_id"], "podado", "false")
+        cliente.log_metric(trial["run_id"], "best_val_loss", trial["val_loss"])
+        cliente.set_terminated(trial["run_id"])
+    return vivos[0]
+
+
+def buscar_hiperparametros(input_path: str = TABLA_DIARIA_PATH, output_model_dir: str = "models",
+                           trials: int = BUSQUEDA_TRIALS, workers: int = BUSQUEDA_WORKERS,
+                           epocas_min: int = BUSQUEDA_EPOCAS_MIN, epocas_max: int = BUSQUEDA_EPOCAS_MAX,
+                           eta: int = BUSQUEDA_ETA, espacio: dict = None, semilla: int = 0,
+                           ruta_modulo: str = MODULO_ENTRENAMIENTO) -> dict:
+    """
+    Busqueda de hiperparametros para cada modelo (pasajeros y vehiculos):
+    1) Lee la tabla diaria y construye una vez la matriz de variables y los targets
+       normalizados, en memoria compartida
+    2) Muestrea 'trials' configuraciones del espacio de busqueda (las mismas para los dos)
+    3) Por cada modelo, un run de MLflow con un run anidado por trial y successive halving
+       en un pool de 'workers' procesos (hilos repartidos entre ellos)
+    4) Escribe la mejor configuracion en config_<modelo>.json de output_model_dir, con el
+       formato del entrenamiento (train_lstm la usa con config_dir=output_model_dir)
+    Devuelve modelo -> mejor configuracion.
+    """
+    modulo = cargar_modulo(ruta_modulo)
+    mlflow.set_tracking_uri(modulo.MLFLOW_URI)
+    if not os.path.exists(input_path):
+        input_path = "data/processed/dataset_empresa_03_pos_EDA_2.parquet"
+    df = leer_tabla_diaria(input_path)
+
+    #Matriz y targets normalizados: las variables son las mismas para los dos modelos
+    arrays, feature_cols = {}, None
+    for nombre, spec in modulo.MODELOS.items():
+        df_daily, _ = modulo.procesar_dataset_completo(df, spec["target"])
+        arrays["matriz"], arrays[spec["target"]] = modulo.matriz_secuencias(df_daily, spec["target"])
+        feature_cols = df_daily.columns.difference(['fecha_embarque', spec["target"], f'{spec["target"]}_norm']).tolist()
+
+    configuraciones = muestrear_configuraciones(espacio or ESPACIO_BUSQUEDA, trials, semilla)
+    rondas = rondas_halving(epocas_min, epocas_max, eta)
+    intra_op = max(len(cpus_disponibles()) // workers, 1)
+    logging.info(f"Busqueda: {trials} trials, rondas {rondas}, {workers} procesos de {intra_op} hilos")
+
+    bloques, descriptor = compartir_arrays(arrays)
+    mejores = {}
+    try:
+        with tempfile.TemporaryDirectory() as checkpoint_dir, ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=iniciar_trabajador, initargs=(ruta_modulo, descriptor, intra_op, 1)) as pool:
+            for nombre, spec in modulo.MODELOS.items():
+                with mlflow.start_run(run_name=f"Busqueda_{spec['run_name']}") as padre:
+                    mlflow.set_tags({"step": f"busqueda_{nombre}", "model_type": "LSTM"})
+                    mlflow.log_params({"trials": trials, "workers": workers, "rondas": ",".join(map(str, rondas)),
+                                       "eta": eta, "semilla": semilla})
+                    mejor = buscar_target(pool, nombre, spec["target"], configuraciones, padre.info.run_id,
+                                          checkpoint_dir, rondas, eta)
+
+                    #Mejor configuracion, con el formato de config_<modelo>.json del entrenamiento
+                    config = {
+                        **mejor["config"],
+                        "stride": 1,
+                        "input_path": input_path,
+                        "fecha_entrenamiento": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "feature_columns": feature_cols,
+                        "input_shape": [mejor["config"]["lookback"], len(feature_cols)],
+                        "target_column": spec["target"],
+                        "val_loss": mejor["val_loss"],
+                        "trial_run_id": mejor["run_id"],
+                    }
+                    os.makedirs(output_model_dir, exist_ok=True)
+                    config_path = modulo.guardar_configuracion_modelo(config, output_model_dir, nombre)
+                    mlflow.log_artifact(config_path)
+                    mlflow.log_params({f"best_{param}": valor for param, valor in mejor["config"].items()})
+                    mlflow.log_metric("best_val_loss", mejor["val_loss"])
+                    logging.info(f"{nombre}: mejor configuracion {mejor['config']} (val_loss {mejor['val_loss']:.5f})")
+                    mejores[nombre] = config
+    finally:
+        for bloque in bloques:
+            bloque.close()
+            bloque.unlink()
+    return mejores
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Busqueda de hiperparametros del LSTM con successive halving")
+    parser.add_argument("--input", default=TABLA_DIARIA_PATH)
+    parser.add_argument("--output-dir", default="models")
+    parser.add_argument("--trials", type=int, default=BUSQUEDA_TRIALS)
+    parser.add_argument("--workers", type=int, default=BUSQUEDA_WORKERS)
+    parser.add_argument("--epocas-min", type=int, default=BUSQUEDA_EPOCAS_MIN)
+    parser.add_argument("--epocas-max", type=int, default=BUSQUEDA_EPOCAS_MAX)
+    parser.add_argument("--eta", type=int, default=BUSQUEDA_ETA)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    buscar_hiperparametros(args.input, args.output_dir, args.trials, args.workers, args.epocas_min,
+                           args.epocas_max, args.eta, semilla=args.semilla)
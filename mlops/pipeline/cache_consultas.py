@@ -0,0 +1,133 @@
+# pipeline/cache_consultas.py
+
+import os
+import re
+import json
+import time
+import glob
+import hashlib
+import logging
+import pandas as pd
+
+#Cache local de resultados de consultas (Parquet + metadatos JSON por entrada)
+CACHE_DIR = os.getenv("QUERY_CACHE_DIR", "data/cache/consultas")
+CACHE_TTL_HORAS = float(os.getenv("QUERY_CACHE_TTL_HORAS", "24"))
+CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "2048"))
+
+#Hash del ultimo contenido subido a MLflow por artefacto
+ARTEFACTOS_PATH = os.path.join(os.path.dirname(CACHE_DIR), "artefactos_subidos.json")
+
+
+def normalizar_sql(sql: str) -> str:
+    #Espacios y saltos de linea no cambian la consulta
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def clave_cache(sql: str, params: dict, sonda: dict) -> str:
+    """
+    Huella de la consulta: SQL normalizado + parametros + sonda de frescura
+    (p.ej. MAX(con_clave) y COUNT(*)). Si la tabla cambia, cambia la clave.
+    """
+    contenido = json.dumps(
+        {"sql": normalizar_sql(sql), "params": params, "sonda": sonda},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def _rutas(clave: str):
+    return os.path.join(CACHE_DIR, f"{clave}.parquet"), os.path.join(CACHE_DIR, f"{clave}.json")
+
+
+def leer_cache(clave: str, ttl_horas: float = CACHE_TTL_HORAS):
+    """
+    Devuelve el DataFrame cacheado o None si no existe o ha caducado
+    """
+    datos, meta = _rutas(clave)
+    if not (os.path.exists(datos) and os.path.exists(meta)):
+        return None
+    with open(meta, "r", encoding="utf-8") as f:
+        info = json.load(f)
+    if time.time() - info["creado"] > ttl_horas * 3600:
+        logging.info(f"Entrada de cache caducada: {clave[:12]}")
+        eliminar_entrada(clave)
+        return None
+    #Marcar uso reciente para la politica de expulsion por tamaño
+    os.utime(meta, None)
+    logging.info(f"Resultado servido desde cache local: {clave[:12]} ({info['filas']} filas)")
+    return pd.read_parquet(datos)
+
+
+def guardar_cache(clave: str, df: pd.DataFrame, params: dict = None) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    datos, meta = _rutas(clave)
+    df.to_parquet(datos, index=False)
+    with open(meta, "w", encoding="utf-8") as f:
+        json.dump({"creado": time.time(), "filas": len(df), "params": params}, f, default=str)
+    purgar_cache()
+
+
+def eliminar_entrada(clave: str) -> None:
+    for ruta in _rutas(clave):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def purgar_cache(ttl_horas: float = CACHE_TTL_HORAS, max_mb: float = CACHE_MAX_MB) -> None:
+    """
+    1) Elimina las entradas caducadas por TTL
+    2) Si el total supera max_mb, elimina las menos usadas recientemente
+    """
+    entradas = []
+    for meta in glob.glob(os.path.join(CACHE_DIR, "*.json")):
+        clave = os.path.splitext(os.path.basename(meta))[0]
+        datos = _rutas(clave)[0]
+        with open(meta, "r", encoding="utf-8") as f:
+            creado = json.load(f)["creado"]
+        if time.time() - creado > ttl_horas * 3600 or not os.path.exists(datos):
+            eliminar_entrada(clave)
+            continue
+        entradas.append((os.path.getmtime(meta), os.path.getsize(datos), clave))
+
+    total = sum(tam for _, tam, _ in entradas)
+    for _, tam, clave in sorted(entradas):
+        if total <= max_mb * 1024 * 1024:
+            break
+        logging.info(f"Cache por encima de {max_mb} MB: se elimina {clave[:12]}")
+        eliminar_entrada(clave)
+        total -= tam
+
+
+def hash_contenido(df: pd.DataFrame, hasher=None):
+    """
+    Hash del contenido de un DataFrame (independiente del formato en disco).
+    Si se pasa un hasher se actualiza (para acumular bloques en streaming).
+    """
+    hasher = hasher or hashlib.sha256()
+    hasher.update(",".join(df.columns).encode("utf-8"))
+    hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return hasher
+
+
+def artefacto_sin_cambios(nombre: str, hash_actual: str):
+    """
+    Devuelve el run_id de la ultima subida si el contenido no ha cambiado, o None
+    """
+    if not os.path.exists(ARTEFACTOS_PATH):
+        return None
+    with open(ARTEFACTOS_PATH, "r", encoding="utf-8") as f:
+        subido = json.load(f).get(nombre)
+    if subido and subido["hash"] == hash_actual:
+        return subido["run_id"]
+    return None
+
+
+def registrar_artefacto(nombre: str, hash_actual: str, run_id: str) -> None:
+    registro = {}
+    if os.path.exists(ARTEFACTOS_PATH):
+        with open(ARTEFACTOS_PATH, "r", encoding="utf-8") as f:
+            registro = json.load(f)
+    registro[nombre] = {"hash": hash_actual, "run_id": run_id}
+    os.makedirs(os.path.dirname(ARTEFACTOS_PATH), exist_ok=True)
+    with open(ARTEFACTOS_PATH, "w", encoding="utf-8") as f:
+        json.dump(registro, f)
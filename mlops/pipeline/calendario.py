@@ -0,0 +1,131 @@
+# pipeline/calendario.py
+
+import os
+import json
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+#Dimension calendario: una fila por fecha con festivos, ventanas de Eid y estacion.
+#Solo depende de la fecha, asi que se calcula una vez por dia y se une por fecha
+#(entrenamiento) o se consulta (serving). Las codificaciones ciclicas y one-hot
+#estan en features.py
+
+#Fuente de festivos configurable (JSON con fechas por tipo de festivo)
+CALENDARIO_FESTIVOS = os.getenv(
+    "CALENDARIO_FESTIVOS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config", "festivos.json")
+)
+
+#Dias antes / despues de Eid que se marcan como ventana (_prev / _post)
+VENTANA_EID_DIAS = 7
+
+#Columnas por fecha que añade preprocessing_01 a cada billete
+COLUMNAS_DIA = [
+    "day_of_week", "is_weekend", "month", "week_of_year", "season",
+    "is_festivo_nacional", "is_festivo_local",
+    "is_eid_aladha", "is_eid_aladha_prev", "is_eid_aladha_post",
+    "is_eid_alfitr", "is_eid_alfitr_prev", "is_eid_alfitr_post",
+    "is_mawlid_nabi"
+]
+
+
+def cargar_festivos(path: str = CALENDARIO_FESTIVOS) -> dict:
+    """
+    Lee la fuente de festivos. Cada clave admite una lista de fechas o un
+    diccionario fecha -> nombre del festivo.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        fuente = json.load(f)
+    return {tipo: pd.DatetimeIndex(pd.to_datetime(list(fechas))) for tipo, fechas in fuente.items()}
+
+
+def marcar_ventana(fechas: pd.Series, eventos: pd.DatetimeIndex, desde: int, hasta: int) -> np.ndarray:
+    #1 si la fecha cae en [evento + desde, evento + hasta] para algun evento
+    marca = np.zeros(len(fechas), dtype=bool)
+    for evento in eventos:
+        marca |= ((fechas >= evento + pd.Timedelta(days=desde)) &
+                  (fechas <= evento + pd.Timedelta(days=hasta))).to_numpy()
+    return marca.astype("int64")
+
+
+@lru_cache(maxsize=8)
+def _tabla_calendario(anio_inicio: int, anio_fin: int, path: str) -> pd.DataFrame:
+    festivos = cargar_festivos(path)
+    fechas = pd.Series(pd.date_range(f"{anio_inicio}-01-01", f"{anio_fin}-12-31", freq="D"))
+
+    sin_festivos = sorted(
+        set(range(anio_inicio, anio_fin + 1)) - set(festivos.get("festivos_nacionales", pd.DatetimeIndex([])).year)
+    )
+    if sin_festivos:
+        logging.warning(f"Sin festivos configurados en {path} para los años {sin_festivos}: quedan a 0")
+
+    cal = pd.DataFrame({"fecha": fechas})
+    cal["day_of_week"] = fechas.dt.dayofweek + 1
+    cal["is_weekend"] = cal["day_of_week"].isin([6, 7]).astype("int64")
+    cal["month"] = fechas.dt.month
+    cal["week_of_year"] = fechas.dt.isocalendar().week.astype("int64")
+    #1 invierno, 2 primavera, 3 verano, 4 otoño
+    cal["season"] = (cal["month"] % 12) // 3 + 1
+
+    vacio = pd.DatetimeIndex([])
+    cal["is_festivo_nacional"] = fechas.isin(festivos.get("festivos_nacionales", vacio)).astype("int64")
+    cal["is_festivo_local"] = fechas.isin(festivos.get("festivos_locales", vacio)).astype("int64")
+    for eid in ["eid_aladha", "eid_alfitr"]:
+        eventos = festivos.get(eid, vacio)
+        cal[f"is_{eid}"] = fechas.isin(eventos).astype("int64")
+        cal[f"is_{eid}_prev"] = marcar_ventana(fechas, eventos, -VENTANA_EID_DIAS, -1)
+        cal[f"is_{eid}_post"] = marcar_ventana(fechas, eventos, 1, VENTANA_EID_DIAS)
+    cal["is_mawlid_nabi"] = fechas.isin(festivos.get("mawlid_nabi", vacio)).astype("int64")
+
+    return cal
+
+
+def tabla_calendario(anio_inicio: int, anio_fin: int, path: str = CALENDARIO_FESTIVOS) -> pd.DataFrame:
+    """
+    Devuelve la dimension calendario (una fila por dia) entre dos años, ambos incluidos
+    """
+    return _tabla_calendario(int(anio_inicio), int(anio_fin), path).copy()
+
+
+def calendario_fechas(fechas, path: str = CALENDARIO_FESTIVOS) -> pd.DataFrame:
+    """
+    Filas del calendario para las fechas indicadas (en el mismo orden), p.ej. para serving
+    """
+    dias = pd.DatetimeIndex(pd.to_datetime(fechas)).normalize()
+    cal = _tabla_calendario(int(dias.year.min()), int(dias.year.max()), path)
+    return cal.set_index("fecha").reindex(dias).rename_axis("fecha").reset_index()
+
+
+def unir_calendario(df: pd.DataFrame, fecha_col: str = "con_fecha", columnas=None) -> pd.DataFrame:
+    """
+    Añade las columnas del calendario a cada fila con un unico join por fecha
+    """
+    columnas = columnas or COLUMNAS_DIA
+    dias = df[fecha_col].dt.normalize()
+    #Sin fechas (p.ej. ninguna fila tras los filtros) basta el calendario de un año: solo aporta tipos
+    anios = (dias.min().year, dias.max().year) if dias.notna().any() else (pd.Timestamp.now().year,) * 2
+    cal = tabla_calendario(*anios)
+    cal = cal[["fecha"] + columnas].set_index("fecha")
+    filas = cal.reindex(dias.to_numpy())
+    for col in columnas:
+        df[col] = filas[col].to_numpy()
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera la dimension calendario")
+    parser.add_argument("--desde", type=int, default=2022, help="Primer año")
+    parser.add_argument("--hasta", type=int, default=2025, help="Ultimo año")
+    parser.add_argument("--festivos", default=CALENDARIO_FESTIVOS, help="JSON con la fuente de festivos")
+    parser.add_argument("--salida", default="data/processed/calendario.csv")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    calendario = tabla_calendario(args.desde, args.hasta, args.festivos)
+    os.makedirs(os.path.dirname(args.salida), exist_ok=True)
+    calendario.to_csv(args.salida, index=False)
+    print(f"Calendario guardado en {args.salida} ({len(calendario)} dias)")
@@ -0,0 +1,120 @@
+# pipeline/entrada_tf.py
+
+import os
+import time
+import hashlib
+import logging
+import numpy as np
+import tensorflow as tf
+from secuencias import objetivos
+#resource solo existe en Unix (en Windows no hay pico de memoria)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+#Entrada alternativa del entrenamiento (ENTRADA_ENTRENAMIENTO=tf_data): en lugar de pasar
+#a model.fit los arrays de ventanas, un tf.data que recorta cada ventana en el grafo a
+#partir de la matriz de variables, la cachea en un fichero local y prepara los lotes
+#siguientes (prefetch) mientras se entrena el actual
+ENTRADA_ENTRENAMIENTO = os.getenv("ENTRADA_ENTRENAMIENTO", "numpy")
+ENTRADAS = ("numpy", "tf_data")
+#Buffer de barajado del entrenamiento (0: todas las ventanas, como model.fit con arrays)
+SHUFFLE_BUFFER = int(os.getenv("SHUFFLE_BUFFER", "0"))
+#Ficheros de cache() de tf.data (vacio: cache en memoria)
+TF_CACHE_DIR = os.getenv("TF_CACHE_DIR", "data/cache/tf_data")
+
+
+def huella_ventanas(matriz: np.ndarray, serie: np.ndarray, *parametros) -> str:
+    #Nombre del fichero de cache: cambia si cambian los datos o el ventaneo (no se reutiliza una cache vieja)
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(matriz).tobytes())
+    h.update(np.ascontiguousarray(serie).tobytes())
+    h.update(repr(parametros).encode())
+    return h.hexdigest()[:16]
+
+
+def dataset_ventanas(matriz: np.ndarray, serie: np.ndarray, lookback: int, stride: int = 1,
+                     inicio: int = 0, fin: int = None, batch_size: int = 32, shuffle_buffer: int = None,
+                     cache_dir: str = TF_CACHE_DIR, semilla: int = None) -> tf.data.Dataset:
+    """
+    Las ventanas [inicio, fin) de secuencias.ventanas / objetivos como tf.data:
+    1) La matriz y el target se copian una vez al grafo como constantes
+    2) Cada elemento es el numero de ventana; el recorte se hace en el grafo (map paralelo)
+    3) cache(): en disco si cache_dir, de modo que el ventaneo se hace solo la primera epoca
+    4) shuffle con shuffle_buffer (None: sin barajar, 0: todas las ventanas), batch y prefetch
+    """
+    fin = len(objetivos(serie, lookback, stride)) if fin is None else fin
+    matriz_tf = tf.constant(matriz, dtype=tf.float32)
+    serie_tf = tf.constant(serie)
+
+    def ventana(k):
+        i = k * stride
+        return matriz_tf[i:i + lookback], serie_tf[i + lookback]
+
+    ds = tf.data.Dataset.range(inicio, fin).map(ventana, num_parallel_calls=tf.data.AUTOTUNE)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        nombre = huella_ventanas(matriz, serie, lookback, stride, inicio, fin)
+        ds = ds.cache(os.path.join(cache_dir, nombre))
+    else:
+        ds = ds.cache()
+    if shuffle_buffer is not None:
+        ds = ds.shuffle(shuffle_buffer or max(fin - inicio, 1), seed=semilla, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def datos_fit(entrada: str, matriz: np.ndarray, serie: np.ndarray, split, lookback: int, stride: int = 1,
+              batch_size: int = 32, shuffle_buffer: int = SHUFFLE_BUFFER, cache_dir: str = TF_CACHE_DIR) -> dict:
+    """
+    Argumentos de entrada de model.fit para los splits de split_temporal:
+    - numpy: los arrays de ventanas (Keras los copia a tensores y baraja cada epoca)
+    - tf_data: datasets de entrenamiento (barajado) y validacion sobre los mismos rangos
+    """
+    if entrada not in ENTRADAS:
+        raise ValueError(f"Entrada de entrenamiento desconocida: {entrada} (opciones: {list(ENTRADAS)})")
+    (X_tr, y_tr), (X_val, y_val) = split[0], split[1]
+    if entrada == "numpy":
+        return {"x": X_tr, "y": y_tr, "validation_data": (X_val, y_val), "batch_size": batch_size}
+    n_tr, n_val = len(X_tr), len(X_val)
+    return {
+        "x": dataset_ventanas(matriz, serie, lookback, stride, 0, n_tr, batch_size, shuffle_buffer, cache_dir),
+        "validation_data": dataset_ventanas(matriz, serie, lookback, stride, n_tr, n_tr + n_val, batch_size,
+                                            None, cache_dir),
+    }
+
+
+def pico_memoria_mb():
+    #Pico de memoria residente del proceso (ru_maxrss va en KB en Linux); None sin resource
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class MedidorEpocas(tf.keras.callbacks.Callback):
+    """
+    Tiempo de cada epoca y pico de memoria del proceso (si el sistema lo da), para
+    comparar las entradas.
+    La primera epoca se separa: incluye el trazado del grafo y el llenado de la cache
+    """
+
+    def on_train_begin(self, logs=None):
+        self.tiempos = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.inicio = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.tiempos.append(time.perf_counter() - self.inicio)
+
+    def resumen(self) -> dict:
+        resto = self.tiempos[1:] or self.tiempos
+        resumen = {
+            "epoch_time_s_first": round(self.tiempos[0], 3) if self.tiempos else 0.0,
+            "epoch_time_s_mean": round(float(np.mean(resto)), 3) if resto else 0.0,
+        }
+        pico = pico_memoria_mb()
+        if pico is not None:
+            resumen["peak_rss_mb"] = pico
+        logging.info(f"Entrenamiento: {len(self.tiempos)} epocas, {resumen}")
+        return resumen
@@ -0,0 +1,115 @@
+# pipeline/entrenamiento_paralelo.py
+
+import os
+import time
+import logging
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import mlflow
+
+#Entrenamiento de los modelos en paralelo (ENTRENAMIENTO_PARALELO=1): los modelos de
+#pasajeros y vehiculos no comparten estado, asi que cada uno se entrena en su proceso,
+#fijado a un bloque de CPUs y con su presupuesto de hilos de TensorFlow, para que no
+#compitan por los mismos nucleos
+ENTRENAMIENTO_PARALELO = os.getenv("ENTRENAMIENTO_PARALELO", "0") == "1"
+#Hilos intra-op por proceso (0: las CPUs de su bloque) e inter-op
+HILOS_INTRA_OP = int(os.getenv("HILOS_INTRA_OP", "0"))
+HILOS_INTER_OP = int(os.getenv("HILOS_INTER_OP", "2"))
+#Fijar cada proceso a su bloque de CPUs (solo Linux)
+FIJAR_CPUS = os.getenv("FIJAR_CPUS", "1") == "1"
+
+
+def cpus_disponibles() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def repartir_cpus(procesos: int) -> list:
+    #Bloques contiguos de CPUs, uno por proceso (si no hay CPUs para todos, comparten todas)
+    cpus = cpus_disponibles()
+    n = len(cpus) // procesos
+    return [cpus[i * n:(i + 1) * n] or cpus for i in range(procesos)]
+
+
+def configurar_hilos(cpus: list, intra_op: int, inter_op: int) -> None:
+    """
+    Presupuesto de hilos del proceso. Se aplica antes de cargar TensorFlow:
+    1) Fija el proceso a sus CPUs
+    2) Variables de entorno de OpenMP / TensorFlow (las leen al inicializarse)
+    3) Configuracion de hilos de TensorFlow, antes de crear ninguna operacion
+    """
+    if FIJAR_CPUS and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    os.environ["OMP_NUM_THREADS"] = str(intra_op)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra_op)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+
+def cargar_modulo(ruta: str):
+    #El modulo de entrenamiento se carga por ruta: "(pv)lstm_training.py" no es importable por nombre
+    spec = importlib.util.spec_from_file_location("modulo_entrenamiento", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def entrenar_en_proceso(ruta_modulo: str, nombre: str, df, config: dict, parametros: dict,
+                        run_id: str, cpus: list, intra_op: int, inter_op: int) -> dict:
+    #Proceso de un modelo: hilos y CPUs, y entrenamiento dentro de su run (verbose=2: una linea por epoca)
+    configurar_hilos(cpus, intra_op, inter_op)
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - {nombre} - %(levelname)s - %(message)s')
+    modulo = cargar_modulo(ruta_modulo)
+    return modulo.entrenar_modelo(nombre, df, config, run_id=run_id, verbose=2, **parametros)
+
+
+def entrenar_en_paralelo(ruta_modulo: str, modelos: dict, df, configs: dict, parametros: dict) -> dict:
+    """
+    Entrena cada modelo de 'modelos' (nombre -> run_name) en su proceso, con su
+    configuracion y parametros (configs / parametros: nombre -> dict):
+    1) Crea el run de MLflow de cada modelo, con el mismo nombre que en secuencial
+    2) Reparte las CPUs en bloques y fija los hilos intra/inter-op de cada proceso
+    3) Lanza un proceso spawn por modelo (TensorFlow no admite fork) que entrena,
+       registra metricas y artefactos en su run
+    4) Recoge las metricas; si un modelo falla, los runs sin resultado quedan FAILED
+       y se relanza el error
+    Devuelve nombre -> metricas, como el entrenamiento secuencial.
+    """
+    cliente = mlflow.MlflowClient()
+    bloques = repartir_cpus(len(modelos))
+    runs = {}
+    for (nombre, spec), cpus in zip(modelos.items(), bloques):
+        run = mlflow.start_run(run_name=spec["run_name"])
+        mlflow.set_tag("entrenamiento", "paralelo")
+        mlflow.log_params({"cpus": ",".join(map(str, cpus)), "hilos_intra_op": HILOS_INTRA_OP or len(cpus),
+                           "hilos_inter_op": HILOS_INTER_OP})
+        mlflow.end_run()
+        runs[nombre] = (run.info.run_id, cpus)
+
+    inicio = time.perf_counter()
+    resultados = {}
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(modelos), mp_context=contexto) as pool:
+        futuros = {
+            nombre: pool.submit(entrenar_en_proceso, ruta_modulo, nombre, df, configs[nombre], parametros[nombre],
+                                run_id, cpus, HILOS_INTRA_OP or len(cpus), HILOS_INTER_OP)
+            for nombre, (run_id, cpus) in runs.items()
+        }
+        try:
+            for nombre, futuro in futuros.items():
+                resultados[nombre] = futuro.result()
+        except Exception:
+            #Los runs sin resultado (el que fallo y los que no llegaron a terminar) quedan FAILED
+            for nombre, (run_id, _) in runs.items():
+                if nombre not in resultados:
+                    cliente.set_terminated(run_id, status="FAILED")
+            raise
+    duracion = time.perf_counter() - inicio
+    for run_id, _ in runs.values():
+        cliente.log_metric(run_id, "training_wall_clock_s", round(duracion, 1))
+    logging.info(f"Entrenamiento en paralelo de {list(modelos)} en {duracion:.1f} s (CPUs: {bloques})")
+    return resultados
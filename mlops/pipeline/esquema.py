@@ -0,0 +1,334 @@
+# pipeline/esquema.py
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+#Columnas disponibles en la tabla 'contador'
+COLUMNAS_CONTADOR = [
+    "con_clave", "con_bacoope", "con_fecha", "con_tipo", "con_codigo",
+    "con_naviera", "con_dni", "con_tipobillete", "con_cupon", "con_trayecto",
+    "con_shortcomp", "con_dateticket", "con_acredita", "con_nombre",
+    "con_intercambiable", "con_incidencia"
+]
+
+#Columnas que añade la ingesta a partir de 'barcoope' y las capacidades
+COLUMNAS_BUQUE = ["buq_nombre", "capacidad_pasajeros", "capacidad_vehiculos"]
+
+#Columnas que necesita la propia ingesta (marca de agua / identificador de fila)
+COLUMNAS_INGESTA = ["con_clave"]
+
+#Columnas de entrada que usa cada etapa. La ingesta y los lectores de ficheros
+#se construyen a partir de la union, de modo que no se extrae ni se guarda nada
+#que ninguna etapa consuma (p.ej. con_dni, con_nombre).
+#preprocessing_02 tambien lee las columnas que solo pasan a su salida publicada
+#(dataset_empresa_03_pos_EDA_2): con_intercambiable, capacidades, totales,
+#ocupacion y diferencia_min. preprocessing_01 lee con_intercambiable para ello
+COLUMNAS_POR_ETAPA = {
+    "preprocessing_01": [
+        "con_bacoope", "con_fecha", "con_tipobillete", "con_codigo", "con_cupon",
+        "con_dateticket", "con_intercambiable", "con_incidencia",
+        "buq_nombre", "capacidad_pasajeros", "capacidad_vehiculos"
+    ],
+    "preprocessing_02": [
+        "con_fecha", "con_dateticket", "con_tipobillete", "con_intercambiable",
+        "capacidad_pasajeros", "capacidad_vehiculos", "diferencia_min",
+        "total_pasajeros", "total_vehiculos", "porc_ocupacion_pasajeros", "porc_ocupacion_vehiculos",
+        "day_of_week", "month", "week_of_year", "season", "anio_embarque",
+        "hora_embarque", "is_weekend",
+        "is_festivo_nacional", "is_festivo_local",
+        "is_eid_aladha", "is_eid_aladha_prev", "is_eid_aladha_post",
+        "is_eid_alfitr", "is_eid_alfitr_prev", "is_eid_alfitr_post",
+        "is_mawlid_nabi"
+    ],
+    "training": [
+        "fecha_embarque", "tipo_agrupacion",
+        "dia_del_anio_sin", "dia_del_anio_cos",
+        "dia_embarque_sin", "dia_embarque_cos",
+        "hora_embarque_sin", "hora_embarque_cos",
+        "is_weekend", "mes_embarque_sin", "mes_embarque_cos",
+        "week_of_year_sin", "week_of_year_cos",
+        "season_1", "season_2", "season_3", "season_4",
+        "is_festivo_nacional", "is_festivo_local",
+        "is_eid_aladha", "is_eid_aladha_prev", "is_eid_aladha_post",
+        "is_eid_alfitr", "is_eid_alfitr_prev", "is_eid_alfitr_post",
+        "is_mawlid_nabi",
+        "is_monday", "is_tuesday", "is_wednesday", "is_thursday",
+        "is_friday", "is_saturday", "is_sunday",
+        "weekday_sin", "weekday_cos"
+    ],
+}
+
+
+def columnas_requeridas(etapas=None) -> list:
+    """
+    Union (sin duplicados, en orden de aparicion) de las columnas de entrada
+    de las etapas indicadas (todas por defecto)
+    """
+    etapas = etapas or list(COLUMNAS_POR_ETAPA)
+    columnas = []
+    for etapa in etapas:
+        for col in COLUMNAS_POR_ETAPA[etapa]:
+            if col not in columnas:
+                columnas.append(col)
+    return columnas
+
+
+def columnas_contador(etapas=None) -> list:
+    """
+    Columnas de 'contador' que hay que extraer: las que usa la ingesta mas las
+    que consume alguna etapa, en el orden de la tabla
+    """
+    requeridas = set(COLUMNAS_INGESTA) | set(columnas_requeridas(etapas))
+    return [col for col in COLUMNAS_CONTADOR if col in requeridas]
+
+
+#Dominio de con_tipobillete y su clasificacion (pasajero / vehiculo / excluido)
+TIPOS_PASAJEROS = ('1', '2', '3')
+TIPOS_VEHICULOS = ('0', '5', '6', '7', '8', '9')
+TIPOS_EXCLUIDOS = ('4', 'M')
+DOMINIO_TIPOBILLETE = ('0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'M')
+
+#Clases de billete para informes y agrupaciones
+CLASES_BILLETE = ("Pasajero", "Vehículo", "Otro")
+
+#Deduplicacion de billetes: un cupon re-escaneado aparece varias veces y solo cuenta
+#su ultima lectura. La clave compuesta se guarda como hash de 64 bits (clave_billete),
+#calculado una vez en la ingesta
+CLAVE_DUPLICADOS = ['con_codigo', 'con_cupon', 'con_tipobillete']
+COLUMNA_CLAVE = "clave_billete"
+#Columnas del raw que solo se leen para deduplicar (no pasan a la salida de preprocessing_01)
+COLUMNAS_DEDUPLICACION = ["con_clave", COLUMNA_CLAVE]
+
+
+def clave_billete(df: pd.DataFrame) -> np.ndarray:
+    """
+    Clave de 64 bits de CLAVE_DUPLICADOS: hash de los valores como texto, de modo
+    que da lo mismo con object, string o categoria (y con nulos de cualquier tipo)
+    """
+    valores = df[CLAVE_DUPLICADOS].astype("string")
+    return pd.util.hash_pandas_object(valores, index=False).to_numpy().view("int64")
+
+
+def incluir_clave_billete(df: pd.DataFrame) -> pd.DataFrame:
+    #La ingesta guarda la clave con cada fila (si se extraen sus columnas)
+    if all(col in df.columns for col in CLAVE_DUPLICADOS):
+        df[COLUMNA_CLAVE] = clave_billete(df)
+    return df
+
+
+def es_billete_valido(df: pd.DataFrame) -> np.ndarray:
+    #Filtros por fila de preprocessing_01, previos a deduplicar: ni DESEMBARCADO ni tipos excluidos
+    valido = ~df["con_tipobillete"].isin(TIPOS_EXCLUIDOS).to_numpy()
+    if "con_incidencia" in df.columns:
+        valido &= ~df["con_incidencia"].isin(["DESEMBARCADO"]).to_numpy()
+    return valido
+
+
+def clasificar_billetes(tipobillete: pd.Series) -> pd.Series:
+    """
+    Clase de cada billete (Pasajero / Vehículo / Otro) como categorica, con un
+    unico mapeo vectorizado: se clasifica cada categoria de con_tipobillete una
+    vez y se indexa con los codigos de las filas (los nulos quedan como Otro)
+    """
+    tipobillete = tipobillete.astype("category")
+    clases = [
+        0 if codigo in TIPOS_PASAJEROS else 1 if codigo in TIPOS_VEHICULOS else 2
+        for codigo in tipobillete.cat.categories
+    ]
+    #El codigo -1 (nulo) indexa el ultimo elemento: Otro
+    por_codigo = np.array(clases + [2], dtype="int8")
+    codigos = por_codigo[tipobillete.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=list(CLASES_BILLETE)),
+                     index=tipobillete.index, name=tipobillete.name)
+
+
+#Formatos exactos de las fechas tal y como las escriben la ingesta y to_csv
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M:%S"
+FORMATO_FECHA = "%Y-%m-%d"
+
+#Contrato de tipos del dataset de billetes (raw y procesados). Cada fichero se
+#parsea una sola vez con aplicar_esquema y las etapas reciben columnas ya tipadas
+#  dtype: tipo pandas final
+#  formato: formato exacto de las columnas de fecha
+#  dominio: valores esperados de las categoricas (los no previstos se avisan y se conservan)
+ESQUEMA_BILLETES = {
+    "con_clave": {"dtype": "Int64"},
+    "con_bacoope": {"dtype": "Int64"},
+    "con_fecha": {"dtype": "datetime64[ns]", "formato": FORMATO_FECHA_HORA},
+    "con_tipo": {"dtype": "category"},
+    "con_codigo": {"dtype": "string"},
+    "con_naviera": {"dtype": "category"},
+    "con_dni": {"dtype": "string"},
+    "con_tipobillete": {"dtype": "category", "dominio": list(DOMINIO_TIPOBILLETE)},
+    "con_cupon": {"dtype": "string"},
+    "con_trayecto": {"dtype": "category"},
+    "con_shortcomp": {"dtype": "string"},
+    "con_dateticket": {"dtype": "datetime64[ns]", "formato": FORMATO_FECHA_HORA},
+    "con_acredita": {"dtype": "string"},
+    "con_nombre": {"dtype": "string"},
+    "con_intercambiable": {"dtype": "Int64"},
+    "con_incidencia": {"dtype": "category", "dominio": ["DESEMBARCADO"]},
+    "buq_nombre": {"dtype": "category"},
+    "capacidad_pasajeros": {"dtype": "Int64"},
+    "capacidad_vehiculos": {"dtype": "Int64"},
+    "fecha_embarque": {"dtype": "datetime64[ns]", "formato": FORMATO_FECHA},
+}
+
+
+def dtypes_lectura(columnas=None) -> dict:
+    """
+    dtype para read_csv: las columnas de texto se leen como cadena (sin inferir
+    enteros en con_tipobillete, con_cupon...) y las fechas se dejan para aplicar_esquema
+    """
+    dtypes = {}
+    for col, spec in ESQUEMA_BILLETES.items():
+        if columnas is not None and col not in columnas:
+            continue
+        if spec["dtype"] in ("category", "string"):
+            dtypes[col] = "string"
+        elif spec["dtype"] == "Int64":
+            dtypes[col] = "Int64"
+    return dtypes
+
+
+def parsear_fecha(serie: pd.Series, formato: str) -> pd.Series:
+    """
+    Parsea con el formato exacto (sin inferencia por fila). Si algun valor no
+    encaja se reintenta solo sobre esos valores como ISO8601 y se avisa.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    fechas = pd.to_datetime(serie, format=formato, errors="coerce")
+    fallidas = fechas.isna() & serie.notna()
+    if fallidas.any():
+        logging.warning(f"{serie.name}: {fallidas.sum()} valores sin formato {formato}, se parsean como ISO8601")
+        fechas[fallidas] = pd.to_datetime(serie[fallidas], format="ISO8601", errors="coerce")
+    return fechas
+
+
+def aplicar_esquema(df: pd.DataFrame, esquema: dict = None) -> pd.DataFrame:
+    """
+    Tipa una sola vez las columnas presentes segun el esquema:
+    1) Fechas con su formato exacto
+    2) Categoricas con su dominio (los valores no previstos se añaden y se avisan)
+    3) Enteros nulables y cadenas
+    """
+    esquema = esquema or ESQUEMA_BILLETES
+    for col, spec in esquema.items():
+        if col not in df.columns:
+            continue
+        if spec["dtype"].startswith("datetime64"):
+            df[col] = parsear_fecha(df[col], spec["formato"])
+        elif spec["dtype"] == "category":
+            #El Parquet ya trae categoricas (diccionario); el CSV llega como cadena
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                valores = df[col]
+                presentes = set(valores.cat.categories)
+            else:
+                valores = df[col].astype("string")
+                presentes = set(valores.dropna().unique())
+            dominio = list(spec.get("dominio", []))
+            if dominio:
+                fuera = sorted(presentes - set(dominio))
+                if fuera:
+                    logging.warning(f"{col}: valores fuera del dominio {fuera}")
+                dominio += fuera
+            else:
+                dominio = sorted(presentes)
+            if isinstance(valores.dtype, pd.CategoricalDtype):
+                df[col] = valores.cat.set_categories(dominio)
+            else:
+                df[col] = pd.Categorical(valores, categories=dominio)
+        elif str(df[col].dtype) != spec["dtype"]:
+            df[col] = df[col].astype(spec["dtype"])
+    return df
+
+
+#Disposicion compacta de las columnas derivadas (salidas de preprocessing_01/02 y tablas
+#de entrenamiento): indicadores 0/1 en int8, componentes de fecha y conteos en enteros
+#pequeños y codificaciones seno/coseno en float32 (el modelo ya trabaja en float32).
+#Las columnas que no aparecen conservan su tipo
+TIPOS_COMPACTOS = {
+    "day_of_week": "int8", "month": "int8", "season": "int8", "week_of_year": "int8",
+    "hora_embarque": "int8", "dia_embarque": "int8", "mes_embarque": "int8",
+    "dia_del_anio": "int16", "anio_embarque": "int16", "anio": "int16",
+    "tipo_agrupacion": "int8", "agrupacion_billete": "int8",
+    "capacidad_pasajeros": "int32", "capacidad_vehiculos": "int32",
+    "total_pasajeros": "int32", "total_vehiculos": "int32",
+}
+#Indicadores 0/1 por prefijo (calendario, one-hot de estacion, año y dia de la semana)
+PREFIJOS_INDICADOR = ("is_", "season_", "anio_")
+
+
+def dtype_compacto(col: str):
+    #Tipo compacto de una columna derivada (None: se deja como esta)
+    if col in TIPOS_COMPACTOS:
+        return TIPOS_COMPACTOS[col]
+    if col.endswith(("_sin", "_cos")):
+        return "float32"
+    if col.startswith(PREFIJOS_INDICADOR):
+        return "int8"
+    return None
+
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica la disposicion compacta en el sitio. Las columnas enteras con nulos
+    (p.ej. totales sin salida, que quedan en float) no se tocan, para no cambiar
+    sus valores
+    """
+    for col in df.columns:
+        dtype = dtype_compacto(col)
+        if dtype is None or df[col].dtype == dtype:
+            continue
+        if dtype.startswith("int") and (not pd.api.types.is_numeric_dtype(df[col]) or df[col].isna().any()):
+            continue
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    #Memoria real del DataFrame (incluye cadenas y categorias)
+    return round(df.memory_usage(deep=True).sum() / 2**20, 1)
+
+
+def es_parquet(path: str) -> bool:
+    return str(path).endswith(".parquet")
+
+
+def guardar_tabla(df: pd.DataFrame, path: str) -> str:
+    """
+    Guarda una tabla procesada. En Parquet (por extension) se conservan los tipos
+    compactos, las categoricas y las fechas; en CSV se escribe como hasta ahora
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if es_parquet(path):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    logging.info(f"Tabla {os.path.basename(path)}: {len(df)} filas, {memoria_mb(df)} MB en memoria")
+    return path
+
+
+def columnas_tabla(path: str) -> list:
+    #Columnas de una tabla procesada sin leer sus datos
+    if es_parquet(path):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def leer_tabla(path: str, columnas=None) -> pd.DataFrame:
+    """
+    Lee una tabla procesada (Parquet o CSV) con sus tipos: el Parquet ya los trae;
+    el CSV se tipa con el esquema y la disposicion compacta
+    """
+    if es_parquet(path):
+        presentes = None if columnas is None else [c for c in columnas_tabla(path) if c in columnas]
+        df = pd.read_parquet(path, columns=presentes)
+    else:
+        df = pd.read_csv(path, usecols=None if columnas is None else (lambda c: c in columnas),
+                         dtype=dtypes_lectura(columnas), low_memory=False)
+    return compactar(aplicar_esquema(df))
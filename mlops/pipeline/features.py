@@ -0,0 +1,127 @@
+# pipeline/features.py
+
+import numpy as np
+import pandas as pd
+
+#Especificacion declarativa de las variables de fecha del modelo. Se compila una vez
+#en un kernel vectorizado que usan el entrenamiento (preprocessing_02), el motor DuckDB
+#(como SQL) y el serving (serve_fastapi), de modo que las definiciones no pueden divergir
+#  nombre: prefijo de las columnas (<nombre>_sin / <nombre>_cos en las ciclicas)
+#  fuente: componente de la fecha del que sale (ver FUENTES)
+#  codificacion: "ciclica" (seno y coseno de 2*pi*fuente/periodo) o "one_hot"
+#  periodo: periodo de la ciclica
+#  categorias: valor de la fuente -> columna del one-hot (columnas fijas, haya o no datos)
+ESPECIFICACION_FEATURES = [
+    {"nombre": "season", "fuente": "estacion", "codificacion": "one_hot",
+     "categorias": {1: "season_1", 2: "season_2", 3: "season_3", 4: "season_4"}},
+    {"nombre": "dia_del_anio", "fuente": "dia_del_anio", "codificacion": "ciclica", "periodo": 366},
+    {"nombre": "dia_embarque", "fuente": "dia_semana_iso", "codificacion": "ciclica", "periodo": 7},
+    {"nombre": "hora_embarque", "fuente": "hora", "codificacion": "ciclica", "periodo": 24},
+    {"nombre": "mes_embarque", "fuente": "mes", "codificacion": "ciclica", "periodo": 12},
+    {"nombre": "week_of_year", "fuente": "semana_iso", "codificacion": "ciclica", "periodo": 53},
+    {"nombre": "weekday", "fuente": "dia_semana", "codificacion": "one_hot",
+     "categorias": {0: "is_monday", 1: "is_tuesday", 2: "is_wednesday", 3: "is_thursday",
+                    4: "is_friday", 5: "is_saturday", 6: "is_sunday"}},
+    {"nombre": "weekday", "fuente": "dia_semana", "codificacion": "ciclica", "periodo": 7},
+]
+
+#Componentes de la fecha (sobre un DatetimeIndex) y su equivalente en SQL (DuckDB)
+FUENTES = {
+    "dia_del_anio": lambda f: f.dayofyear,
+    "dia_semana": lambda f: f.dayofweek,                #0 lunes ... 6 domingo
+    "dia_semana_iso": lambda f: f.dayofweek + 1,        #1 lunes ... 7 domingo
+    "hora": lambda f: f.hour,
+    "mes": lambda f: f.month,
+    "semana_iso": lambda f: f.isocalendar().week,
+    "estacion": lambda f: f.month % 12 // 3 + 1,        #1 invierno, 2 primavera, 3 verano, 4 otoño
+}
+FUENTES_SQL = {
+    "dia_del_anio": "dayofyear({})",
+    "dia_semana": "(isodow({}) - 1)",
+    "dia_semana_iso": "isodow({})",
+    "hora": "hour({})",
+    "mes": "month({})",
+    "semana_iso": "weekofyear({})",
+    "estacion": "(month({}) % 12 // 3 + 1)",
+}
+
+
+def validar_especificacion(especificacion: list) -> None:
+    for spec in especificacion:
+        if spec["fuente"] not in FUENTES:
+            raise ValueError(f"{spec['nombre']}: fuente desconocida {spec['fuente']}")
+        if spec["codificacion"] not in ("ciclica", "one_hot"):
+            raise ValueError(f"{spec['nombre']}: codificacion desconocida {spec['codificacion']}")
+
+
+def columnas_features(especificacion: list = None) -> list:
+    """
+    Columnas que genera la especificacion, en orden
+    """
+    columnas = []
+    for spec in especificacion or ESPECIFICACION_FEATURES:
+        if spec["codificacion"] == "ciclica":
+            columnas += [f"{spec['nombre']}_sin", f"{spec['nombre']}_cos"]
+        else:
+            columnas += list(spec["categorias"].values())
+    return columnas
+
+
+def compilar_features(especificacion: list = None):
+    """
+    Compila la especificacion en un kernel fechas -> DataFrame:
+    1) Valida la especificacion y resuelve una sola vez las fuentes que usa
+    2) En cada llamada calcula cada fuente una vez sobre todo el array de fechas
+    3) Aplica cada codificacion como una operacion vectorizada de NumPy
+    Las operaciones siguen el mismo orden que el calculo original (2*pi*x/periodo),
+    asi que el resultado es identico bit a bit.
+    """
+    especificacion = especificacion or ESPECIFICACION_FEATURES
+    validar_especificacion(especificacion)
+    fuentes = list(dict.fromkeys(spec["fuente"] for spec in especificacion))
+    columnas = columnas_features(especificacion)
+
+    def kernel(fechas) -> pd.DataFrame:
+        indice = fechas.index if isinstance(fechas, pd.Series) else None
+        fechas = pd.DatetimeIndex(fechas)
+        #Fuentes como float64 (NaN en fechas nulas)
+        valores = {
+            fuente: pd.Series(FUENTES[fuente](fechas)).to_numpy(dtype="float64", na_value=np.nan)
+            for fuente in fuentes
+        }
+        salida = {}
+        for spec in especificacion:
+            x = valores[spec["fuente"]]
+            if spec["codificacion"] == "ciclica":
+                salida[f"{spec['nombre']}_sin"] = np.sin(2 * np.pi * x / spec["periodo"])
+                salida[f"{spec['nombre']}_cos"] = np.cos(2 * np.pi * x / spec["periodo"])
+            else:
+                for valor, columna in spec["categorias"].items():
+                    salida[columna] = (x == valor).astype("int64")
+        return pd.DataFrame(salida, columns=columnas, index=indice)
+
+    kernel.columnas = columnas
+    return kernel
+
+
+def compilar_sql(columna_fecha: str, especificacion: list = None) -> dict:
+    """
+    La misma especificacion como expresiones SQL (columna -> expresion) sobre una
+    columna TIMESTAMP, para el motor DuckDB
+    """
+    especificacion = especificacion or ESPECIFICACION_FEATURES
+    validar_especificacion(especificacion)
+    expresiones = {}
+    for spec in especificacion:
+        x = FUENTES_SQL[spec["fuente"]].format(columna_fecha)
+        if spec["codificacion"] == "ciclica":
+            expresiones[f"{spec['nombre']}_sin"] = f"sin(2 * pi() * {x} / {spec['periodo']})"
+            expresiones[f"{spec['nombre']}_cos"] = f"cos(2 * pi() * {x} / {spec['periodo']})"
+        else:
+            for valor, col in spec["categorias"].items():
+                expresiones[col] = f"CAST({x} IS NOT DISTINCT FROM {valor} AS BIGINT)"
+    return expresiones
+
+
+#Kernel de la especificacion del modelo
+calcular_features = compilar_features(ESPECIFICACION_FEATURES)
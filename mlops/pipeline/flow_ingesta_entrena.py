@@ -8,9 +8,9 @@ if sys.stdout.encoding is None or sys.stdout.encoding.lower() != "utf-8":
 from prefect import flow, task, get_run_logger
 import mlflow
 import os
-from ingestion import ingest_data
-from preprocessing_01 import run_preprocessing_01
-from preprocessing_02 import run_preprocessing_02
+from ingestion import ingest_data, anios_ingesta
+from preprocessing import run_preprocessing
+from subida_artefactos import esperar_subidas
 from datetime import datetime
 from dotenv import load_dotenv
 import importlib.util
@@ -84,7 +84,9 @@ def import_train_function():
         
         task_logger.info(f"Verificando rutas de modulos: {module_path}, {original_path}")
         
-        if not module_path.exists():
+        #La copia se regenera si no existe o si quedo desfasada respecto al original
+        if not module_path.exists() or (original_path.exists() and
+                                        module_path.read_bytes() != original_path.read_bytes()):
             #Crear un enlace temporal 
             task_logger.info(f"Creando copia temporal de modulo de entrenamiento")
             try:
@@ -92,7 +94,7 @@ def import_train_function():
                     task_logger.error(f"Archivo original no encontrado: {original_path}")
                     raise FileNotFoundError(f"No se encontro el archivo {original_path}")
                     
-                module_path.write_text(original_path.read_text(encoding='utf-8'), encoding='utf-8')
+                module_path.write_bytes(original_path.read_bytes())
                 task_logger.info(f"Modulo temporal creado correctamente: {module_path}")
             except Exception as e:
                 task_logger.error(f"Error al crear modulo temporal: {str(e)}")
@@ -109,16 +111,19 @@ def import_train_function():
         raise
 
 @task(retries=3, retry_delay_seconds=60)
-def task_ingest():
+def task_ingest(incremental: bool = True, full_refresh: bool = False, years: list = None):
     task_logger = get_run_logger()
     task_logger.info("Iniciando ingesta de datos desde la base de datos...")
     task_logger.info(f"Usando MLFLOW_TRACKING_URI: {os.getenv('MLFLOW_TRACKING_URI')}")
     task_logger.info(f"Usando DB_HOST: {os.getenv('DB_HOST')}")
     task_logger.info(f"Usando DB_USER: {os.getenv('DB_USER')}")
     task_logger.info(f"Usando DB_NAME: {os.getenv('DB_NAME')}")
+    #Años de una extraccion completa: los indicados o hasta el año en curso (la incremental no filtra por fecha)
+    years = years or anios_ingesta()
+    task_logger.info(f"Años de la extraccion completa: {years}")
     
     try:
-        ingest_data()
+        ingest_data(years=years, incremental=incremental, full_refresh=full_refresh)
         task_logger.info("Ingesta finalizada. Dataset original generado.")
     except Exception as e:
         task_logger.error(f"Error durante la ingesta: {str(e)}")
@@ -128,18 +133,12 @@ def task_ingest():
         raise
 
 @task(retries=2, retry_delay_seconds=30)
-def task_preprocessing_01():
+def task_preprocessing():
+    #preprocessing_01 + 02 en memoria, sin CSV intermedio
     logger = get_run_logger()
-    logger.info("Ejecutando preprocesamiento 01...")
-    run_preprocessing_01()
-    logger.info("Preprocesamiento 01 finalizado.")
-
-@task(retries=2, retry_delay_seconds=30)
-def task_preprocessing_02():
-    logger = get_run_logger()
-    logger.info("Ejecutando preprocesamiento 02...")
-    run_preprocessing_02()
-    logger.info("Preprocesamiento 02 finalizado.")
+    logger.info("Ejecutando preprocesamiento (01 + 02)...")
+    run_preprocessing()
+    logger.info("Preprocesamiento finalizado.")
 
 @task
 def task_train_model(run_name: str = None):
@@ -157,7 +156,7 @@ def task_train_model(run_name: str = None):
         raise
 
 @flow(name="Flow_Ingesta_Entrena_LSTM")
-def main_flow():
+def main_flow(full_refresh: bool = False, years: list = None):
     flow_logger = get_run_logger()
     flow_logger.info("Iniciando flow principal...")
 
@@ -182,10 +181,13 @@ def main_flow():
         os.environ["DB_NAME"] = "mthydroholding"
         flow_logger.info(f"Usando DB_NAME por defecto: {os.environ['DB_NAME']}")
     
-    task_ingest()
-    task_preprocessing_01()
-    task_preprocessing_02()
+    task_ingest(incremental=True, full_refresh=full_refresh, years=years)
+    task_preprocessing()
     task_train_model()
+
+    #Esperar a las subidas de artefactos en segundo plano (lanza error si alguna fallo)
+    flow_logger.info("Esperando subidas pendientes de artefactos a MLflow...")
+    esperar_subidas()
     
     flow_logger.info("Flow completado exitosamente.")
 
@@ -0,0 +1,221 @@
+# pipeline/generador_sintetico.py
+
+import os
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from esquema import COLUMNAS_CONTADOR, incluir_clave_billete
+from buques import REGISTRO_BUQUES, asignar_capacidades
+from raw_store import write_raw_dataset
+from indice_claves import construir_indice
+from calendario import cargar_festivos
+
+#Generador de datos sinteticos de 'contador' + 'barcoope' para pruebas de escala.
+#Sigue el esquema real y reproduce: mezcla de con_tipobillete, buques del registro,
+#incidencias DESEMBARCADO, cupones duplicados (re-escaneos) y estacionalidad
+#(fines de semana, verano y semanas alrededor de Eid)
+
+#Proporcion de cada con_tipobillete (pasajeros 1-3, vehiculos 0/5-9, excluidos 4/M)
+MEZCLA_TIPOBILLETE = {
+    "1": 0.52, "2": 0.13, "3": 0.05,
+    "0": 0.04, "5": 0.13, "6": 0.04, "7": 0.02, "8": 0.01, "9": 0.01,
+    "4": 0.03, "M": 0.02,
+}
+PORC_DESEMBARCADO = 0.015
+PORC_DUPLICADOS = 0.03
+PORC_OTROS_CLIENTES = 0.05
+
+#Horario de salidas diarias (hora, buque habitual). Un 5% de los dias se sustituye el buque
+HORARIO = [
+    (7, "ALGECIRAS JET"), (9, "CIUDAD DE CEUTA"), (11, "AVEMAR DOS"), (13, "TARIFA JET"),
+    (15, "KATTEGAT"), (17, "VILLA DE AGAETE"), (19, "MOROCCO STAR"), (21, "STENA EUROPE"),
+]
+PORC_SUSTITUCION = 0.05
+
+#Fechas de Eid de la fuente de festivos: demanda alta la semana previa y posterior
+FESTIVOS = cargar_festivos()
+FECHAS_EID = FESTIVOS["eid_alfitr"].append(FESTIVOS["eid_aladha"])
+
+NAVIERAS = ["BAL", "FRS", "TRA", "AML"]
+TRAYECTOS = ["ALG-TNG", "ALG-CEU", "TAR-TNG"]
+
+
+def generar_barcoope(anios, semilla: int = 0) -> pd.DataFrame:
+    """
+    Genera las salidas (barcoope) del periodo:
+    1) Una salida por dia y hora del HORARIO, con su buque habitual o un sustituto
+    2) Peso de demanda por salida: capacidad del buque x dia de la semana x verano x Eid
+    """
+    rng = np.random.default_rng(semilla)
+    dias = pd.date_range(f"{min(anios)}-01-01", f"{max(anios)}-12-31", freq="D")
+    dias = dias[dias.year.isin(list(anios))]
+
+    horas = np.array([h for h, _ in HORARIO])
+    buques = np.array([b for _, b in HORARIO], dtype=object)
+    fechas = np.repeat(dias.values, len(HORARIO)) + np.tile(horas, len(dias)) * np.timedelta64(1, "h")
+    buque = np.tile(buques, len(dias))
+    sustituir = rng.random(len(buque)) < PORC_SUSTITUCION
+    nombres_registro = np.array([r[0] for r in REGISTRO_BUQUES], dtype=object)
+    buque[sustituir] = rng.choice(nombres_registro, sustituir.sum())
+
+    df = pd.DataFrame({
+        "bao_codigo": np.arange(1, len(fechas) + 1),
+        "bao_cliente": "03",
+        "bao_buque": buque,
+        "bao_fecha": pd.to_datetime(fechas),
+    })
+
+    capacidad = asignar_capacidades(
+        pd.DataFrame({"buq_nombre": df["bao_buque"]})
+    )["capacidad_pasajeros"].to_numpy().astype(float)
+    factor_dia = np.where(df["bao_fecha"].dt.dayofweek.isin([4, 6]), 1.3, 1.0)
+    factor_verano = np.where(df["bao_fecha"].dt.month.isin([7, 8]), 1.8, 1.0)
+    dia = df["bao_fecha"].dt.normalize().to_numpy()
+    distancia = np.min(np.abs((dia[:, None] - FECHAS_EID.values[None, :]) / np.timedelta64(1, "D")), axis=1)
+    factor_eid = np.where(distancia == 0, 0.7, np.where(distancia <= 7, 1.6, 1.0))
+    ruido = rng.lognormal(0.0, 0.25, len(df))
+    df["peso"] = np.maximum(capacidad, 100) * factor_dia * factor_verano * factor_eid * ruido
+    return df
+
+
+def generar_bloque(salidas: pd.DataFrame, filas_por_salida: np.ndarray, rng,
+                   primer_codigo: int) -> pd.DataFrame:
+    """
+    Genera las filas de 'contador' de un bloque de salidas (sin con_clave):
+    1) Embarque hasta 90 min antes de la salida; compra con antelacion exponencial
+    2) Tipo de billete segun MEZCLA_TIPOBILLETE e incidencias DESEMBARCADO
+    3) Re-escaneos: copias del mismo (codigo, cupon, tipobillete) minutos despues
+    """
+    n = int(filas_por_salida.sum())
+    salida = np.repeat(np.arange(len(salidas)), filas_por_salida)
+    fecha_salida = salidas["bao_fecha"].to_numpy()[salida]
+    con_fecha = fecha_salida - rng.integers(0, 90 * 60, n) * np.timedelta64(1, "s")
+    antelacion = rng.exponential(5 * 24 * 3600, n).astype("int64") + 600
+    tipos = np.array(list(MEZCLA_TIPOBILLETE), dtype=object)
+    probabilidades = np.array(list(MEZCLA_TIPOBILLETE.values()))
+    codigos = primer_codigo + np.arange(n)
+
+    df = pd.DataFrame({
+        "con_cliente": np.where(rng.random(n) < PORC_OTROS_CLIENTES, "04", "03"),
+        "con_bacoope": salidas["bao_codigo"].to_numpy()[salida],
+        "con_fecha": con_fecha,
+        "con_tipo": rng.choice(np.array(["E", "S"], dtype=object), n, p=[0.9, 0.1]),
+        "con_codigo": pd.Series(codigos).astype(str).str.zfill(10).to_numpy(),
+        "con_naviera": rng.choice(np.array(NAVIERAS, dtype=object), n),
+        "con_dni": pd.Series(rng.integers(10000000, 99999999, n)).astype(str).to_numpy(),
+        "con_tipobillete": rng.choice(tipos, n, p=probabilidades / probabilidades.sum()),
+        "con_cupon": rng.choice(np.array(["1", "2"], dtype=object), n, p=[0.7, 0.3]),
+        "con_trayecto": rng.choice(np.array(TRAYECTOS, dtype=object), n),
+        "con_shortcomp": "S",
+        "con_dateticket": con_fecha - antelacion * np.timedelta64(1, "s"),
+        "con_acredita": "A",
+        "con_nombre": "PASAJERO " + pd.Series(codigos).astype(str),
+        "con_intercambiable": rng.integers(0, 2, n),
+        "con_incidencia": np.where(rng.random(n) < PORC_DESEMBARCADO, "DESEMBARCADO", None),
+    })
+
+    duplicados = df.sample(frac=PORC_DUPLICADOS, random_state=int(rng.integers(1 << 31)))
+    duplicados = duplicados.assign(
+        con_fecha=duplicados["con_fecha"] + pd.to_timedelta(rng.integers(1, 30, len(duplicados)), unit="m")
+    )
+    df = pd.concat([df, duplicados], ignore_index=True)
+    return df.sort_values("con_fecha", kind="stable", ignore_index=True)
+
+
+def generar_contador(filas: int, anios, semilla: int = 0, filas_bloque: int = 1_000_000):
+    """
+    Genera (barcoope, iterador de bloques de 'contador') para 'filas' billetes.
+    Los bloques son cronologicos y con_clave es creciente entre bloques.
+    """
+    rng = np.random.default_rng(semilla)
+    salidas = generar_barcoope(anios, semilla)
+    reparto = rng.multinomial(filas, salidas["peso"] / salidas["peso"].sum())
+
+    def bloques():
+        clave, codigo, inicio = 1, 1, 0
+        acumulado = np.cumsum(reparto)
+        while inicio < len(salidas):
+            #Salidas consecutivas hasta completar filas_bloque
+            fin = int(np.searchsorted(acumulado, acumulado[inicio] - reparto[inicio] + filas_bloque, side="right"))
+            fin = max(fin, inicio + 1)
+            df = generar_bloque(salidas.iloc[inicio:fin], reparto[inicio:fin], rng, codigo)
+            codigo += int(reparto[inicio:fin].sum())
+            df.insert(0, "con_clave", np.arange(clave, clave + len(df)))
+            clave += len(df)
+            inicio = fin
+            yield df
+
+    return salidas, bloques()
+
+
+def a_raw(df: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    #Mismo resultado que la ingesta: solo cliente 03, con nombre de buque, capacidades y clave_billete
+    df = df[df["con_cliente"] == "03"].drop(columns=["con_cliente"])
+    df = df.assign(buq_nombre=df["con_bacoope"].map(mapping))
+    return incluir_clave_billete(asignar_capacidades(df))
+
+
+def generar(filas: int, anios=(2022, 2023, 2024), formato: str = "parquet", ruta: str = None,
+            semilla: int = 0, filas_bloque: int = 1_000_000) -> str:
+    """
+    Escribe el dataset sintetico:
+    - parquet: dataset raw particionado (como la ingesta, con indice de claves), listo para preprocessing_01
+    - csv: CSV raw antiguo (un unico fichero)
+    - sqlite / mysql: tablas 'contador' y 'barcoope' para probar la ingesta.
+      'ruta' es la URI de SQLAlchemy (p.ej. sqlite:///data/synthetic/contador.db)
+    """
+    salidas, bloques = generar_contador(filas, anios, semilla, filas_bloque)
+    mapping = dict(zip(salidas["bao_codigo"], salidas["bao_buque"]))
+
+    if formato in ("sqlite", "mysql"):
+        ruta = ruta or "sqlite:///data/synthetic/contador.db"
+        if ruta.startswith("sqlite:///"):
+            os.makedirs(os.path.dirname(ruta[len("sqlite:///"):]) or ".", exist_ok=True)
+        engine = create_engine(ruta)
+        salidas.drop(columns=["peso"]).to_sql("barcoope", engine, if_exists="replace", index=False)
+        columnas = ["con_clave", "con_cliente"] + [c for c in COLUMNAS_CONTADOR if c != "con_clave"]
+        for i, df in enumerate(bloques):
+            df[columnas].to_sql("contador", engine, if_exists="replace" if i == 0 else "append",
+                                index=False, chunksize=50_000, method="multi" if formato == "mysql" else None)
+            logging.info(f"Bloque {i + 1}: {len(df)} filas cargadas en {formato}")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX idx_contador_fecha ON contador (con_fecha)"))
+            conn.execute(text("CREATE INDEX idx_contador_clave ON contador (con_clave)"))
+        return ruta
+
+    if formato == "parquet":
+        ruta = ruta or "data/synthetic/dataset_empresa_03"
+        for i, df in enumerate(bloques):
+            write_raw_dataset(a_raw(df, mapping), ruta, prefijo=f"base-{i:06d}", overwrite=(i == 0))
+            logging.info(f"Bloque {i + 1}: {len(df)} filas escritas en {ruta}")
+        construir_indice(ruta)
+    elif formato == "csv":
+        ruta = ruta or "data/synthetic/dataset_empresa_03.csv"
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        for i, df in enumerate(bloques):
+            a_raw(df, mapping).to_csv(ruta, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+            logging.info(f"Bloque {i + 1}: {len(df)} filas escritas en {ruta}")
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+    return ruta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de datos sinteticos de 'contador'")
+    parser.add_argument("--filas", type=int, default=1_000_000, help="Billetes a generar (sin contar re-escaneos)")
+    parser.add_argument("--anios", type=int, nargs="+", default=[2022, 2023, 2024], help="Años a generar")
+    parser.add_argument("--formato", choices=["parquet", "csv", "sqlite", "mysql"], default="parquet")
+    parser.add_argument("--ruta", help="Ruta de salida o URI de base de datos (sqlite/mysql)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--filas-bloque", type=int, default=1_000_000, help="Filas generadas en memoria a la vez")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    salida = generar(args.filas, args.anios, args.formato, args.ruta, args.semilla, args.filas_bloque)
+    print(f"Datos sinteticos generados en: {salida}")
@@ -0,0 +1,163 @@
+# pipeline/indice_claves.py
+
+import os
+import re
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from raw_store import RAW_DATASET_PATH, is_parquet_store, list_raw_files
+from esquema import CLAVE_DUPLICADOS, COLUMNA_CLAVE, clave_billete, es_billete_valido
+
+#Indice de claves del dataset raw: para cada clave de billete (esquema.clave_billete)
+#el con_clave de la fila que sobrevive a la deduplicacion de preprocessing_01 (la ultima
+#en orden de lectura de las que pasan los filtros por fila). Lo mantiene la ingesta:
+#la extraccion completa lo construye y la incremental solo cruza las filas nuevas con el.
+#preprocessing_01 deduplica entonces con un semi-join por con_clave
+INDICE_CLAVES = "_indice_claves.parquet"
+
+#Columnas que se leen del raw para construir el indice
+COLUMNAS_INDICE = ["con_clave", COLUMNA_CLAVE, "con_incidencia"] + CLAVE_DUPLICADOS
+
+PATRON_PARTICION = re.compile(r"anio=(\d+)[\\/]mes=(\d+)")
+
+
+def ruta_indice(path: str = RAW_DATASET_PATH) -> str:
+    return os.path.join(path, INDICE_CLAVES)
+
+
+def periodo_fichero(fichero: str) -> int:
+    #Particion del fichero como AAAAMM (anio=0000/mes=00, sin fecha, queda en 0)
+    anio, mes = PATRON_PARTICION.search(fichero).groups()
+    return int(anio) * 100 + int(mes)
+
+
+def filas_raw(ficheros: list) -> int:
+    #Filas del dataset segun los metadatos de los ficheros (sin leerlos)
+    return sum(pq.ParquetFile(f).metadata.num_rows for f in ficheros)
+
+
+def claves_ficheros(ficheros: list) -> pd.DataFrame:
+    """
+    Clave, con_clave y periodo de las filas que pasan los filtros por fila, en
+    orden de lectura. Si un fichero no trae clave_billete (escrito antes de
+    guardarla en la ingesta) se calcula a partir de CLAVE_DUPLICADOS.
+    Sin con_clave (o con nulos) no hay indice posible: ValueError
+    """
+    partes = []
+    for fichero in ficheros:
+        presentes = pq.read_schema(fichero).names
+        columnas = [c for c in COLUMNAS_INDICE if c in presentes]
+        if COLUMNA_CLAVE in presentes:
+            columnas = [c for c in columnas if c not in CLAVE_DUPLICADOS or c == "con_tipobillete"]
+        if "con_clave" not in columnas:
+            raise ValueError(f"{fichero} no tiene con_clave")
+        df = pq.read_table(fichero, columns=columnas).to_pandas()
+        df = df[es_billete_valido(df)]
+        if df["con_clave"].isna().any():
+            raise ValueError(f"{fichero} tiene filas sin con_clave")
+        partes.append(pd.DataFrame({
+            COLUMNA_CLAVE: df[COLUMNA_CLAVE].to_numpy() if COLUMNA_CLAVE in df else clave_billete(df),
+            "con_clave": df["con_clave"].to_numpy(dtype="int64"),
+            "periodo": np.full(len(df), periodo_fichero(fichero), dtype="int32"),
+        }))
+    if not partes:
+        return pd.DataFrame({COLUMNA_CLAVE: pd.Series(dtype="int64"), "con_clave": pd.Series(dtype="int64"),
+                             "periodo": pd.Series(dtype="int32")})
+    return pd.concat(partes, ignore_index=True)
+
+
+def guardar_indice(indice: pd.DataFrame, path: str, filas: int) -> None:
+    #Escritura atomica; filas_raw permite comprobar que el indice corresponde al dataset
+    tabla = pa.Table.from_pandas(indice, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({"filas_raw": str(filas)})
+    destino = ruta_indice(path)
+    pq.write_table(tabla, destino + ".tmp")
+    os.replace(destino + ".tmp", destino)
+
+
+def descartar_indice(path: str, motivo) -> None:
+    #Sin indice valido preprocessing_01 deduplica por clave_billete
+    logging.warning(f"Sin indice de claves para {path}: {motivo}")
+    if os.path.exists(ruta_indice(path)):
+        os.remove(ruta_indice(path))
+
+
+def construir_indice(path: str = RAW_DATASET_PATH) -> int:
+    """
+    Indice completo: claves de todo el dataset y drop_duplicates(keep='last')
+    sobre la clave de 64 bits. Devuelve el numero de claves
+    """
+    ficheros = list_raw_files(path)
+    try:
+        claves = claves_ficheros(ficheros)
+    except ValueError as e:
+        descartar_indice(path, e)
+        return 0
+    indice = claves.drop_duplicates(COLUMNA_CLAVE, keep="last", ignore_index=True)
+    guardar_indice(indice, path, filas_raw(ficheros))
+    logging.info(f"Indice de claves construido: {len(indice)} claves en {ruta_indice(path)}")
+    return len(indice)
+
+
+def actualizar_indice(path: str, ficheros_nuevos: list) -> int:
+    """
+    Incorpora al indice solo las filas de los ficheros nuevos (ingesta incremental):
+    1) Deduplica las filas nuevas entre si (la ultima en orden de lectura)
+    2) Una fila nueva sustituye a la del indice si su particion no es anterior:
+       en orden de lectura va detras de las filas de su particion y de las previas
+    3) Las claves que no estaban se añaden
+    Sin indice previo se construye completo. Devuelve las claves nuevas o sustituidas.
+    """
+    if not os.path.exists(ruta_indice(path)):
+        construir_indice(path)
+        return 0
+    indice = pq.read_table(ruta_indice(path)).to_pandas()
+    try:
+        nuevas = claves_ficheros(sorted(ficheros_nuevos)).drop_duplicates(COLUMNA_CLAVE, keep="last")
+    except ValueError as e:
+        descartar_indice(path, e)
+        return 0
+    previo = indice.set_index(COLUMNA_CLAVE)["periodo"].reindex(nuevas[COLUMNA_CLAVE]).to_numpy()
+    gana = np.isnan(previo) | (nuevas["periodo"].to_numpy() >= previo)
+    nuevas = nuevas[gana]
+    sustituidas = int((~np.isnan(previo[gana])).sum())
+
+    indice = pd.concat([indice[~indice[COLUMNA_CLAVE].isin(nuevas[COLUMNA_CLAVE])], nuevas], ignore_index=True)
+    guardar_indice(indice, path, filas_raw(list_raw_files(path)))
+    logging.info(f"Indice de claves actualizado: {len(nuevas) - sustituidas} claves nuevas, "
+                 f"{sustituidas} sustituidas ({len(indice)} en total)")
+    return len(nuevas)
+
+
+def indice_vigente(path: str = RAW_DATASET_PATH) -> bool:
+    #Hay indice y corresponde al dataset actual (mismo numero de filas)
+    if not is_parquet_store(path) or not os.path.exists(ruta_indice(path)):
+        return False
+    metadata = pq.read_schema(ruta_indice(path)).metadata or {}
+    if int(metadata.get(b"filas_raw", b"-1")) != filas_raw(list_raw_files(path)):
+        logging.warning(f"El indice de claves no corresponde a {path}: se deduplica por clave_billete")
+        return False
+    return True
+
+
+def leer_supervivientes(path: str = RAW_DATASET_PATH):
+    """
+    con_clave de las filas que sobreviven a la deduplicacion, o None si no hay
+    indice vigente
+    """
+    if not indice_vigente(path):
+        return None
+    return pq.read_table(ruta_indice(path), columns=["con_clave"]).column("con_clave").to_numpy()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construye el indice de claves de un dataset raw existente")
+    parser.add_argument("--raw", default=RAW_DATASET_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    construir_indice(args.raw)
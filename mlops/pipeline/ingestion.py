@@ -7,6 +7,20 @@ import pandas as pd
 import mlflow
 import pymysql  
 import logging
+from raw_store import RAW_DATASET_PATH, write_raw_dataset, compact_raw_dataset
+#Clasificacion de con_tipobillete compartida con preprocessing_01 (esquema.py)
+from esquema import (COLUMNAS_CONTADOR, TIPOS_PASAJEROS, TIPOS_VEHICULOS, TIPOS_EXCLUIDOS, columnas_contador,
+                     incluir_clave_billete)
+from indice_claves import construir_indice, actualizar_indice
+from buques import asignar_capacidades
+from subida_artefactos import encolar_artefacto, esperar_subidas
+from cache_consultas import (clave_cache, leer_cache, guardar_cache, hash_contenido,
+                             artefacto_sin_cambios, registrar_artefacto)
+import json
+import glob
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 #Carga variables entorno
 load_dotenv()
@@ -17,6 +31,8 @@ def get_connection_params():
     db_user = os.getenv("DB_USER", "")
     db_password = os.getenv("DB_PASSWORD", "")
     db_name = os.getenv("DB_NAME", "")
+    #URI completa opcional (p.ej. MySQL local o sqlite:///contador.db para pruebas)
+    db_uri = os.getenv("DB_URI", "")
     mlflow_uri = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
 
     logging.info(f"Parámetros de conexión: host={db_host}, db={db_name}, user={db_user}")
@@ -27,62 +43,24 @@ def get_connection_params():
         "user": db_user,
         "password": db_password,
         "database": db_name,
+        "uri": db_uri,
         "mlflow_uri": mlflow_uri
     }
 
-#Diccionario de capacidades por buque
-CAPACIDADES_BUQUES = {
-    "AL ANDALUS EXPRESS":   (80,  90),
-    "ALCANTARA 2":          (575, 120),
-    "ALGECIRAS JET":        (428,  52),
-    "AVEMAR DOS":           (855, 174),
-    "BAHAMA MAMA":         (1000, 350),
-    "BLUE STAR CHIOS":     (1715, 425),
-    "BUDA BRIDGE":          (359,  91),
-    "CECILIA PAYNE":        (740, 200),
-    "CEUTA JET":            (428,  52),
-    "CIUDAD DE CEUTA":      (866, 220),
-    "CIUDAD DE MALAGA":     (943, 300),
-    "DENIA CIUTAT CREATIVA":(399, 430),
-    "FORTUNY":             (1250, 140),
-    "HELLENIC HIGHSPEED":    (727, 156),
-    "JAUME I":               (623, 130),
-    "JAUME III":             (623, 130),
-    "JJ SISTER":             (806, 220),
-    "JUAN J. SISTER":        (806, 220),
-    "KATTEGAT":             (1000, 344),
-    "LEVANTE JET":           (672, 151),
-    "MED STAR":             (1212, 450),
-    "MOROCCO STAR":          (935, 225),
-    "MOROCCO SUN":          (1001, 280),
-    "NAPOLES":              (1600, 481),
-    "NISSOS CHIOS":         (1715, 425),
-    "PASSIO PER FORMENTERA": (800, 105),
-    "PATRIA SEAWAYS":        (277,  60),
-    "POETA LOPEZ ANGLADA":  (1257, 243),
-    "PONIENTE JET":          (640, 180),
-    "REGINA BALTICA":       (1675, 350),
-    "SOROLLA":              (1250, 140),
-    "STENA EUROPE":         (1220, 310),
-    "STENA VINGA":           (400, 200),
-    "TANGER EXPRESS":       (900, 344),
-    "TARIFA JET":            (900, 200),
-    "VILLA DE AGAETE":       (868, 220),
-    "VOLCAN DE TAMASITE":   (1469, 403),
-    "VOLCAN DE TAUCE":       (347,   0),
-    "WASA EXPRESS":          (700, 300)
-}
-
-
-def connect_db():
+#Conexiones simultaneas para la extraccion paralela por rangos
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+
+def connect_db(pool_size: int = DB_POOL_SIZE):
     params = get_connection_params()
   
     logging.info(f"Conectando a BD en host: {params['host']}, BD: {params['database']}, Usuario: {params['user']}")
     
-    uri = f"mysql+pymysql://{params['user']}:{params['password']}@{params['host']}/{params['database']}"
+    uri = params["uri"] or f"mysql+pymysql://{params['user']}:{params['password']}@{params['host']}/{params['database']}"
     
     try:
-        engine = create_engine(uri, pool_pre_ping=True)
+        #Pool acotado: nunca mas de pool_size conexiones abiertas contra la BD
+        engine = create_engine(uri, pool_pre_ping=True, pool_size=pool_size, max_overflow=0)
         with engine.connect() as conn:
             logging.info("Conexion a la base de datos establecida correctamente")
         return engine
@@ -91,33 +69,133 @@ def connect_db():
         raise
 
 
-def generate_dataset(years=(2022, 2023, 2024)) -> pd.DataFrame:
+#Tamaño de bloque por defecto para la extraccion en streaming
+CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "100000"))
+
+#Marca de agua (ultima fila ingerida) del dataset raw
+WATERMARK_PATH = "data/raw/watermark_empresa_03.json"
+
+#Primer año de la extraccion completa; el ultimo es siempre el año en curso
+ANIO_INICIO_INGESTA = int(os.getenv("INGEST_ANIO_INICIO", "2022"))
+
+
+def anios_ingesta(hasta: int = None) -> tuple:
+    #Años de la extraccion completa: desde ANIO_INICIO_INGESTA hasta el año en curso
+    return tuple(range(ANIO_INICIO_INGESTA, (hasta or datetime.now().year) + 1))
+
+
+def year_ranges(years) -> list:
     """
-    1) Extrae datos de 'contador'
-    2) Extrae mapeo 'barcoope'
-    3) Mapea nombres de buque y añade capacidades
-    4) Devuelve DataFrame completo
+    Convierte una lista de años en rangos semiabiertos [inicio, fin)
+    agrupando los años consecutivos: (2022, 2023, 2024) -> [('2022-01-01', '2025-01-01')]
     """
-    logging.info(f"Generando dataset para los años: {years}")
-    engine = connect_db()
+    rangos = []
+    for year in sorted(set(int(y) for y in years)):
+        if rangos and rangos[-1][1] == f"{year}-01-01":
+            rangos[-1] = (rangos[-1][0], f"{year + 1}-01-01")
+        else:
+            rangos.append((f"{year}-01-01", f"{year + 1}-01-01"))
+    return rangos
 
-    #EXTRAER datos de contador
-    query_cnt = f"""
-        SELECT
-            con_clave, con_bacoope, con_fecha, con_tipo, con_codigo,
-            con_naviera, con_dni, con_tipobillete, con_cupon, con_trayecto,
-            con_shortcomp, con_dateticket, con_acredita, con_nombre,
-            con_intercambiable, con_incidencia
+
+def month_ranges(years) -> list:
+    """
+    Divide los años en particiones mensuales semiabiertas [inicio, fin)
+    """
+    rangos = []
+    for year in sorted(set(int(y) for y in years)):
+        for month in range(1, 13):
+            fin = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
+            rangos.append((f"{year}-{month:02d}-01", fin))
+    return rangos
+
+
+def filtro_contador(years, desde_clave=None, rangos=None) -> str:
+    """
+    Condiciones WHERE sobre 'contador':
+    - rangos semiabiertos sobre con_fecha (aprovechan el indice, a diferencia de YEAR(con_fecha));
+      sin years ni rangos no se filtra por fecha
+    - en modo incremental solo filas posteriores a la marca de agua (con_clave > desde_clave)
+    """
+    condiciones = ["con_cliente = '03'"]
+    rangos = rangos or (year_ranges(years) if years else None)
+    if rangos:
+        condiciones.append("(" + " OR ".join(
+            f"(con_fecha >= '{inicio}' AND con_fecha < '{fin}')" for inicio, fin in rangos
+        ) + ")")
+    if desde_clave is not None:
+        condiciones.append(f"con_clave > {int(desde_clave)}")
+    return "\n          AND ".join(condiciones)
+
+
+def build_contador_query(years, desde_clave=None, rangos=None, columnas=None) -> str:
+    #Solo las columnas que consume alguna etapa del pipeline (ver esquema.py)
+    select = ", ".join(columnas or columnas_contador())
+    return f"""
+        SELECT {select}
         FROM contador
-        WHERE con_cliente = '03'
-          AND YEAR(con_fecha) IN {years}
-        ORDER BY con_fecha ASC
+        WHERE {filtro_contador(years, desde_clave, rangos)}
+        ORDER BY con_fecha ASC, con_clave ASC
     """
-    logging.info("Ejecutando consulta principal...")
-    df = pd.read_sql(query_cnt, engine)
-    logging.info(f"Datos obtenidos: {len(df)} filas")
 
-    #EXTRAER mapeo de buques
+
+def build_probe_query(years, desde_clave=None) -> str:
+    #Sonda barata de frescura: si cambia MAX(con_clave) o COUNT(*) cambia la clave de cache
+    return f"""
+        SELECT MAX(con_clave) AS max_clave, COUNT(*) AS filas
+        FROM contador
+        WHERE {filtro_contador(years, desde_clave)}
+    """
+
+
+def build_aggregate_query(years, grain: str = "dia") -> str:
+    """
+    Consulta de conteos diarios ('dia') o por salida ('salida') resueltos en la BD.
+    Aplica los mismos filtros que preprocessing_01 antes de contar:
+    - descarta DESEMBARCADO y los tipos de billete 4/M
+    - deduplica (con_codigo, con_cupon, con_tipobillete) quedandose con la ultima fila
+      en el orden de la extraccion por filas (con_fecha, con_clave), como
+      drop_duplicates(keep='last'): un cupon reemitido con con_clave mayor pero
+      con_fecha anterior cuenta en el dia de su ultima con_fecha
+    """
+    filtro_fecha = " OR ".join(
+        f"(con_fecha >= '{inicio}' AND con_fecha < '{fin}')" for inicio, fin in year_ranges(years)
+    )
+    if grain == "dia":
+        columnas = "DATE(c.con_fecha) AS fecha_embarque"
+        agrupacion = "DATE(c.con_fecha)"
+        orden = "fecha_embarque"
+    elif grain == "salida":
+        columnas = "c.con_bacoope, MIN(c.con_fecha) AS fecha_salida"
+        agrupacion = "c.con_bacoope"
+        orden = "fecha_salida"
+    else:
+        raise ValueError(f"Granularidad no soportada: {grain}")
+
+    return f"""
+        SELECT
+            {columnas},
+            SUM(CASE WHEN c.con_tipobillete IN {TIPOS_PASAJEROS} THEN 1 ELSE 0 END) AS total_pasajeros,
+            SUM(CASE WHEN c.con_tipobillete IN {TIPOS_VEHICULOS} THEN 1 ELSE 0 END) AS total_vehiculos,
+            SUM(CASE WHEN c.con_tipobillete NOT IN {TIPOS_PASAJEROS + TIPOS_VEHICULOS} THEN 1 ELSE 0 END) AS total_otros
+        FROM contador c
+        JOIN (
+            SELECT con_clave, ROW_NUMBER() OVER (
+                       PARTITION BY con_codigo, con_cupon, con_tipobillete
+                       ORDER BY con_fecha DESC, con_clave DESC
+                   ) AS orden
+            FROM contador
+            WHERE con_cliente = '03'
+              AND ({filtro_fecha})
+              AND COALESCE(con_incidencia, '') <> 'DESEMBARCADO'
+              AND con_tipobillete NOT IN {TIPOS_EXCLUIDOS}
+        ) u ON u.con_clave = c.con_clave AND u.orden = 1
+        GROUP BY {agrupacion}
+        ORDER BY {orden} ASC
+    """
+
+
+def get_buques_mapping(engine) -> dict:
     query_map = """
         SELECT bao_codigo, bao_buque
         FROM barcoope
@@ -127,15 +205,175 @@ def generate_dataset(years=(2022, 2023, 2024)) -> pd.DataFrame:
     df_map = pd.read_sql(query_map, engine)
     mapping = dict(zip(df_map['bao_codigo'], df_map['bao_buque']))
     logging.info(f"Mapeo de {len(mapping)} buques obtenido")
+    return mapping
+
 
-    #MAPEAR nombres y añadir capacidades
+def map_buques(df: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    #Nombre por con_bacoope y capacidades desde el registro de buques (buques.py)
     df['buq_nombre'] = df['con_bacoope'].map(mapping)
-    df['capacidad_pasajeros'] = df['buq_nombre'].map(lambda b: CAPACIDADES_BUQUES.get(b, (0,0))[0]).astype(int)
-    df['capacidad_vehiculos'] = df['buq_nombre'].map(lambda b: CAPACIDADES_BUQUES.get(b, (0,0))[1]).astype(int)
+    return asignar_capacidades(df)
+
+
+def read_partitions(engine, years, desde_clave=None, workers: int = DB_POOL_SIZE, columnas=None) -> pd.DataFrame:
+    """
+    Lee 'contador' por particiones mensuales en paralelo:
+    1) Divide el periodo en rangos mensuales semiabiertos
+    2) Lanza una consulta por mes, como maximo 'workers' a la vez
+    3) Une los resultados en orden de mes (cada uno ya viene ordenado por con_fecha)
+    """
+    rangos = month_ranges(years)
+    logging.info(f"Extrayendo {len(rangos)} particiones mensuales con {workers} conexiones")
+
+    def leer_rango(rango):
+        return pd.read_sql(build_contador_query(years, desde_clave, rangos=[rango], columnas=columnas), engine)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        partes = list(executor.map(leer_rango, rangos))
+
+    no_vacias = [p for p in partes if not p.empty]
+    if not no_vacias:
+        return partes[0]
+    return pd.concat(no_vacias, ignore_index=True)
+
 
+def generate_dataset(years=None, desde_clave=None, workers: int = DB_POOL_SIZE,
+                     columnas=None, usar_cache: bool = True) -> pd.DataFrame:
+    """
+    1) Extrae datos de 'contador' de los años indicados (por defecto anios_ingesta()) o,
+       si se indica desde_clave y no años, todas las filas con con_clave > desde_clave,
+       por particiones mensuales en paralelo si workers > 1. Si la misma consulta
+       ya se resolvio y la sonda de frescura no ha cambiado, se sirve desde la
+       cache local (data/cache) sin releer la tabla
+    2) Extrae mapeo 'barcoope'
+    3) Mapea nombres de buque, añade capacidades y la clave de deduplicacion (clave_billete)
+    4) Devuelve DataFrame completo
+    """
+    if years is None and desde_clave is None:
+        years = anios_ingesta()
+    #La lectura por meses necesita un rango de fechas
+    if not years:
+        workers = 1
+    logging.info(f"Generando dataset para los años: {years or 'todos'}")
+    engine = connect_db(pool_size=max(workers, 1))
+
+    #HUELLA de la consulta: SQL + parametros + sonda (MAX(con_clave), COUNT(*))
+    clave = None
+    if usar_cache:
+        sonda = pd.read_sql(build_probe_query(years, desde_clave), engine).iloc[0].to_dict()
+        params = {"years": list(years) if years else None, "desde_clave": desde_clave}
+        clave = clave_cache(build_contador_query(years, desde_clave, columnas=columnas), params, sonda)
+        df = leer_cache(clave)
+    if clave is None or df is None:
+        #EXTRAER datos de contador
+        logging.info("Ejecutando consulta principal...")
+        if workers > 1:
+            df = read_partitions(engine, years, desde_clave, workers, columnas)
+        else:
+            df = pd.read_sql(build_contador_query(years, desde_clave, columnas=columnas), engine)
+        if clave is not None:
+            guardar_cache(clave, df, params)
+    logging.info(f"Datos obtenidos: {len(df)} filas")
+
+    #EXTRAER mapeo de buques
+    mapping = get_buques_mapping(engine)
+
+    #MAPEAR nombres, añadir capacidades y clave de billete
+    return incluir_clave_billete(map_buques(df, mapping))
+
+
+def generate_dataset_streaming(years=None,
+                               output_path: str = RAW_DATASET_PATH,
+                               chunksize: int = CHUNK_SIZE, columnas=None, hasher=None) -> int:
+    """
+    Variante en streaming de generate_dataset:
+    1) Extrae mapeo 'barcoope' (tabla pequeña, en memoria)
+    2) Abre un cursor de servidor (sin buffer) sobre 'contador'
+    3) Lee bloques de tamaño fijo, mapea buque y capacidades y calcula clave_billete
+    4) Escribe cada bloque directamente en el dataset Parquet particionado
+    5) Guarda la marca de agua a partir de los maximos de cada bloque
+    6) Construye el indice de claves del dataset escrito
+    Si se pasa un hasher, se acumula en el hash del contenido de cada bloque.
+    La memoria queda acotada por chunksize, no por el numero de años.
+    Devuelve el numero de filas escritas.
+    """
+    years = years or anios_ingesta()
+    logging.info(f"Generando dataset en streaming para los años: {years} (chunksize={chunksize})")
+    engine = connect_db(pool_size=1)
+    mapping = get_buques_mapping(engine)
+
+    rows = 0
+    maximos = []
+    #stream_results=True usa SSCursor en pymysql: las filas se leen bajo demanda
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        chunks = pd.read_sql(build_contador_query(years, columnas=columnas), conn, chunksize=chunksize)
+        for i, chunk in enumerate(chunks):
+            chunk = incluir_clave_billete(map_buques(chunk, mapping))
+            write_raw_dataset(chunk, output_path, prefijo=f"base-{i:06d}", overwrite=(i == 0))
+            if hasher is not None:
+                hash_contenido(chunk, hasher)
+            rows += len(chunk)
+            maximos.append({"con_clave": chunk["con_clave"].max(), "con_fecha": chunk["con_fecha"].max()})
+            logging.info(f"Bloque {i + 1} escrito ({rows} filas acumuladas)")
+
+    save_watermark(pd.DataFrame(maximos).dropna())
+    construir_indice(output_path)
+    return rows
+
+
+def generate_aggregates(years=None, grain: str = "dia") -> pd.DataFrame:
+    """
+    Variante agregada de generate_dataset para el entrenamiento:
+    1) Clasifica con_tipobillete y cuenta por dia o por salida en la BD
+    2) Solo viajan por la red los conteos (sin columnas personales)
+    3) Por salida, añade nombre de buque, capacidades y ocupacion
+    """
+    years = years or anios_ingesta()
+    logging.info(f"Generando agregados por {grain} para los años: {years}")
+    engine = connect_db(pool_size=1)
+    df = pd.read_sql(build_aggregate_query(years, grain), engine)
+    logging.info(f"Agregados obtenidos: {len(df)} filas")
+
+    if grain == "dia":
+        df["fecha_embarque"] = pd.to_datetime(df["fecha_embarque"])
+    else:
+        df["fecha_salida"] = pd.to_datetime(df["fecha_salida"])
+        df = map_buques(df, get_buques_mapping(engine))
+        df["porc_ocupacion_pasajeros"] = (df["total_pasajeros"] / df["capacidad_pasajeros"]) * 100
+        df["porc_ocupacion_vehiculos"] = (df["total_vehiculos"] / df["capacidad_vehiculos"]) * 100
     return df
 
-def ingest_data(years=(2022, 2023, 2024), output_path: str = "data/raw/dataset_empresa_03.csv") -> str:
+
+def load_watermark(watermark_path: str = WATERMARK_PATH):
+    if not os.path.exists(watermark_path):
+        return None
+    with open(watermark_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_watermark(df: pd.DataFrame, watermark_path: str = WATERMARK_PATH, previa=None) -> dict:
+    """
+    Persiste la marca de agua (max con_clave / con_fecha) de las filas ingeridas.
+    Si no hay filas nuevas se conserva la marca previa.
+    """
+    if df.empty:
+        return previa
+    watermark = {
+        "con_clave": int(df["con_clave"].max()),
+        "con_fecha": str(pd.to_datetime(df["con_fecha"]).max()),
+        "actualizado": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    os.makedirs(os.path.dirname(watermark_path), exist_ok=True)
+    with open(watermark_path, "w", encoding="utf-8") as f:
+        json.dump(watermark, f)
+    logging.info(f"Marca de agua actualizada: con_clave={watermark['con_clave']}, con_fecha={watermark['con_fecha']}")
+    return watermark
+
+
+def ingest_data(years=None, output_path: str = RAW_DATASET_PATH,
+                streaming: bool = False, chunksize: int = CHUNK_SIZE,
+                incremental: bool = False, full_refresh: bool = False,
+                compact: bool = True, workers: int = DB_POOL_SIZE, columnas=None,
+                usar_cache: bool = True) -> str:
 
     #Obtener la URI de MLflow desde parametros
     mlflow_uri = get_connection_params()["mlflow_uri"]
@@ -144,31 +382,156 @@ def ingest_data(years=(2022, 2023, 2024), output_path: str = "data/raw/dataset_e
     #Configurar MLflow Tracking URI
     mlflow.set_tracking_uri(mlflow_uri)
 
+    #Años de la extraccion completa (el modo incremental no filtra por fecha)
+    years = tuple(years) if years else anios_ingesta()
+
+    #Columnas a extraer: union de las entradas de las etapas salvo que se pidan otras (EDA)
+    columnas = columnas or columnas_contador()
+    logging.info(f"Columnas a extraer ({len(columnas)}): {columnas}")
+
+    #El modo incremental necesita una marca de agua previa y el dataset base
+    watermark = load_watermark()
+    if incremental and not full_refresh and (watermark is None or not os.path.exists(output_path)):
+        logging.info("Sin marca de agua o dataset base previo: se realiza una extraccion completa")
+        full_refresh = True
+
     #Iniciar un run para registrar artefactos
     with mlflow.start_run(run_name="Ingestion_Run"):
-        logging.info("Generando dataset...")
-        df = generate_dataset(years)
+        if incremental and not full_refresh:
+            #Solo filas nuevas desde la ultima ejecucion, en una particion aparte. Sin filtro de
+            #fechas: con_clave > marca de agua recoge cualquier fila nueva, sea del año que sea
+            logging.info(f"Ingesta incremental desde con_clave > {watermark['con_clave']}")
+            df = generate_dataset(None, desde_clave=watermark["con_clave"], workers=1, columnas=columnas,
+                                  usar_cache=usar_cache)
+            rows = len(df)
+            claves = 0
+            if rows:
+                #Ficheros 'inc-<con_clave inicial>' en las particiones anio/mes afectadas
+                prefijo = f"inc-{watermark['con_clave'] + 1:012d}"
+                write_raw_dataset(df, output_path, prefijo=prefijo)
+                nuevos = glob.glob(os.path.join(output_path, "anio=*", "mes=*", f"{prefijo}-*.parquet"))
+                for fichero in nuevos:
+                    particion = os.path.relpath(os.path.dirname(fichero), output_path).replace(os.sep, "/")
+                    #Instantanea: la compactacion de abajo borra estos ficheros antes de que se suban
+                    encolar_artefacto(fichero, artifact_path=f"raw_data/incremental/{particion}", copiar=True)
+                #Solo las filas nuevas se cruzan con el indice de claves (antes de compactar:
+                #la compactacion conserva orden y filas, el indice sigue valiendo)
+                claves = actualizar_indice(output_path, nuevos)
+            save_watermark(df, previa=watermark)
+            if compact:
+                compact_raw_dataset(output_path)
+            mlflow.log_param("mode", "incremental")
+            mlflow.log_param("rows", rows)
+            mlflow.log_metric("claves_actualizadas", claves)
+            logging.info(f"Ingesta incremental finalizada ({rows} filas nuevas)")
+            return output_path
+
+        #Extraccion completa: se reescribe el dataset y se descarta la marca de agua previa
+        if os.path.exists(WATERMARK_PATH):
+            os.remove(WATERMARK_PATH)
+
+        if streaming:
+            #Extraccion por bloques escritos directamente en disco
+            logging.info(f"Generando dataset en streaming en {output_path}")
+            hasher = hashlib.sha256()
+            rows = generate_dataset_streaming(years, output_path, chunksize, columnas, hasher=hasher)
+            mlflow.log_param("chunksize", chunksize)
+        else:
+            logging.info("Generando dataset...")
+            df = generate_dataset(years, workers=workers, columnas=columnas, usar_cache=usar_cache)
+            mlflow.log_param("workers", workers)
+            rows = len(df)
+            hasher = hash_contenido(df)
+
+            #Guardar Parquet particionado localmente
+            logging.info(f"Guardando dataset en {output_path}")
+            write_raw_dataset(df, output_path, overwrite=True)
+            save_watermark(df)
+            construir_indice(output_path)
+
+        #Registrar el directorio del dataset en MLflow (solo si el contenido ha cambiado)
+        nombre_artefacto = f"raw_data/{os.path.basename(output_path)}"
+        hash_dataset = hasher.hexdigest()
+        run_previo = artefacto_sin_cambios(nombre_artefacto, hash_dataset)
+        if run_previo:
+            logging.info(f"Contenido identico al del run {run_previo}: no se vuelve a subir el artefacto")
+            mlflow.set_tag("raw_data_run_id", run_previo)
+        else:
+            logging.info("Registrando artefacto en MLflow...")
+            run_id = mlflow.active_run().info.run_id
+            #El hash solo se registra cuando la subida termina bien
+            encolar_artefacto(
+                output_path, artifact_path=nombre_artefacto, run_id=run_id,
+                al_completar=lambda: registrar_artefacto(nombre_artefacto, hash_dataset, run_id)
+            )
+            mlflow.set_tag("raw_data_run_id", run_id)
+        mlflow.log_param("content_hash", hash_dataset)
+        mlflow.log_param("rows", rows)
+        mlflow.log_param("streaming", streaming)
+        mlflow.log_param("mode", "full")
+        mlflow.log_param("columns", ",".join(columnas))
+        logging.info(f"Ingesta completa finalizada ({rows} filas)")
+
+    return output_path
+
+def ingest_aggregates(years=None, grain: str = "dia", output_path: str = None) -> str:
+    """
+    Ingesta en modo agregado: guarda la serie diaria (o por salida) en lugar
+    de las filas de billetes. La ingesta por filas se mantiene para EDA.
+    """
+    if output_path is None:
+        output_path = f"data/raw/agregado_{grain}_empresa_03.csv"
+
+    mlflow.set_tracking_uri(get_connection_params()["mlflow_uri"])
+    with mlflow.start_run(run_name="Ingestion_Aggregates_Run"):
+        df = generate_aggregates(years, grain)
 
-        #Guardar CSV localmente
-        logging.info(f"Guardando dataset en {output_path}")
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         df.to_csv(output_path, index=False)
 
-        #Registrar CSV en MLflow
-        logging.info("Registrando artefacto en MLflow...")
-        mlflow.log_artifact(output_path, artifact_path="raw_data")
+        encolar_artefacto(output_path, artifact_path="raw_data")
+        mlflow.log_param("grain", grain)
         mlflow.log_param("rows", len(df))
-        logging.info(f"Artefacto registrado exitosamente en MLflow ({len(df)} filas)")
+        logging.info(f"Agregados guardados en {output_path} ({len(df)} filas)")
 
     return output_path
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingesta de datos desde la base de datos")
+    parser.add_argument("--streaming", action="store_true", help="Extraer por bloques con cursor de servidor")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Filas por bloque en modo streaming")
+    parser.add_argument("--incremental", action="store_true", help="Extraer solo filas posteriores a la marca de agua")
+    parser.add_argument("--full-refresh", action="store_true", help="Forzar extraccion completa y reiniciar la marca de agua")
+    parser.add_argument("--no-compact", action="store_true", help="No compactar las particiones incrementales")
+    parser.add_argument("--workers", type=int, default=DB_POOL_SIZE, help="Conexiones en paralelo para la extraccion por meses")
+    parser.add_argument("--aggregate", choices=["dia", "salida"], help="Extraer conteos agregados en lugar de filas")
+    parser.add_argument("--no-cache", action="store_true", help="Ignorar la cache local de consultas")
+    parser.add_argument("--eda", action="store_true", help="Extraer todas las columnas de 'contador' (analisis exploratorio)")
+    parser.add_argument("--years", type=int, nargs="+", help="Años de la extraccion completa (por defecto, desde INGEST_ANIO_INICIO hasta el actual)")
+    args = parser.parse_args()
+
     # Configurar logging
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    output = ingest_data()
-    print(f"Dataset guardado en: {output}")
-
+    if args.aggregate:
+        output = ingest_aggregates(years=args.years, grain=args.aggregate)
+        print(f"Agregados guardados en: {output}")
+    else:
+        output = ingest_data(
+            years=args.years,
+            streaming=args.streaming,
+            chunksize=args.chunksize,
+            incremental=args.incremental,
+            full_refresh=args.full_refresh,
+            compact=not args.no_compact,
+            workers=args.workers,
+            columnas=COLUMNAS_CONTADOR if args.eda else None,
+            usar_cache=not args.no_cache
+        )
+        print(f"Dataset guardado en: {output}")
+    esperar_subidas()
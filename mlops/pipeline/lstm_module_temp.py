@@ -1,87 +1,58 @@
-# pipeline/model_training.py
-
 import os
 import pandas as pd
 import numpy as np
+import joblib
 from sklearn.preprocessing import MinMaxScaler
 import mlflow
+import mlflow.keras
 from dotenv import load_dotenv
 import pickle
 from math import sqrt
+from datetime import datetime
 from sklearn.metrics import mean_squared_error, mean_absolute_error
-from tensorflow.keras.models import Sequential, load_model
+from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization, Bidirectional
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
 from tensorflow.keras.optimizers import Adam
+from tabla_diaria import TABLA_DIARIA_PATH, COLUMNAS_FEATURES, leer_tabla_diaria
+from esquema import memoria_mb
+from secuencias import matriz_float32, ventanas, objetivos, memoria_ventanas_mb
+from entrada_tf import ENTRADA_ENTRENAMIENTO, SHUFFLE_BUFFER, datos_fit, MedidorEpocas
+from entrenamiento_paralelo import ENTRENAMIENTO_PARALELO, entrenar_en_paralelo
 
 #Carga variables de entorno
-load_dotenv()
+dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(dotenv_path)
 MLFLOW_URI = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+#Directorio con los config_<modelo>.json de busqueda_hiperparametros.py (vacio: hiperparametros de train_lstm)
+CONFIG_BUSQUEDA_DIR = os.getenv("CONFIG_BUSQUEDA_DIR", "")
+HIPERPARAMETROS = ("lookback", "lstm_units", "dropout_rate", "learning_rate", "batch_size")
 
 
-def procesar_dataset_completo(df_original, df_filtrado, nombre_target):
-    #Columnas usadas en el modelo
-    columnas_modelo = [
-        'fecha_embarque','tipo_agrupacion',
-        'dia_del_anio_sin','dia_del_anio_cos',
-        'dia_embarque_sin','dia_embarque_cos',
-        'hora_embarque_sin','hora_embarque_cos',
-        'is_weekend','mes_embarque_sin','mes_embarque_cos',
-        'week_of_year_sin','week_of_year_cos',
-        'season_1','season_2','season_3','season_4',
-        'is_festivo_nacional','is_festivo_local',
-        'is_eid_aladha','is_eid_aladha_prev','is_eid_aladha_post',
-        'is_eid_alfitr','is_eid_alfitr_prev','is_eid_alfitr_post',
-        'is_mawlid_nabi',
-        'is_monday','is_tuesday','is_wednesday','is_thursday',
-        'is_friday','is_saturday','is_sunday',
-        'weekday_sin','weekday_cos'
-    ]
-    df_orig = df_original[columnas_modelo].copy()
-    df_filt = df_filtrado[columnas_modelo].copy()
-    fechas = pd.date_range(
-        start=df_orig['fecha_embarque'].min(),
-        end=df_orig['fecha_embarque'].max(),
-        freq='D'
-    )
-    #Conteo diario
-    df_daily = (
-        df_filt.groupby('fecha_embarque')
-               .size()
-               .reindex(fechas, fill_value=0)
-               .reset_index(name=nombre_target)
-               .rename(columns={'index':'fecha_embarque'})
-    )
-    #Base con variables de serie temporal
-    df_temp = (
-        df_orig.drop(columns=['tipo_agrupacion'])
-               .drop_duplicates('fecha_embarque')
-               .set_index('fecha_embarque')
-               .reindex(fechas)
-               .reset_index()
-               .rename(columns={'index':'fecha_embarque'})
-    )
-    #Relleno de valores faltantes
-    for col in df_temp.columns:
-        if col != 'fecha_embarque':
-            df_temp[col] = df_temp[col].fillna(method='ffill').fillna(0)
-    #Merge y orden
-    df_final = pd.merge(df_temp, df_daily, on='fecha_embarque', how='left').fillna({nombre_target:0})
+def procesar_dataset_completo(df_diario, nombre_target):
+    """
+    Serie diaria de un target a partir de la tabla diaria del preprocesamiento
+    (variables + targets, ya agregada y sin huecos) y su escalado a [0, 1]
+    """
+    df_final = df_diario[['fecha_embarque'] + COLUMNAS_FEATURES + [nombre_target]].copy()
     df_final = df_final.sort_values('fecha_embarque')
-    #Normalización del target
     scaler = MinMaxScaler()
     df_final[f'{nombre_target}_norm'] = scaler.fit_transform(df_final[[nombre_target]])
     return df_final, scaler
 
-
-def crear_secuencias(df, target_col, lookback=7):
+def matriz_secuencias(df, target_col):
+    #Matriz float32 de las variables (en el orden de feature_columns) y target normalizado
     features = df.columns.difference(['fecha_embarque', target_col, f'{target_col}_norm'])
-    X, y = [], []
-    for i in range(lookback, len(df)):
-        X.append(df.iloc[i-lookback:i][features].values.astype('float32'))
-        y.append(df.iloc[i][f'{target_col}_norm'])
-    return np.array(X), np.array(y)
+    return matriz_float32(df, features), df[f'{target_col}_norm'].to_numpy()
 
+def crear_secuencias(df, target_col, lookback=7, stride=1, matriz=None, serie=None):
+    """
+    Ventanas de lookback dias (vistas sobre una unica matriz float32, ver
+    secuencias.py) y el target normalizado del dia siguiente a cada una
+    """
+    if matriz is None:
+        matriz, serie = matriz_secuencias(df, target_col)
+    return ventanas(matriz, lookback, stride), objetivos(serie, lookback, stride)
 
 def split_temporal(X, y, ratios=(0.7, 0.15, 0.15)):
     n = len(X)
@@ -89,7 +60,6 @@ def split_temporal(X, y, ratios=(0.7, 0.15, 0.15)):
     i2 = i1 + int(n * ratios[1])
     return (X[:i1], y[:i1]), (X[i1:i2], y[i1:i2]), (X[i2:], y[i2:])
 
-
 def crear_modelo_lstm(input_shape, dropout_rate=0.1, lstm_units=64, bidirectional=True):
     model = Sequential()
     if bidirectional:
@@ -109,16 +79,15 @@ def crear_modelo_lstm(input_shape, dropout_rate=0.1, lstm_units=64, bidirectiona
     model.add(Dense(1, activation='sigmoid'))
     return model
 
-
 def compilar_modelo(model, learning_rate=0.001):
     model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mean_squared_error', metrics=['mae'])
     return model
 
-
 def crear_callbacks(model_name, output_dir):
     os.makedirs(output_dir, exist_ok=True)
     early = EarlyStopping(monitor='val_loss', patience=50, restore_best_weights=True, verbose=1)
-    #Guardar solo pesos durante el fit para evitar el error de 'options'
+    
+    #Checkpoint para guardar pesos
     ckpt_weights = os.path.join(output_dir, f'{model_name}_weights.h5')
     chk = ModelCheckpoint(
         ckpt_weights,
@@ -127,9 +96,19 @@ def crear_callbacks(model_name, output_dir):
         save_weights_only=True,
         verbose=1
     )
+    
+    #Checkpoint para guardar modelo completo
+    ckpt_model = os.path.join(output_dir, f'{model_name}.h5')
+    chk_model = ModelCheckpoint(
+        ckpt_model,
+        monitor='val_loss',
+        save_best_only=True,
+        save_weights_only=False,
+        verbose=1
+    )
+    
     reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.1, patience=8, min_lr=1e-7, verbose=1)
-    return [early, chk, reduce_lr]
-
+    return [early, chk, chk_model, reduce_lr]
 
 def calculate_metrics(y_true, y_pred):
     rmse = sqrt(mean_squared_error(y_true, y_pred))
@@ -140,156 +119,216 @@ def calculate_metrics(y_true, y_pred):
     r2 = 1 - ss_res/ss_tot
     return {'RMSE': rmse, 'MAE': mae, 'MAPE': mape, 'R²': r2}
 
-
-def train_lstm(
-    input_path="data/processed/dataset_empresa_03_pos_EDA_2.csv",
+def guardar_configuracion_modelo(config, output_dir, nombre_modelo):
+    """Guarda la configuración del modelo para reproducibilidad"""
+    config_path = os.path.join(output_dir, f'config_{nombre_modelo}.json')
+    with open(config_path, 'w') as f:
+        import json
+        json.dump(config, f)
+    return config_path
+
+def hiperparametros_busqueda(config_dir, nombre_modelo):
+    #Hiperparametros de la mejor configuracion de la busqueda para un modelo
+    with open(os.path.join(config_dir, f'config_{nombre_modelo}.json')) as f:
+        import json
+        config = json.load(f)
+    return {param: config[param] for param in HIPERPARAMETROS if param in config}
+
+#Modelos que se entrenan: nombre -> target y nombre del run de MLflow
+MODELOS = {
+    "pasajeros": {"target": "total_pasajeros", "run_name": "Training_(P)LSTM_Run"},
+    "vehiculos": {"target": "total_vehiculos", "run_name": "Training_(V)LSTM_Run"},
+}
+
+def entrenar_modelo(
+    nombre,
+    df,
+    config_general,
     output_model_dir="models",
     lookback=7,
+    stride=1,
     lstm_units=64,
     dropout_rate=0.1,
     learning_rate=0.001,
     epochs=300,
-    batch_size=32
+    batch_size=32,
+    entrada=ENTRADA_ENTRENAMIENTO,
+    shuffle_buffer=SHUFFLE_BUFFER,
+    run_id=None,
+    verbose=1
 ):
+    """
+    Entrena, registra y evalua el modelo de un target (ver MODELOS) en su run de
+    MLflow (run_id si ya existe, p.ej. creado por el entrenamiento en paralelo).
+    Devuelve las metricas de test
+    """
+    target = MODELOS[nombre]["target"]
     mlflow.set_tracking_uri(MLFLOW_URI)
-    
-    #ENTRENAMIENTO MODELO DE PASAJEROS 
-    with mlflow.start_run(run_name="Training_(P)LSTM_Run"):
-        #Carga preparacion de datos
-        df = pd.read_csv(input_path, low_memory=False)
-        df['fecha_embarque'] = pd.to_datetime(df['fecha_embarque'], errors='coerce')
-        df_p = df[df['tipo_agrupacion'] == 1]
-        df_v = df[df['tipo_agrupacion'] == 0]
-
-        #Procesado diario
-        df_p_daily, scaler_p = procesar_dataset_completo(df, df_p, 'total_pasajeros')
-        df_v_daily, scaler_v = procesar_dataset_completo(df, df_v, 'total_vehiculos')
-
-        #Secuencias y split
-        Xp, yp = crear_secuencias(df_p_daily, 'total_pasajeros', lookback)
-        (Xp_tr, yp_tr), (Xp_val, yp_val), (Xp_ts, yp_ts) = split_temporal(Xp, yp)
-
-        #Definicion y compilacion del modelo
-        input_shape = (Xp_tr.shape[1], Xp_tr.shape[2])
+    run_name = None if run_id else MODELOS[nombre]["run_name"]
+    with mlflow.start_run(run_id=run_id, run_name=run_name):
+        mlflow.set_tags({
+            "step": f"train_{nombre}",
+            "model_type": "LSTM",
+            "dataset_version": "v1.0",
+            "execution_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+        
+        #Log parameters
+        mlflow.log_params({
+            "lookback": lookback,
+            "stride": stride,
+            "lstm_units": lstm_units,
+            "dropout_rate": dropout_rate,
+            "learning_rate": learning_rate,
+            "epochs": epochs,
+            "batch_size": batch_size,
+            "entrada": entrada,
+            "shuffle_buffer": shuffle_buffer
+        })
+        
+        #Procesar dataset del target
+        df_daily, scaler = procesar_dataset_completo(df, target)
+        
+        #Guardar columnas y metadatos 
+        feature_cols = df_daily.columns.difference(['fecha_embarque', target, f'{target}_norm']).tolist()
+        config_modelo = config_general.copy()
+        config_modelo.update({
+            "feature_columns": feature_cols,
+            "input_shape": [lookback, len(feature_cols)],
+            "target_column": target
+        })
+        config_path = guardar_configuracion_modelo(config_modelo, output_model_dir, nombre)
+        mlflow.log_artifact(config_path)
+        
+        #Crear secuencias y split
+        matriz, serie = matriz_secuencias(df_daily, target)
+        X, y = crear_secuencias(df_daily, target, lookback, stride, matriz, serie)
+        #Memoria de la tabla diaria y de las secuencias (la matriz que recorren las ventanas)
+        mlflow.log_metrics({"memory_mb_dataset": memoria_mb(df), "memory_mb_secuencias": memoria_ventanas_mb(X)})
+        split = split_temporal(X, y)
+        (X_tr, y_tr), (X_val, y_val), (X_ts, y_ts) = split
+        
+        #Crear y entrenar modelo
+        input_shape = (X_tr.shape[1], X_tr.shape[2])
         model = crear_modelo_lstm(input_shape, dropout_rate, lstm_units)
         model = compilar_modelo(model, learning_rate)
-
-        #Callbacks para guardar solo los pesos
-        callbacks = crear_callbacks("lstm_model_pasajeros", output_model_dir)
+        callbacks = crear_callbacks(f"lstm_model_{nombre}", output_model_dir)
+        #Entrada numpy (arrays de ventanas) o tf_data (ventaneo en el grafo, cache y prefetch)
+        medidor = MedidorEpocas()
         history = model.fit(
-            Xp_tr, yp_tr,
-            validation_data=(Xp_val, yp_val),
+            **datos_fit(entrada, matriz, serie, split, lookback, stride, batch_size, shuffle_buffer),
             epochs=epochs,
-            batch_size=batch_size,
-            callbacks=callbacks,
-            verbose=1
+            callbacks=callbacks + [medidor],
+            verbose=verbose
         )
-
-        #Guardar histórico
-        hist_path = os.path.join(output_model_dir, 'history_lstm_pasajeros.pkl')
+        #Tiempo por epoca y pico de memoria, para comparar las entradas
+        mlflow.log_metrics(medidor.resumen())
+        
+        #Guardar modelo completo en formato SavedModel (mas completo que h5)
+        saved_model_path = os.path.join(output_model_dir, f'lstm_model_{nombre}_savedmodel')
+        model.save(saved_model_path, save_format='tf')
+        
+        #Guardar historico y scaler
+        hist_path = os.path.join(output_model_dir, f'history_lstm_{nombre}.pkl')
         with open(hist_path, 'wb') as f:
             pickle.dump(history.history, f)
-
-        #Cargar pesos del mejor checkpoint y guardar modelo completo en .keras
-        weights_path = os.path.join(output_model_dir, 'lstm_model_pasajeros_weights.h5')
-        model.load_weights(weights_path)
-        full_model_path = os.path.join(output_model_dir, 'lstm_model_pasajeros.keras')
-        model.save(full_model_path, save_format='keras')
-        #Eliminar el fichero de pesos intermedios
-        try:
-            os.remove(weights_path)
-        except OSError:
-            pass
-
-        #Predicción y calculo de metricas
-        y_pred_norm = model.predict(Xp_ts)
-        y_pred = scaler_p.inverse_transform(y_pred_norm.reshape(-1,1)).flatten()
-        y_true = scaler_p.inverse_transform(yp_ts.reshape(-1,1)).flatten()
-        metrics_p = calculate_metrics(y_true, y_pred)
-
-        #Log params y metrics
-        for k,v in {
-            'lookback': lookback, 'lstm_units': lstm_units,
-            'dropout_rate': dropout_rate, 'learning_rate': learning_rate,
-            'epochs': epochs, 'batch_size': batch_size
-        }.items():
-            mlflow.log_param(k, v)
-        for k,v in metrics_p.items():
-            mlflow.log_metric(k if k!='R²' else 'R2', v)
-
-        #Registrar artefactos: modelo y historial
-        mlflow.log_artifact(os.path.join(output_model_dir, 'lstm_model_pasajeros.keras'), artifact_path='model_checkpoint')
-        mlflow.log_artifact(hist_path, artifact_path='history')
-    
-    #ENTRENAMIENTO MODELO DE VEHÍCULOS
-    with mlflow.start_run(run_name="Training_(V)LSTM_Run"):
-        #Crear secuencias vehiculos
-        Xv, yv = crear_secuencias(df_v_daily, 'total_vehiculos', lookback)
-        (Xv_tr, yv_tr), (Xv_val, yv_val), (Xv_ts, yv_ts) = split_temporal(Xv, yv)
+        scaler_path = os.path.join(output_model_dir, f'scaler_{nombre}.pkl')
+        joblib.dump(scaler, scaler_path)
         
-        #Definición y compilacion del modelo de vehiculos
-        input_shape_v = (Xv_tr.shape[1], Xv_tr.shape[2])
-        model_v = crear_modelo_lstm(input_shape_v, dropout_rate, lstm_units)
-        model_v = compilar_modelo(model_v, learning_rate)
+        #Guardar feature_columns
+        features_path = os.path.join(output_model_dir, f'feature_columns_{nombre}.pkl')
+        joblib.dump(feature_cols, features_path)
         
-        #Callbacks del modelo de vehiculos
-        callbacks_v = crear_callbacks("lstm_model_vehiculos", output_model_dir)
-        history_v = model_v.fit(
-            Xv_tr, yv_tr,
-            validation_data=(Xv_val, yv_val),
-            epochs=epochs,
-            batch_size=batch_size,
-            callbacks=callbacks_v,
-            verbose=1
-        )
+        #Log artifacts con MLflow
+        mlflow.log_artifact(hist_path, artifact_path='history')
+        mlflow.log_artifact(scaler_path, artifact_path='scalers')
+        mlflow.log_artifact(features_path, artifact_path='features')
+        mlflow.log_artifact(saved_model_path, artifact_path='saved_model')
         
-        #Guardar historico vehiculos
-        hist_path_v = os.path.join(output_model_dir, 'history_lstm_vehiculos.pkl')
-        with open(hist_path_v, 'wb') as f:
-            pickle.dump(history_v.history, f)
-            
-        #Cargar pesos del mejor checkpoint y guardar modelo completo en .keras
-        weights_path_v = os.path.join(output_model_dir, 'lstm_model_vehiculos_weights.h5')
-        model_v.load_weights(weights_path_v)
-        full_model_path_v = os.path.join(output_model_dir, 'lstm_model_vehiculos.keras')
-        model_v.save(full_model_path_v, save_format='keras')
-        #Eliminar fichero de pesos intermedios
-        try:
-            os.remove(weights_path_v)
-        except OSError:
-            pass
+        #Registrar modelo con MLflow
+        mlflow.keras.log_model(
+            model,
+            artifact_path=f"model_{nombre}",
+            registered_model_name=f"lstm_{nombre}"
+        )
         
-        #Prediccion y calculo de metricas de vehículos
-        y_pred_norm_v = model_v.predict(Xv_ts)
-        y_pred_v = scaler_v.inverse_transform(y_pred_norm_v.reshape(-1,1)).flatten()
-        y_true_v = scaler_v.inverse_transform(yv_ts.reshape(-1,1)).flatten()
-        metrics_v = calculate_metrics(y_true_v, y_pred_v)
+        #Prediccion y metricas
+        y_pred_norm = model.predict(X_ts)
+        y_pred = scaler.inverse_transform(y_pred_norm.reshape(-1,1)).flatten()
+        y_true = scaler.inverse_transform(y_ts.reshape(-1,1)).flatten()
+        metrics = calculate_metrics(y_true, y_pred)
         
-        #Log params y metrics para vehiculos
-        for k,v in {
-            'lookback': lookback, 'lstm_units': lstm_units,
-            'dropout_rate': dropout_rate, 'learning_rate': learning_rate,
-            'epochs': epochs, 'batch_size': batch_size
-        }.items():
-            mlflow.log_param(k, v)
-        for k,v in metrics_v.items():
-            mlflow.log_metric(k if k!='R²' else 'R2', v)
-            
-        #Registrar artefactos: modelo y historial para vehculos
-        mlflow.log_artifact(os.path.join(output_model_dir, 'lstm_model_vehiculos.keras'), artifact_path='model_checkpoint')
-        mlflow.log_artifact(hist_path_v, artifact_path='history')
+        #Log metrics to MLflow
+        for metric_name, metric_value in metrics.items():
+            mlflow.log_metric(metric_name, metric_value)
+    
+    return metrics
 
-    return {'pasajeros': metrics_p, 'vehiculos': metrics_v}
+def train_lstm(
+    input_path=TABLA_DIARIA_PATH,
+    output_model_dir="models",
+    lookback=7,
+    stride=1,
+    lstm_units=64,
+    dropout_rate=0.1,
+    learning_rate=0.001,
+    epochs=300,
+    batch_size=32,
+    entrada=ENTRADA_ENTRENAMIENTO,
+    shuffle_buffer=SHUFFLE_BUFFER,
+    paralelo=ENTRENAMIENTO_PARALELO,
+    config_dir=CONFIG_BUSQUEDA_DIR
+):
+    """
+    Entrena los modelos de MODELOS, uno tras otro o, con paralelo, cada uno en
+    su proceso con su reparto de hilos y CPUs (ver entrenamiento_paralelo.py).
+    Con config_dir, cada modelo usa los hiperparametros de su config_<modelo>.json
+    (la mejor configuracion de busqueda_hiperparametros.py)
+    """
+    mlflow.set_tracking_uri(MLFLOW_URI)
+    
+    #Guardar configuracion general
+    config_general = {
+        "lookback": lookback,
+        "stride": stride,
+        "lstm_units": lstm_units,
+        "dropout_rate": dropout_rate,
+        "learning_rate": learning_rate,
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "entrada": entrada,
+        "shuffle_buffer": shuffle_buffer,
+        "input_path": input_path,
+        "fecha_entrenamiento": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    
+    #Cargar tabla diaria (si aun no se ha generado, se agrega del dataset por billete)
+    if not os.path.exists(input_path):
+        input_path = "data/processed/dataset_empresa_03_pos_EDA_2.parquet"
+        config_general["input_path"] = input_path
+    df = leer_tabla_diaria(input_path)
+    
+    parametros = {
+        "output_model_dir": output_model_dir, "lookback": lookback, "stride": stride,
+        "lstm_units": lstm_units, "dropout_rate": dropout_rate, "learning_rate": learning_rate,
+        "epochs": epochs, "batch_size": batch_size, "entrada": entrada, "shuffle_buffer": shuffle_buffer
+    }
+    configs, parametros_modelos = {}, {}
+    for nombre in MODELOS:
+        hiperparametros = hiperparametros_busqueda(config_dir, nombre) if config_dir else {}
+        configs[nombre] = {**config_general, **hiperparametros}
+        parametros_modelos[nombre] = {**parametros, **hiperparametros}
+    if paralelo:
+        return entrenar_en_paralelo(__file__, MODELOS, df, configs, parametros_modelos)
+    
+    #ENTRENAMIENTO DE PASAJEROS Y DE VEHICULOS, uno tras otro
+    return {nombre: entrenar_modelo(nombre, df, configs[nombre], **parametros_modelos[nombre]) for nombre in MODELOS}
 
 
 def run_train_lstm():
     return train_lstm()
 
-
 if __name__ == '__main__':
     res = run_train_lstm()
-    print('Resumen metricas pasajeros:', res['pasajeros'])
-    print('Resumen metricas vehículos:', res['vehiculos'])
-
-
-
+    print('Metricas Pasajeros:', res['pasajeros'])
+    print('Metricas Vehículos:', res['vehiculos'])
\ No newline at end of file
@@ -0,0 +1,303 @@
+# pipeline/motor_duckdb.py
+
+import os
+import logging
+import pandas as pd
+import duckdb
+from raw_store import RAW_DATASET_PATH, is_parquet_store, list_raw_files, raw_columns
+from esquema import (COLUMNAS_POR_ETAPA, ESQUEMA_BILLETES, TIPOS_PASAJEROS, TIPOS_VEHICULOS,
+                     TIPOS_EXCLUIDOS, FORMATO_FECHA_HORA, FORMATO_FECHA, COLUMNA_CLAVE,
+                     COLUMNAS_DEDUPLICACION, dtype_compacto, es_parquet, guardar_tabla, memoria_mb,
+                     compactar)
+from indice_claves import ruta_indice, indice_vigente
+from buques import tabla_buques
+from calendario import tabla_calendario, COLUMNAS_DIA
+from features import compilar_sql, calcular_features
+from preprocessing_01 import COLUMNAS_ENTRADA, CLAVE_DUPLICADOS
+from tabla_diaria import (TABLA_DIARIA_PATH, COLUMNAS_FEATURES, COLUMNAS_SALIDA, TARGETS,
+                          completar_dias)
+
+#Motor alternativo del preprocesamiento (PREPROCESSING_ENGINE=duckdb): las mismas
+#transformaciones de preprocessing_01 + preprocessing_02 expresadas en SQL sobre el
+#Parquet/CSV raw. DuckDB usa todos los nucleos y vuelca a disco si no cabe en memoria
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0")) or os.cpu_count()
+#Limite de memoria de DuckDB (p.ej. "4GB"); vacio: el de DuckDB (80% de la RAM)
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "")
+DUCKDB_TEMP_DIR = os.getenv("DUCKDB_TEMP_DIR", "data/tmp/duckdb")
+
+#Cadenas que read_csv de pandas lee como nulo (para leer el CSV raw igual que el motor pandas)
+NULOS_CSV = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+#Tipos SQL de la disposicion compacta de esquema.TIPOS_COMPACTOS
+TIPOS_SQL = {"int8": "TINYINT", "int16": "SMALLINT", "int32": "INTEGER", "float32": "FLOAT"}
+
+
+def literal(valor) -> str:
+    #Literal SQL de texto (rutas, codigos de billete)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def lista_sql(valores) -> str:
+    return "(" + ", ".join(literal(v) for v in valores) + ")"
+
+
+def conectar() -> duckdb.DuckDBPyConnection:
+    """
+    Conexion en memoria con hilos, limite de memoria y directorio de volcado a disco
+    configurables. El orden de insercion se conserva: la deduplicacion keep='last'
+    depende del orden de las filas en el raw.
+    """
+    os.makedirs(DUCKDB_TEMP_DIR, exist_ok=True)
+    con = duckdb.connect()
+    con.execute(f"SET threads = {int(DUCKDB_THREADS)}")
+    con.execute(f"SET temp_directory = {literal(DUCKDB_TEMP_DIR)}")
+    con.execute("SET preserve_insertion_order = true")
+    con.execute("SET enable_progress_bar = false")
+    if DUCKDB_MEMORY_LIMIT:
+        con.execute(f"SET memory_limit = {literal(DUCKDB_MEMORY_LIMIT)}")
+    return con
+
+
+def fuente_raw(input_path: str):
+    """
+    Devuelve la tabla SQL del raw y sus columnas de entrada, en el mismo orden
+    que las ve preprocessing_01 (orden del fichero en el CSV, el pedido en el Parquet).
+    Las expresiones incluyen ademas las columnas de deduplicacion que tenga el raw.
+    El CSV se lee como texto y se tipa segun el esquema, como aplicar_esquema.
+    """
+    presentes = raw_columns(input_path)
+    deduplicacion = [c for c in COLUMNAS_DEDUPLICACION if c in presentes]
+    if is_parquet_store(input_path):
+        ficheros = list_raw_files(input_path)
+        if not ficheros:
+            raise FileNotFoundError(f"No hay particiones en {input_path}")
+        columnas = [c for c in COLUMNAS_ENTRADA if c in presentes]
+        tabla = f"read_parquet([{', '.join(literal(f) for f in ficheros)}], hive_partitioning = false)"
+        return tabla, {col: col for col in columnas + deduplicacion}, columnas
+
+    columnas = [c for c in presentes if c in COLUMNAS_ENTRADA]
+    tabla = f"read_csv({literal(input_path)}, header = true, all_varchar = true, nullstr = {NULOS_CSV})"
+    expresiones = {col: f"TRY_CAST({col} AS BIGINT)" for col in deduplicacion}
+    for col in columnas:
+        spec = ESQUEMA_BILLETES[col]
+        if spec["dtype"].startswith("datetime64"):
+            #Formato exacto y, si no encaja, ISO8601 (como parsear_fecha)
+            expresiones[col] = f"COALESCE(try_strptime({col}, {literal(spec['formato'])}), TRY_CAST({col} AS TIMESTAMP))"
+        elif spec["dtype"] == "Int64":
+            expresiones[col] = f"TRY_CAST({col} AS BIGINT)"
+        else:
+            expresiones[col] = col
+    return tabla, expresiones, columnas
+
+
+def compactar_sql(columnas: dict) -> dict:
+    #Mismos tipos compactos que esquema.compactar, como CAST en cada expresion
+    compactas = {}
+    for col, expresion in columnas.items():
+        dtype = dtype_compacto(col)
+        compactas[col] = f"CAST({expresion} AS {TIPOS_SQL[dtype]})" if dtype else expresion
+    return compactas
+
+
+def columnas_01(columnas_raw: list) -> dict:
+    """
+    Expresiones SQL de la salida de preprocessing_01, en su orden de columnas.
+    u: billetes deduplicados, r: registro de buques, t: totales por salida, c: calendario
+    """
+    pasajeros, vehiculos = lista_sql(TIPOS_PASAJEROS), lista_sql(TIPOS_VEHICULOS)
+    capacidades = {
+        "capacidad_pasajeros": "COALESCE(r.capacidad_pasajeros, 0)",
+        "capacidad_vehiculos": "COALESCE(r.capacidad_vehiculos, 0)",
+    }
+    columnas = {}
+    for col in columnas_raw:
+        if col != "con_incidencia":
+            columnas[col] = capacidades.get(col, f"u.{col}")
+    columnas["anio_embarque"] = "year(u.con_fecha)"
+    columnas["anio"] = "year(u.con_fecha)"
+    columnas["diferencia_min"] = "(epoch_us(u.con_fecha) - epoch_us(u.con_dateticket)) / 1000000 / 60"
+    for col, expresion in capacidades.items():
+        columnas.setdefault(col, expresion)
+    columnas["total_pasajeros"] = "t.total_pasajeros"
+    columnas["total_vehiculos"] = "t.total_vehiculos"
+    columnas["porc_ocupacion_pasajeros"] = "CAST(t.total_pasajeros AS DOUBLE) / COALESCE(r.capacidad_pasajeros, 0) * 100"
+    columnas["porc_ocupacion_vehiculos"] = "CAST(t.total_vehiculos AS DOUBLE) / COALESCE(r.capacidad_vehiculos, 0) * 100"
+    for col in COLUMNAS_DIA:
+        columnas[col] = f"c.{col}"
+    columnas["hora_embarque"] = "hour(u.con_fecha)"
+    columnas["agrupacion_billete"] = (f"CASE WHEN u.con_tipobillete IN {vehiculos} THEN 0 "
+                                      f"WHEN u.con_tipobillete IN {pasajeros} THEN 1 ELSE 2 END")
+    return compactar_sql(columnas)
+
+
+def columnas_02(columnas_entrada: list, anios: list) -> dict:
+    """
+    Expresiones SQL de la salida de preprocessing_02 sobre billetes_01, en su orden.
+    Los años one-hot dependen de los presentes (como get_dummies); las variables
+    ciclicas y one-hot de fecha salen de la especificacion de features.py
+    """
+    pasajeros = lista_sql(TIPOS_PASAJEROS)
+    columnas = {col: col for col in columnas_entrada if col not in ("anio_embarque", "day_of_week", "month")}
+    columnas["fecha_embarque"] = "CAST(con_fecha AS DATE)"
+    columnas["dia_embarque"] = "isodow(con_fecha)"
+    columnas["tipo_agrupacion"] = f"CASE WHEN con_tipobillete IN {pasajeros} THEN 1 ELSE 0 END"
+    columnas["mes_embarque"] = "month(con_fecha)"
+    for anio in anios:
+        columnas[f"anio_{anio}"] = f"CAST(anio_embarque IS NOT DISTINCT FROM {int(anio)} AS BIGINT)"
+    columnas["dia_del_anio"] = "dayofyear(con_fecha)"
+    columnas.update(compilar_sql("con_fecha"))
+    return compactar_sql(columnas)
+
+
+def select_sql(columnas: dict) -> str:
+    return ",\n    ".join(f"{expresion} AS {col}" for col, expresion in columnas.items())
+
+
+def copiar_salida(con, columnas: dict, output_path: str) -> None:
+    """
+    Escritura en paralelo y en el orden original de las filas: en Parquet (por
+    extension, con fecha_embarque como TIMESTAMP igual que pandas) o en CSV con
+    los formatos de fecha de to_csv
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    if es_parquet(output_path):
+        if "fecha_embarque" in columnas:
+            columnas = {**columnas, "fecha_embarque": f"CAST({columnas['fecha_embarque']} AS TIMESTAMP)"}
+        opciones = "FORMAT PARQUET"
+    else:
+        opciones = (f"HEADER, DELIMITER ',', TIMESTAMPFORMAT {literal(FORMATO_FECHA_HORA)}, "
+                    f"DATEFORMAT {literal(FORMATO_FECHA)}")
+    con.execute(f"""
+        COPY (SELECT {select_sql(columnas)} FROM billetes_01 ORDER BY fila)
+        TO {literal(output_path)} ({opciones})
+    """)
+
+
+def agregar_dias(con, columnas: dict) -> pd.DataFrame:
+    """
+    Agregado por dia de la salida de preprocessing_02 (mismo criterio que
+    tabla_diaria.agregar_dias): variables de la primera fila del dia y conteo de cada target
+    """
+    variables = ", ".join(f"first({col} ORDER BY fila) AS {col}" for col in COLUMNAS_FEATURES)
+    conteos = ", ".join(f"count_if(tipo_agrupacion = {tipo}) AS {target}" for target, tipo in TARGETS.items())
+    return con.execute(f"""
+        SELECT CAST(fecha_embarque AS TIMESTAMP) AS fecha_embarque, {variables}, {conteos}
+        FROM (SELECT fila, {select_sql(columnas)} FROM billetes_01)
+        GROUP BY fecha_embarque
+    """).df()
+
+
+def agregar_salidas(con, columnas_entrada: list) -> pd.DataFrame:
+    #Primera fila de cada salida (tabla_diaria.tabla_por_salida) + variables de fecha
+    columnas = [c for c in COLUMNAS_SALIDA if c in columnas_entrada and c != "con_bacoope"]
+    primeras = ", ".join(f"first({col} ORDER BY fila) AS {col}" for col in columnas)
+    salidas = con.execute(f"""
+        SELECT con_bacoope, {primeras} FROM billetes_01
+        WHERE con_bacoope IS NOT NULL GROUP BY con_bacoope ORDER BY min(fila)
+    """).df()
+    return compactar(pd.concat([salidas, calcular_features(salidas["con_fecha"])], axis=1))
+
+
+def preprocessing_duckdb(input_path: str = RAW_DATASET_PATH,
+                         output_path: str = "data/processed/dataset_empresa_03_pos_EDA_2.parquet",
+                         checkpoint_path: str = None,
+                         diario_path: str = TABLA_DIARIA_PATH,
+                         salidas_path: str = None) -> dict:
+    """
+    preprocessing_01 + preprocessing_02 en DuckDB:
+    1) Lee el raw, lo tipa y descarta DESEMBARCADO y los tipos de billete excluidos
+    2) Deduplica por CLAVE_DUPLICADOS quedandose con la ultima fila (orden del raw):
+       semi-join con el indice de claves si esta vigente, si no por clave_billete
+    3) Une capacidades, totales por salida y dimension calendario (billetes_01)
+    4) Escribe billetes_01 en checkpoint_path, si se indica
+    5) Calcula las variables de preprocessing_02 (features.py compilado a SQL) y escribe la salida
+    6) Agrega por dia (y por salida si salidas_path) y completa la serie en pandas
+    Devuelve lo mismo que preprocessing.preprocessing.
+    """
+    con = conectar()
+    try:
+        tabla, expresiones, columnas_raw = fuente_raw(input_path)
+        tipos = f"SELECT {select_sql(expresiones)} FROM {tabla}"
+
+        #PASO 1: filtros por fila. El rowid de la tabla conserva el orden del raw
+        con.execute(f"""
+            CREATE TEMP TABLE billetes AS
+            SELECT * FROM ({tipos})
+            WHERE con_incidencia IS DISTINCT FROM 'DESEMBARCADO'
+              AND (con_tipobillete IS NULL OR con_tipobillete NOT IN {lista_sql(TIPOS_EXCLUIDOS)})
+        """)
+        anio_min, anio_max = con.execute("SELECT min(year(con_fecha)), max(year(con_fecha)) FROM billetes").fetchone()
+        if anio_min is None:
+            raise ValueError(f"No quedan billetes en {input_path} tras los filtros")
+
+        #Dimensiones pequeñas: se copian a tablas DuckDB una vez
+        buques = tabla_buques()
+        calendario = tabla_calendario(anio_min, anio_max)[["fecha"] + COLUMNAS_DIA]
+        con.execute("CREATE TEMP TABLE buques AS SELECT * FROM buques")
+        con.execute("CREATE TEMP TABLE calendario AS SELECT * FROM calendario")
+
+        #PASO 2: deduplicacion keep='last' (fila: posicion en el raw filtrado)
+        if indice_vigente(input_path):
+            sobreviven = f"con_clave IN (SELECT con_clave FROM read_parquet({literal(ruta_indice(input_path))}))"
+        else:
+            clave = COLUMNA_CLAVE if COLUMNA_CLAVE in expresiones else ", ".join(CLAVE_DUPLICADOS)
+            sobreviven = f"rowid IN (SELECT max(rowid) FROM billetes GROUP BY {clave})"
+        con.execute(f"""
+            CREATE TEMP TABLE unicos AS
+            SELECT rowid AS fila, * FROM billetes WHERE {sobreviven}
+        """)
+        con.execute("DROP TABLE billetes")
+
+        #PASO 3: totales por salida y joins con las dimensiones
+        pasajeros, vehiculos = lista_sql(TIPOS_PASAJEROS), lista_sql(TIPOS_VEHICULOS)
+        salida_01 = columnas_01(columnas_raw)
+        con.execute(f"""
+            CREATE TEMP TABLE billetes_01 AS
+            WITH totales AS (
+                SELECT con_bacoope,
+                       count_if(con_tipobillete IN {pasajeros}) AS total_pasajeros,
+                       count_if(con_tipobillete IN {vehiculos}) AS total_vehiculos
+                FROM unicos WHERE con_bacoope IS NOT NULL GROUP BY con_bacoope
+            )
+            SELECT u.fila, {select_sql(salida_01)}
+            FROM unicos u
+            LEFT JOIN buques r
+              ON u.buq_nombre = r.buq_nombre
+            LEFT JOIN totales t ON u.con_bacoope = t.con_bacoope
+            LEFT JOIN calendario c ON date_trunc('day', u.con_fecha) = c.fecha
+        """)
+        con.execute("DROP TABLE unicos")
+        filas = con.execute("SELECT count(*) FROM billetes_01").fetchone()[0]
+        memoria = {"duckdb_01": round(con.execute(
+            "SELECT sum(memory_usage_bytes) FROM duckdb_memory()").fetchone()[0] / 2**20, 1)}
+        logging.info(f"DuckDB preprocessing_01: {filas} filas ({DUCKDB_THREADS} hilos, {memoria['duckdb_01']} MB)")
+
+        #PASO 4: checkpoint con la salida de preprocessing_01
+        if checkpoint_path:
+            copiar_salida(con, {col: col for col in salida_01}, checkpoint_path)
+
+        #PASO 5: salida de preprocessing_02
+        anios = [a for (a,) in con.execute(
+            "SELECT DISTINCT anio_embarque FROM billetes_01 WHERE anio_embarque IS NOT NULL ORDER BY 1").fetchall()]
+        entrada_02 = [col for col in salida_01 if col in COLUMNAS_POR_ETAPA["preprocessing_02"]]
+        salida_02 = columnas_02(entrada_02, anios)
+        copiar_salida(con, salida_02, output_path)
+        logging.info(f"DuckDB preprocessing_02: {filas} filas escritas en {output_path}")
+
+        #PASO 6: tablas agregadas (pocas filas: se completan en pandas)
+        diario = completar_dias(agregar_dias(con, salida_02))
+        salidas = agregar_salidas(con, list(salida_01)) if salidas_path else None
+    finally:
+        con.close()
+
+    guardar_tabla(diario, diario_path)
+    memoria["diario"] = memoria_mb(diario)
+    resultado = {"output_path": output_path, "filas_01": filas, "filas_02": filas, "filas_diarias": len(diario),
+                 "memoria_mb": memoria}
+    if salidas_path:
+        guardar_tabla(salidas, salidas_path)
+        resultado["filas_salidas"] = len(salidas)
+    return resultado
@@ -0,0 +1,166 @@
+# pipeline/preprocessing.py
+
+import os
+import logging
+import pandas as pd
+import mlflow
+from dotenv import load_dotenv
+from subida_artefactos import encolar_artefacto, esperar_subidas
+from raw_store import RAW_DATASET_PATH, read_raw_dataset
+from esquema import COLUMNAS_POR_ETAPA, dtypes_lectura, aplicar_esquema, memoria_mb, guardar_tabla
+from preprocessing_01 import (PREPROCESSING_CHUNK_SIZE, columnas_lectura, transformar_01,
+                              bloques_01, escribir_bloque)
+from indice_claves import leer_supervivientes
+from preprocessing_02 import transformar_02
+from tabla_diaria import TABLA_DIARIA_PATH, tabla_diaria, tabla_por_salida
+
+load_dotenv()
+MLFLOW_URI = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+
+#Motor del preprocesamiento: "pandas" (por defecto) o "duckdb" (ver motor_duckdb)
+PREPROCESSING_ENGINE = os.getenv("PREPROCESSING_ENGINE", "pandas")
+MOTORES = ("pandas", "duckdb")
+
+#Salida final por defecto: Parquet conserva los tipos compactos (CSV si la ruta acaba en .csv)
+OUTPUT_PATH = "data/processed/dataset_empresa_03_pos_EDA_2.parquet"
+
+
+def columnas_02(df: pd.DataFrame) -> list:
+    #Columnas de la salida de preprocessing_01 que lee preprocessing_02, en el orden del fichero
+    return [col for col in df.columns if col in COLUMNAS_POR_ETAPA["preprocessing_02"]]
+
+
+def preprocessing(input_path: str = RAW_DATASET_PATH,
+                  output_path: str = OUTPUT_PATH,
+                  checkpoint_path: str = None,
+                  chunksize: int = PREPROCESSING_CHUNK_SIZE,
+                  motor: str = PREPROCESSING_ENGINE,
+                  diario_path: str = TABLA_DIARIA_PATH,
+                  salidas_path: str = None) -> dict:
+    """
+    preprocessing_01 + preprocessing_02 en un solo paso, sin CSV intermedio:
+    1) Lee y tipa el dataset raw una vez
+    2) Aplica preprocessing_01 en memoria (o por bloques si chunksize)
+    3) Pasa a preprocessing_02 solo sus columnas de entrada, ya tipadas
+    4) Escribe el resultado final y, si se indica checkpoint_path, tambien
+       la salida de preprocessing_01 (el antiguo pos_EDA_1.csv)
+    5) Materializa la tabla diaria de entrenamiento en diario_path y, si se
+       indica salidas_path, la tabla por salida (ver tabla_diaria)
+    Devuelve la ruta de salida, las filas de cada etapa y la memoria (MB) de
+    los DataFrames de cada etapa.
+    Con motor="duckdb" las mismas transformaciones se ejecutan en DuckDB (chunksize no aplica).
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de preprocesamiento desconocido: {motor} (opciones: {MOTORES})")
+    if motor == "duckdb":
+        #Import diferido: duckdb solo es necesario con este motor
+        from motor_duckdb import preprocessing_duckdb
+        return preprocessing_duckdb(input_path, output_path, checkpoint_path, diario_path, salidas_path)
+
+    if chunksize:
+        #Solo se acumulan las columnas que necesita preprocessing_02
+        partes, salidas, filas_01, memoria = [], [], 0, {"bloque_01": 0}
+        for bloque in bloques_01(input_path, chunksize):
+            if checkpoint_path:
+                escribir_bloque(bloque, checkpoint_path, primero=(filas_01 == 0))
+            if salidas_path:
+                salidas.append(tabla_por_salida(bloque))
+            filas_01 += len(bloque)
+            memoria["bloque_01"] = max(memoria["bloque_01"], memoria_mb(bloque))
+            partes.append(bloque[columnas_02(bloque)])
+        df_01 = pd.concat(partes, ignore_index=True)
+        if salidas_path:
+            #Los totales son por salida en todo el raw: basta la primera aparicion
+            df_salidas = pd.concat(salidas, ignore_index=True).drop_duplicates("con_bacoope", ignore_index=True)
+    else:
+        columnas = columnas_lectura(input_path)
+        df = aplicar_esquema(read_raw_dataset(input_path, columns=columnas, dtype=dtypes_lectura(columnas)))
+        memoria = {"raw": memoria_mb(df)}
+        df_01 = transformar_01(df, leer_supervivientes(input_path))
+        del df
+        memoria["preprocessing_01"] = memoria_mb(df_01)
+        if checkpoint_path:
+            escribir_bloque(df_01, checkpoint_path, primero=True)
+        if salidas_path:
+            df_salidas = tabla_por_salida(df_01)
+        filas_01 = len(df_01)
+        df_01 = df_01[columnas_02(df_01)].reset_index(drop=True)
+    memoria["entrada_02"] = memoria_mb(df_01)
+    logging.info(f"preprocessing_01: {filas_01} filas")
+
+    df_final = transformar_02(df_01)
+    del df_01
+    memoria["preprocessing_02"] = memoria_mb(df_final)
+    guardar_tabla(df_final, output_path)
+    logging.info(f"preprocessing_02: {len(df_final)} filas escritas en {output_path}")
+
+    diario = tabla_diaria(df_final)
+    memoria["diario"] = memoria_mb(diario)
+    guardar_tabla(diario, diario_path)
+    logging.info(f"Memoria por etapa (MB): {memoria}")
+    resultado = {"output_path": output_path, "filas_01": filas_01, "filas_02": len(df_final),
+                 "filas_diarias": len(diario), "memoria_mb": memoria}
+    if salidas_path:
+        guardar_tabla(df_salidas, salidas_path)
+        resultado["filas_salidas"] = len(df_salidas)
+    return resultado
+
+
+def run_preprocessing(input_path: str = RAW_DATASET_PATH,
+                      output_path: str = OUTPUT_PATH,
+                      checkpoint_path: str = os.getenv("PREPROCESSING_CHECKPOINT") or None,
+                      chunksize: int = PREPROCESSING_CHUNK_SIZE,
+                      motor: str = PREPROCESSING_ENGINE,
+                      diario_path: str = TABLA_DIARIA_PATH,
+                      salidas_path: str = os.getenv("TABLA_SALIDAS_PATH") or None) -> str:
+    """
+    Ejecuta el preprocesamiento completo con MLflow. Las metricas salen de los
+    objetos en memoria; solo se sube la salida final (y el checkpoint si lo hay).
+    """
+    mlflow.set_tracking_uri(MLFLOW_URI)
+    with mlflow.start_run(run_name="Preprocessing_Run"):
+        resultado = preprocessing(input_path, output_path, checkpoint_path, chunksize, motor,
+                                  diario_path, salidas_path)
+
+        mlflow.log_metric("rows_after_preprocessing", resultado["filas_01"])
+        mlflow.log_metric("rows_after_preprocessing_02", resultado["filas_02"])
+        mlflow.log_metric("rows_daily_table", resultado["filas_diarias"])
+        for etapa, mb in resultado["memoria_mb"].items():
+            mlflow.log_metric(f"memory_mb_{etapa}", mb)
+        mlflow.log_param("input_dataset", input_path)
+        mlflow.log_param("output_dataset", output_path)
+        mlflow.log_param("checkpoint", checkpoint_path)
+        mlflow.log_param("chunksize", chunksize)
+        mlflow.log_param("motor", motor)
+        mlflow.log_param("daily_table", diario_path)
+
+        encolar_artefacto(output_path, artifact_path="processed_data_02")
+        encolar_artefacto(diario_path, artifact_path="processed_daily")
+        if checkpoint_path:
+            encolar_artefacto(checkpoint_path, artifact_path="processed_data")
+        if salidas_path:
+            encolar_artefacto(salidas_path, artifact_path="processed_daily")
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preprocesamiento completo (01 + 02) en memoria")
+    parser.add_argument("--input", default=RAW_DATASET_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Parquet (por defecto) o CSV segun la extension")
+    parser.add_argument("--checkpoint", help="Guardar tambien la salida de preprocessing_01 en esta ruta")
+    parser.add_argument("--chunksize", type=int, default=PREPROCESSING_CHUNK_SIZE,
+                        help="Procesar preprocessing_01 por bloques de este tamaño")
+    parser.add_argument("--motor", choices=MOTORES, default=PREPROCESSING_ENGINE,
+                        help="Motor de ejecucion (tambien PREPROCESSING_ENGINE)")
+    parser.add_argument("--diario", default=TABLA_DIARIA_PATH,
+                        help="Tabla diaria de entrenamiento (variables + targets)")
+    parser.add_argument("--salidas", default=os.getenv("TABLA_SALIDAS_PATH") or None,
+                        help="Guardar tambien la tabla por salida en esta ruta")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_preprocessing(args.input, args.output, args.checkpoint, args.chunksize, args.motor,
+                      args.diario, args.salidas)
+    esperar_subidas()
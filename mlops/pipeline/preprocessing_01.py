@@ -1,241 +1,232 @@
 # pipeline/preprocessing_01.py
 
 import os
+import logging
 import pandas as pd
 import numpy as np
 import mlflow
+from subida_artefactos import encolar_artefacto, esperar_subidas
 from dotenv import load_dotenv
+from raw_store import RAW_DATASET_PATH, read_raw_dataset, iter_raw_dataset, raw_columns
+from esquema import (COLUMNAS_POR_ETAPA, TIPOS_PASAJEROS, TIPOS_VEHICULOS, CLAVE_DUPLICADOS,
+                     COLUMNA_CLAVE, COLUMNAS_DEDUPLICACION, FORMATO_FECHA_HORA, dtypes_lectura,
+                     aplicar_esquema, compactar, clave_billete, es_billete_valido)
+from indice_claves import leer_supervivientes
+from buques import asignar_capacidades
+from calendario import unir_calendario
 
 #Carga variables  entorno
 load_dotenv()
 
 MLFLOW_URI = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
 
-def preprocessing_01(input_path: str = "data/raw/dataset_empresa_03.csv", 
-                    output_path: str = "data/processed/dataset_empresa_03_pos_EDA_1.csv") -> str:
+#Columnas raw que usa esta etapa
+COLUMNAS_ENTRADA = COLUMNAS_POR_ETAPA["preprocessing_01"]
+
+def totales_por_salida(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Realiza la primera fase de preprocesamiento de datos:
-    1) Carga los datos
-    2) Limpia y transforma los datos
-    3) Añade características temporales y de ocupación
-    4) Registra el dataset resultante en MLflow
+    Añade total_pasajeros / total_vehiculos de cada salida (con_bacoope) a todas sus filas:
+    1) Codifica con_bacoope como codigos de grupo (factorize, NaN -> -1)
+    2) Cuenta billetes de pasajero y de vehiculo por codigo con bincount
+    3) Devuelve los conteos a cada fila indexando por su codigo (sin merge)
+    Las filas sin con_bacoope quedan con NaN, igual que con el merge anterior.
     """
-    dtype_especifico = {
-        "con_clave": "Int64",
-        "con_bacoope": "Int64",
-        "con_fecha": "str",
-        "con_tipo": "string",
-        "con_codigo": "string",
-        "con_naviera": "string",
-        "con_dni": "string",
-        "con_tipobillete": "string",
-        "con_cupon": "string",
-        "con_trayecto": "string",
-        "con_shortcomp": "string",
-        "con_dateticket": "str",
-        "con_acredita": "string",
-        "con_nombre": "string",
-        "con_intercambiable": "Int64",
-        "con_incidencia": "string",
-        "buq_nombre": "string",
-        "capacidad_pasajeros": "Int64",
-        "capacidad_vehiculos": "Int64"
-    }
-    
-    df = pd.read_csv(input_path, dtype=dtype_especifico, low_memory=False)
-    
-    df["con_fecha"] = pd.to_datetime(df["con_fecha"], errors="coerce")
-    df["con_dateticket"] = pd.to_datetime(df["con_dateticket"], errors="coerce")
-    
-    df.loc[:, "con_desembarcado"] = df["con_incidencia"].fillna("").eq("DESEMBARCADO").astype(int)
-    df.drop(columns=["con_incidencia"], inplace=True)
-    df = df.query("con_desembarcado != 1")
-    
+    codigos, salidas = pd.factorize(df['con_bacoope'])
+    con_salida = codigos >= 0
+    for columna, tipos in [('total_pasajeros', TIPOS_PASAJEROS), ('total_vehiculos', TIPOS_VEHICULOS)]:
+        marca = df['con_tipobillete'].isin(tipos).to_numpy()
+        conteo = np.bincount(codigos[con_salida], weights=marca[con_salida], minlength=len(salidas)).astype('int64')
+        if con_salida.all():
+            df[columna] = conteo[codigos]
+        else:
+            df[columna] = np.where(con_salida, conteo[codigos], np.nan)
+    return df
+
+
+#Filas por bloque del modo por bloques (vacio: todo en memoria)
+PREPROCESSING_CHUNK_SIZE = int(os.getenv("PREPROCESSING_CHUNK_SIZE", "0")) or None
+
+
+def columnas_lectura(input_path: str) -> list:
+    #Entrada de la etapa mas las columnas de deduplicacion que tenga el raw (con_clave, clave_billete)
+    presentes = raw_columns(input_path)
+    return COLUMNAS_ENTRADA + [col for col in COLUMNAS_DEDUPLICACION if col in presentes]
+
+
+def limpiar_billetes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filtros por fila previos a la deduplicacion (no dependen de otras filas):
+    descarta DESEMBARCADO y los tipos de billete excluidos, y añade el año.
+    Los mismos filtros usa el indice de claves (esquema.es_billete_valido)
+    """
+    df = df[es_billete_valido(df)].drop(columns=["con_incidencia"])
     df.loc[:, "anio_embarque"] = df["con_fecha"].dt.year
-    
-    df = df[~df["con_tipobillete"].isin(["4", "M"])]
     df.loc[:, "anio"] = df["con_fecha"].dt.year
-    
-    if 'con_desembarcado' in df.columns:
-        df = df[df['con_desembarcado'] != 1]
-        df = df.drop(columns=['con_desembarcado'])
-   
-    df = df.drop_duplicates(subset=['con_codigo', 'con_cupon', 'con_tipobillete'], keep='last')
-   
-    df.loc[:, "con_fecha"] = pd.to_datetime(df["con_fecha"], errors="coerce")
-    df.loc[:, "con_dateticket"] = pd.to_datetime(df["con_dateticket"], errors="coerce")
+    return df
+
+
+def deduplicar(df: pd.DataFrame, supervivientes=None) -> pd.DataFrame:
+    """
+    Equivale a drop_duplicates(subset=CLAVE_DUPLICADOS, keep='last') sin volver a
+    hashear las tres cadenas:
+    1) Con el indice de claves de la ingesta, semi-join por con_clave
+    2) Si no, duplicados sobre la clave de 64 bits guardada en el raw (o calculada
+       aqui si el raw es anterior a guardarla)
+    Las columnas de deduplicacion no pasan a la salida.
+    """
+    if supervivientes is not None:
+        df = df[df["con_clave"].isin(supervivientes)]
+    else:
+        clave = df[COLUMNA_CLAVE] if COLUMNA_CLAVE in df.columns else pd.Series(clave_billete(df), index=df.index)
+        df = df[~clave.duplicated(keep="last")]
+    return df.drop(columns=[col for col in COLUMNAS_DEDUPLICACION if col in df.columns])
+
+
+def completar_billetes(df: pd.DataFrame, totales: pd.DataFrame = None, totales_float: bool = False) -> pd.DataFrame:
+    """
+    Caracteristicas de los billetes ya deduplicados. Los totales por salida se
+    calculan sobre df o, en el modo por bloques, se toman de 'totales'
+    (indexado por con_bacoope, calculado en la primera pasada)
+    """
     df.loc[:, "diferencia_min"] = (df["con_fecha"] - df["con_dateticket"]).dt.total_seconds() / 60
     
-    df_copy = df.copy()
-   
-    df_copy.loc[df_copy['buq_nombre'] == "AL ANDALUS EXPRESS", 'capacidad_pasajeros'] = 215
-    df_copy.loc[df_copy['buq_nombre'] == "AL ANDALUS EXPRESS", 'capacidad_vehiculos'] = 150
-    df_copy.loc[df_copy['buq_nombre'] == "CECILIA PAYNE", 'capacidad_pasajeros'] = 800
-    df_copy.loc[df_copy['buq_nombre'] == "CECILIA PAYNE", 'capacidad_vehiculos'] = 200
-    df_copy.loc[df_copy['buq_nombre'] == "HELLENIC HIGHSPEED", 'capacidad_pasajeros'] = 727
-    df_copy.loc[df_copy['buq_nombre'] == "HELLENIC HIGHSPEED", 'capacidad_vehiculos'] = 175
-    df_copy.loc[df_copy['buq_nombre'] == "JAUME I", 'capacidad_pasajeros'] = 655
-    df_copy.loc[df_copy['buq_nombre'] == "JAUME I", 'capacidad_vehiculos'] = 144
-    df_copy.loc[df_copy['buq_nombre'] == "KATTEGAT", 'capacidad_pasajeros'] = 974
-    df_copy.loc[df_copy['buq_nombre'] == "KATTEGAT", 'capacidad_vehiculos'] = 344
-    df_copy.loc[df_copy['buq_nombre'] == "LEVANTE JET", 'capacidad_pasajeros'] = 675
-    df_copy.loc[df_copy['buq_nombre'] == "LEVANTE JET", 'capacidad_vehiculos'] = 151
-    df_copy.loc[df_copy['buq_nombre'] == "NISSOS CHIOS", 'capacidad_pasajeros'] = 1750
-    df_copy.loc[df_copy['buq_nombre'] == "NISSOS CHIOS", 'capacidad_vehiculos'] = 425
-    df_copy.loc[df_copy['buq_nombre'] == "PATRIA SEAWAYS", 'capacidad_pasajeros'] = 260
-    df_copy.loc[df_copy['buq_nombre'] == "PATRIA SEAWAYS", 'capacidad_vehiculos'] = 480
-    df_copy.loc[df_copy['buq_nombre'] == "STENA EUROPE", 'capacidad_pasajeros'] = 1386
-    df_copy.loc[df_copy['buq_nombre'] == "STENA EUROPE", 'capacidad_vehiculos'] = 564
-    df_copy.loc[df_copy['buq_nombre'] == "TARIFA JET", 'capacidad_pasajeros'] = 800
-    df_copy.loc[df_copy['buq_nombre'] == "TARIFA JET", 'capacidad_vehiculos'] = 175
-    df_copy.loc[df_copy['buq_nombre'] == "VOLCAN DE TAMASITE", 'capacidad_pasajeros'] = 1500
-    df_copy.loc[df_copy['buq_nombre'] == "VOLCAN DE TAMASITE", 'capacidad_vehiculos'] = 300
-    df_copy.loc[df_copy['buq_nombre'] == "VOLCAN DE TAUCE", 'capacidad_pasajeros'] = 347
-    df_copy.loc[df_copy['buq_nombre'] == "VOLCAN DE TAUCE", 'capacidad_vehiculos'] = 320
-    df_copy.loc[df_copy['buq_nombre'] == "WASA EXPRESS", 'capacidad_pasajeros'] = 1500
-    df_copy.loc[df_copy['buq_nombre'] == "WASA EXPRESS", 'capacidad_vehiculos'] = 450
-    
-    tipos_pasajeros = ['1', '2', '3']
-    tipos_vehiculos = ['0', '5', '6', '7', '8', '9']
+    #Capacidades segun el registro de buques (un unico join)
+    df_copy = asignar_capacidades(df.copy())
     
-    totales = df_copy.groupby('con_bacoope').apply(lambda grupo: pd.Series({
-        'total_pasajeros': grupo['con_tipobillete'].isin(tipos_pasajeros).sum(),
-        'total_vehiculos': grupo['con_tipobillete'].isin(tipos_vehiculos).sum()
-    })).reset_index()
-    
-    df_copy = pd.merge(df_copy, totales, on='con_bacoope', how='left')
+    if totales is None:
+        df_copy = totales_por_salida(df_copy)
+    else:
+        filas = totales.reindex(df_copy['con_bacoope'].to_numpy())
+        for columna in ['total_pasajeros', 'total_vehiculos']:
+            valores = filas[columna].to_numpy()
+            df_copy[columna] = valores.astype('float64') if totales_float else valores.astype('int64')
     df_copy['porc_ocupacion_pasajeros'] = (df_copy['total_pasajeros'] / df_copy['capacidad_pasajeros']) * 100
     df_copy['porc_ocupacion_vehiculos'] = (df_copy['total_vehiculos'] / df_copy['capacidad_vehiculos']) * 100
     
-    df_copy.loc[:, "con_fecha"] = pd.to_datetime(df_copy["con_fecha"], errors="coerce")
-    df_copy.loc[:, "day_of_week"] = df_copy["con_fecha"].dt.dayofweek + 1
-    df_copy.loc[:, "is_weekend"] = df_copy["day_of_week"].isin([6, 7]).astype(int)
-    df_copy.loc[:, "month"] = df_copy["con_fecha"].dt.month
-    df_copy.loc[:, "week_of_year"] = df_copy["con_fecha"].dt.isocalendar().week.astype(int)
-    
-    conditions = [
-        df_copy["month"].isin([12, 1, 2]),   # Invierno
-        df_copy["month"].isin([3, 4, 5]),    # Primavera
-        df_copy["month"].isin([6, 7, 8]),    # Verano
-        df_copy["month"].isin([9, 10, 11])   # Otoño
-    ]
-    choices = [1, 2, 3, 4]
-    df_copy.loc[:, "season"] = np.select(conditions, choices, default=np.nan).astype(int)
+    #Dia de la semana, estacion, festivos y ventanas de Eid: un join con la dimension calendario
+    df_copy = unir_calendario(df_copy, "con_fecha")
     
-    #Festivos nacionales
-    festivos_nacionales = pd.to_datetime([
-        "2022-01-01",  # Año Nuevo
-        "2022-01-06",  # Epifanía del Señor (Reyes)
-        "2022-04-15",  # Viernes Santo
-        "2022-08-15",  # Asunción de la Virgen
-        "2022-10-12",  # Fiesta Nacional de España
-        "2022-11-01",  # Todos los Santos
-        "2022-12-06",  # Día de la Constitución Española
-        "2022-12-08",  # Inmaculada Concepción
-        "2022-12-25",  # Natividad del Señor (Navidad)
-        "2023-01-06",  # Epifanía del Señor (Reyes)
-        "2023-04-07",  # Viernes Santo
-        "2023-05-01",  # Día del Trabajo
-        "2023-08-15",  # Asunción de la Virgen
-        "2023-10-12",  # Fiesta Nacional de España
-        "2023-11-01",  # Todos los Santos
-        "2023-12-06",  # Día de la Constitución Española
-        "2023-12-08",  # Inmaculada Concepción
-        "2023-12-25",  # Natividad del Señor (Navidad)
-        "2024-01-01",  # Año Nuevo
-        "2024-01-06",  # Epifanía del Señor (Reyes)
-        "2024-03-29",  # Viernes Santo
-        "2024-05-01",  # Día del Trabajo
-        "2024-08-15",  # Asunción de la Virgen
-        "2024-10-12",  # Fiesta Nacional de España
-        "2024-11-01",  # Todos los Santos
-        "2024-12-06",  # Día de la Constitución Española
-        "2024-12-25",  # Natividad del Señor (Navidad)
-    ])
-    
-    #Festivos locales en Algeciras
-    festivos_locales = pd.to_datetime([
-        "2022-02-28",  # Dia de Andalucia
-        "2022-04-14",  # Jueves Santo
-        "2022-05-02",  # Lunes siguiente al día del Trabajo
-        "2022-06-22",  # Feria Real de Algeciras
-        "2022-07-18",  # Festividad de Nuestra Señora del Carmen
-        "2022-12-26",  # Lunes siguiente a Navidad
-        "2023-01-02",  # Día siguiente a Año Nuevo
-        "2023-02-28",  # Día de Andalucía
-        "2023-04-06",  # Jueves Santo
-        "2023-06-21",  # Miércoles de la Feria Real de Algeciras
-        "2023-07-17",  # Lunes posterior a la Festividad de Nuestra Señora del Carmen.​
-        "2024-02-28",  # Día de Andalucía
-        "2024-03-28",  # Jueves Santo
-        "2024-06-26",  # Miércoles de Feria Real de Algeciras
-        "2024-07-16",  # Festividad de Nuestra Señora del Carmen
-        "2024-12-09",  # Lunes siguiente a la Inmaculada Concepción
-    ])
-    
-    festivos_nacionales_set = set(festivos_nacionales)
-    festivos_locales_set = set(festivos_locales)
-    
-    df_copy.loc[:, "fecha_sin_hora"] = df_copy["con_fecha"].dt.normalize()
-    
-    df_copy.loc[:, "is_festivo_nacional"] = df_copy["fecha_sin_hora"].isin(festivos_nacionales_set).astype(int)
-    df_copy.loc[:, "is_festivo_local"] = df_copy["fecha_sin_hora"].isin(festivos_locales_set).astype(int)
-    
-    #Festivos especiales - Eid al-Adha
-    fechas_eid_aladha = pd.to_datetime([
-        "2022-07-09",
-        "2023-06-28",
-        "2024-06-16"
-    ])
-    set_eid_aladha = set(fechas_eid_aladha)
-    df_copy.loc[:, "is_eid_aladha"] = df_copy["fecha_sin_hora"].isin(set_eid_aladha).astype(int)
-    df_copy.loc[:, "is_eid_aladha_prev"] = df_copy["fecha_sin_hora"].apply(
-        lambda x: any((x >= fecha - pd.Timedelta(days=7)) and (x < fecha) for fecha in fechas_eid_aladha)
-    ).astype(int)
-    df_copy.loc[:, "is_eid_aladha_post"] = df_copy["fecha_sin_hora"].apply(
-        lambda x: any((x > fecha) and (x <= fecha + pd.Timedelta(days=7)) for fecha in fechas_eid_aladha)
-    ).astype(int)
-    
-    #Festivos especiales - Eid al-Fitr
-    fechas_eid_alfitr = pd.to_datetime([
-        "2022-05-02",
-        "2023-04-21",
-        "2024-04-10"
-    ])
-    set_eid_alfitr = set(fechas_eid_alfitr)
-    df_copy.loc[:, "is_eid_alfitr"] = df_copy["fecha_sin_hora"].isin(set_eid_alfitr).astype(int)
-    df_copy.loc[:, "is_eid_alfitr_prev"] = df_copy["fecha_sin_hora"].apply(
-        lambda x: any((x >= fecha - pd.Timedelta(days=7)) and (x < fecha) for fecha in fechas_eid_alfitr)
-    ).astype(int)
-    df_copy.loc[:, "is_eid_alfitr_post"] = df_copy["fecha_sin_hora"].apply(
-        lambda x: any((x > fecha) and (x <= fecha + pd.Timedelta(days=7)) for fecha in fechas_eid_alfitr)
-    ).astype(int)
-    
-    #Festivos especiales - Mawlid Nabi
-    fechas_mawlid_nabi = pd.to_datetime([
-        "2022-10-08",
-        "2023-09-27",
-        "2024-09-15"
-    ])
-    set_mawlid_nabi = set(fechas_mawlid_nabi)
-    df_copy.loc[:, "is_mawlid_nabi"] = df_copy["fecha_sin_hora"].isin(set_mawlid_nabi).astype(int)
-    
-    df_copy.drop(columns=["fecha_sin_hora"], inplace=True)
-    
-    df_copy.loc[:, 'con_fecha'] = pd.to_datetime(df_copy['con_fecha'], errors='coerce') 
     df_copy.loc[:, 'hora_embarque'] = df_copy['con_fecha'].dt.hour.astype('int')
     
-    df_copy.loc[:, 'agrupacion_billete'] = np.where(df_copy['con_tipobillete'].isin([0, 5, 6, 7, 8, 9]), 0,  
-                               np.where(df_copy['con_tipobillete'].isin([1, 2, 3]), 1, 2))
+    df_copy.loc[:, 'agrupacion_billete'] = np.where(df_copy['con_tipobillete'].isin(TIPOS_VEHICULOS), 0,  
+                               np.where(df_copy['con_tipobillete'].isin(TIPOS_PASAJEROS), 1, 2))
+    #Indicadores y componentes de fecha en tipos compactos (mismos valores en el CSV)
+    return compactar(df_copy)
+
+
+def leer_bloques(input_path: str, chunksize: int):
+    #Bloques raw tipados segun el esquema y ya filtrados por fila
+    columnas = columnas_lectura(input_path)
+    for bloque in iter_raw_dataset(input_path, columns=columnas, chunksize=chunksize,
+                                   dtype=dtypes_lectura(columnas)):
+        yield limpiar_billetes(aplicar_esquema(bloque))
+
+
+def bloques_01(input_path: str, chunksize: int):
+    """
+    Variante de preprocessing_01 con memoria acotada por chunksize, en dos pasadas:
+    1) Primera pasada: por cada fila filtrada guarda solo si sobrevive segun el
+       indice de claves (o su clave de 64 bits), su salida y su clase de billete.
+       Con ello se marcan las filas que sobreviven a drop_duplicates(keep='last')
+       y se calculan los totales por salida
+    2) Segunda pasada: relee los bloques, conserva los supervivientes, añade las
+       caracteristicas por fila y devuelve cada bloque procesado
+    La concatenacion de los bloques es identica al resultado en memoria. Si no
+    sobrevive ninguna fila se devuelve un unico bloque vacio (la salida lleva cabecera).
+    """
+    #PRIMERA PASADA: supervivencia (o clave de duplicado), salida y clase de cada fila filtrada
+    supervivientes = leer_supervivientes(input_path)
+    claves, salidas, clases = [], [], []
+    for df in leer_bloques(input_path, chunksize):
+        if supervivientes is not None:
+            claves.append(df["con_clave"].isin(supervivientes).to_numpy(dtype=bool))
+        else:
+            claves.append(df[COLUMNA_CLAVE].to_numpy() if COLUMNA_CLAVE in df.columns else clave_billete(df))
+        salidas.append(df["con_bacoope"].fillna(-1).to_numpy(dtype="int64"))
+        clases.append(np.where(df["con_tipobillete"].isin(TIPOS_PASAJEROS), 1,
+                               np.where(df["con_tipobillete"].isin(TIPOS_VEHICULOS), 2, 0)).astype("int8"))
+    if supervivientes is not None:
+        sobrevive = np.concatenate(claves)
+    else:
+        sobrevive = ~pd.Series(np.concatenate(claves)).duplicated(keep="last").to_numpy()
+    del claves
+    salidas = np.concatenate(salidas)[sobrevive]
+    clases = np.concatenate(clases)[sobrevive]
+
+    con_salida = salidas >= 0
+    totales = pd.DataFrame({
+        "con_bacoope": salidas[con_salida],
+        "total_pasajeros": (clases[con_salida] == 1).astype("int64"),
+        "total_vehiculos": (clases[con_salida] == 2).astype("int64"),
+    }).groupby("con_bacoope").sum()
+    totales_float = not con_salida.all()
+    logging.info(f"Primera pasada: {len(sobrevive)} filas, {int(sobrevive.sum())} tras deduplicar, {len(totales)} salidas")
+
+    #SEGUNDA PASADA: caracteristicas por fila, bloque a bloque
+    inicio, vacio = 0, None
+    for df in leer_bloques(input_path, chunksize):
+        fin = inicio + len(df)
+        df = df[sobrevive[inicio:fin]].drop(columns=[col for col in COLUMNAS_DEDUPLICACION if col in df.columns])
+        inicio = fin
+        if not df.empty:
+            yield completar_billetes(df, totales, totales_float)
+        elif vacio is None:
+            vacio = df
+    #Sin supervivientes: un bloque vacio con las columnas de salida, como el modo en memoria
+    if not sobrevive.any() and vacio is not None:
+        yield completar_billetes(vacio, totales, totales_float)
+
+
+def escribir_bloque(df: pd.DataFrame, output_path: str, primero: bool) -> None:
+    #Escritura incremental del CSV de salida (cabecera solo en el primer bloque)
+    if primero:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    df.to_csv(output_path, index=False, mode="w" if primero else "a", header=primero,
+              date_format=FORMATO_FECHA_HORA)
+
+
+def transformar_01(df: pd.DataFrame, supervivientes=None) -> pd.DataFrame:
+    #Limpieza, deduplicacion (ver deduplicar) y caracteristicas sobre el dataset raw ya tipado
+    df = limpiar_billetes(df)
+   
+    df = deduplicar(df, supervivientes)
+   
+    return completar_billetes(df)
+
+
+def preprocessing_01(input_path: str = RAW_DATASET_PATH, 
+                    output_path: str = "data/processed/dataset_empresa_03_pos_EDA_1.csv",
+                    chunksize: int = PREPROCESSING_CHUNK_SIZE) -> str:
+    """
+    Realiza la primera fase de preprocesamiento de datos:
+    1) Carga los datos (dataset Parquet particionado o CSV raw)
+    2) Limpia y transforma los datos
+    3) Añade características temporales y de ocupación
+    4) Registra el dataset resultante en MLflow
+    Con chunksize se procesa por bloques en dos pasadas (ver bloques_01)
+    """
+    if chunksize:
+        escritas = 0
+        #Si no sobrevive ninguna fila, bloques_01 da un bloque vacio: se escribe solo la cabecera
+        for df in bloques_01(input_path, chunksize):
+            escribir_bloque(df, output_path, primero=(escritas == 0))
+            escritas += len(df)
+        logging.info(f"Segunda pasada: {escritas} filas escritas en {output_path}")
+        return output_path
+
+    #Lectura y tipado unico segun el esquema (fechas con formato exacto, categoricas)
+    columnas = columnas_lectura(input_path)
+    df = read_raw_dataset(input_path, columns=columnas, dtype=dtypes_lectura(columnas))
+    df_copy = transformar_01(aplicar_esquema(df), leer_supervivientes(input_path))
    
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df_copy.to_csv(output_path, index=False)
+    escribir_bloque(df_copy, output_path, primero=True)
     
     return output_path
 
 
-def run_preprocessing_01(input_path: str = "data/raw/dataset_empresa_03.csv",
-                       output_path: str = "data/processed/dataset_empresa_03_pos_EDA_1.csv") -> str:
+def run_preprocessing_01(input_path: str = RAW_DATASET_PATH,
+                       output_path: str = "data/processed/dataset_empresa_03_pos_EDA_1.csv",
+                       chunksize: int = PREPROCESSING_CHUNK_SIZE) -> str:
     """
     Funcion principal para ejecutar el preprocesamiento y registrar en MLflow.
     
@@ -245,20 +236,22 @@ def run_preprocessing_01(input_path: str = "data/raw/dataset_empresa_03.csv",
     
     #Iniciar un run para registrar artefactos
     with mlflow.start_run(run_name="Preprocessing_01_Run"):
-        processed_path = preprocessing_01(input_path, output_path)
+        processed_path = preprocessing_01(input_path, output_path, chunksize)
         
-        #Leer para obtener información y metricas
-        df_processed = pd.read_csv(processed_path)
+        #Contar filas sin cargar el resultado completo en memoria
+        filas = sum(len(bloque) for bloque in pd.read_csv(processed_path, usecols=[0], chunksize=1_000_000))
         
         #Registrar metricas y parametros
-        mlflow.log_metric("rows_after_preprocessing", len(df_processed))
+        mlflow.log_metric("rows_after_preprocessing", filas)
+        mlflow.log_param("chunksize", chunksize)
         mlflow.log_param("input_dataset", input_path)
         mlflow.log_param("output_dataset", output_path)
         
-        #Registrar CSV en MLflow
-        mlflow.log_artifact(processed_path, artifact_path="processed_data")
+        #Registrar CSV en MLflow (comprimido y en segundo plano)
+        encolar_artefacto(processed_path, artifact_path="processed_data")
         
     return processed_path
 
 if __name__ == "__main__":
-    run_preprocessing_01()
\ No newline at end of file
+    run_preprocessing_01()
+    esperar_subidas()
\ No newline at end of file
@@ -0,0 +1,199 @@
+# pipeline/raw_store.py
+
+import os
+import glob
+import shutil
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+#Dataset raw en Parquet particionado por año y mes (estilo hive: anio=2024/mes=05)
+RAW_DATASET_PATH = "data/raw/dataset_empresa_03"
+
+#Tipos Arrow de las columnas raw. Las cadenas de baja cardinalidad se guardan
+#codificadas como diccionario y las fechas como timestamp
+STRING = pa.string()
+DICCIONARIO = pa.dictionary(pa.int32(), pa.string())
+ENTERO = pa.int64()
+FECHA = pa.timestamp("us")
+
+TIPOS_RAW = {
+    "con_clave": ENTERO,
+    "con_bacoope": ENTERO,
+    "con_fecha": FECHA,
+    "con_tipo": DICCIONARIO,
+    "con_codigo": STRING,
+    "con_naviera": DICCIONARIO,
+    "con_dni": STRING,
+    "con_tipobillete": DICCIONARIO,
+    "con_cupon": STRING,
+    "con_trayecto": DICCIONARIO,
+    "con_shortcomp": STRING,
+    "con_dateticket": FECHA,
+    "con_acredita": STRING,
+    "con_nombre": STRING,
+    "con_intercambiable": ENTERO,
+    "con_incidencia": DICCIONARIO,
+    "buq_nombre": DICCIONARIO,
+    "capacidad_pasajeros": ENTERO,
+    "capacidad_vehiculos": ENTERO,
+    #Hash de 64 bits de la clave de duplicados (esquema.clave_billete), calculado en la ingesta
+    "clave_billete": ENTERO,
+}
+
+PARTICIONADO = ds.partitioning(pa.schema([("anio", pa.string()), ("mes", pa.string())]), flavor="hive")
+COLUMNAS_PARTICION = ["anio", "mes"]
+
+
+def is_parquet_store(path: str) -> bool:
+    return not path.lower().endswith(".csv")
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convierte un bloque de filas raw en una tabla Arrow tipada:
+    1) Fechas a timestamp, enteros a int64, cadenas a string o diccionario
+    2) Añade las columnas de particion anio/mes a partir de con_fecha
+    """
+    arrays, campos = [], []
+    for col in df.columns:
+        tipo = TIPOS_RAW.get(col)
+        serie = df[col]
+        if tipo == FECHA:
+            arr = pa.array(pd.to_datetime(serie, errors="coerce"), type=FECHA, from_pandas=True)
+        elif tipo == ENTERO:
+            arr = pa.array(pd.to_numeric(serie, errors="coerce").astype("Int64"), type=ENTERO, from_pandas=True)
+        elif tipo in (STRING, DICCIONARIO):
+            arr = pa.array(serie.astype("string"), type=STRING, from_pandas=True)
+            if tipo == DICCIONARIO:
+                arr = arr.dictionary_encode()
+        else:
+            arr = pa.array(serie, from_pandas=True)
+        arrays.append(arr)
+        campos.append(pa.field(col, arr.type))
+
+    fechas = pd.to_datetime(df["con_fecha"], errors="coerce")
+    arrays.append(pa.array(fechas.dt.strftime("%Y").fillna("0000"), type=pa.string()))
+    arrays.append(pa.array(fechas.dt.strftime("%m").fillna("00"), type=pa.string()))
+    campos += [pa.field("anio", pa.string()), pa.field("mes", pa.string())]
+    return pa.Table.from_arrays(arrays, schema=pa.schema(campos))
+
+
+def write_raw_dataset(df: pd.DataFrame, path: str = RAW_DATASET_PATH, prefijo: str = "base-000000",
+                      overwrite: bool = False) -> None:
+    """
+    Escribe filas raw en el dataset particionado. Cada escritura genera ficheros
+    '<prefijo>-<i>.parquet' en las particiones afectadas, de modo que el orden
+    alfabetico de los ficheros respeta el orden de ingesta.
+    """
+    if overwrite and os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path, exist_ok=True)
+    if df.empty:
+        return
+    ds.write_dataset(
+        to_arrow_table(df),
+        path,
+        format="parquet",
+        partitioning=PARTICIONADO,
+        basename_template=f"{prefijo}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+
+
+def list_raw_files(path: str = RAW_DATASET_PATH, years=None, months=None) -> list:
+    """
+    Ficheros del dataset en orden cronologico (anio, mes) y de ingesta,
+    descartando las particiones que no se piden
+    """
+    ficheros = sorted(glob.glob(os.path.join(path, "anio=*", "mes=*", "*.parquet")))
+    if years is not None:
+        anios = {f"anio={int(y)}" for y in years}
+        ficheros = [f for f in ficheros if os.path.basename(os.path.dirname(os.path.dirname(f))) in anios]
+    if months is not None:
+        meses = {f"mes={int(m):02d}" for m in months}
+        ficheros = [f for f in ficheros if os.path.basename(os.path.dirname(f)) in meses]
+    return ficheros
+
+
+def raw_columns(path: str = RAW_DATASET_PATH) -> list:
+    """
+    Columnas presentes en todo el dataset (interseccion de los esquemas de sus
+    ficheros, p.ej. si hay particiones escritas antes de añadir una columna)
+    o en la cabecera del CSV
+    """
+    if not is_parquet_store(path):
+        return list(pd.read_csv(path, nrows=0).columns)
+    ficheros = list_raw_files(path)
+    if not ficheros:
+        raise FileNotFoundError(f"No hay particiones en {path}")
+    esquemas = [pq.read_schema(f).names for f in ficheros]
+    comunes = set.intersection(*(set(nombres) for nombres in esquemas))
+    return [c for c in esquemas[0] if c in comunes and c not in COLUMNAS_PARTICION]
+
+
+def read_raw_dataset(path: str = RAW_DATASET_PATH, columns=None, years=None, months=None,
+                     dtype=None) -> pd.DataFrame:
+    """
+    Lee el dataset raw cargando solo las particiones (años/meses) y columnas pedidas.
+    Admite tambien el CSV raw antiguo (sin poda de particiones).
+    """
+    if not is_parquet_store(path):
+        df = pd.read_csv(path, usecols=columns, dtype=dtype, low_memory=False)
+        if years is not None:
+            df = df[pd.to_datetime(df["con_fecha"], errors="coerce").dt.year.isin(list(years))]
+        return df
+
+    ficheros = list_raw_files(path, years, months)
+    if not ficheros:
+        raise FileNotFoundError(f"No hay particiones en {path} para años={years}, meses={months}")
+    dataset = ds.dataset(ficheros, format="parquet", partitioning=PARTICIONADO, partition_base_dir=path)
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in COLUMNAS_PARTICION]
+    logging.info(f"Leyendo {len(ficheros)} ficheros Parquet de {path} ({len(columns)} columnas)")
+    return dataset.to_table(columns=list(columns)).to_pandas()
+
+
+def iter_raw_dataset(path: str = RAW_DATASET_PATH, columns=None, chunksize: int = 500_000,
+                     dtype=None):
+    """
+    Recorre el dataset raw en bloques de como maximo chunksize filas, en el mismo
+    orden que read_raw_dataset (fichero a fichero en el Parquet, por filas en el CSV)
+    """
+    if not is_parquet_store(path):
+        yield from pd.read_csv(path, usecols=columns, dtype=dtype, low_memory=False, chunksize=chunksize)
+        return
+
+    ficheros = list_raw_files(path)
+    if not ficheros:
+        raise FileNotFoundError(f"No hay particiones en {path}")
+    for fichero in ficheros:
+        parquet = pq.ParquetFile(fichero)
+        columnas = [c for c in (columns or parquet.schema_arrow.names) if c not in COLUMNAS_PARTICION]
+        for lote in parquet.iter_batches(batch_size=chunksize, columns=columnas):
+            yield lote.to_pandas()
+
+
+def compact_raw_dataset(path: str = RAW_DATASET_PATH) -> int:
+    """
+    Compacta cada particion con varios ficheros (base + incrementales) en uno solo,
+    manteniendo el orden de ingesta. Devuelve el numero de particiones compactadas.
+    """
+    compactadas = 0
+    for particion in sorted(glob.glob(os.path.join(path, "anio=*", "mes=*"))):
+        ficheros = sorted(glob.glob(os.path.join(particion, "*.parquet")))
+        if len(ficheros) < 2:
+            continue
+        #promote_options: tolera ficheros escritos con distinta proyeccion de columnas
+        tabla = pa.concat_tables([pq.ParquetFile(f).read() for f in ficheros], promote_options="default")
+        destino = os.path.join(particion, "base-000000-0.parquet.tmp")
+        pq.write_table(tabla, destino)
+        for f in ficheros:
+            os.remove(f)
+        os.replace(destino, os.path.join(particion, "base-000000-0.parquet"))
+        compactadas += 1
+    if compactadas:
+        logging.info(f"Compactadas {compactadas} particiones en {path}")
+    return compactadas
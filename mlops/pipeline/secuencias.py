@@ -0,0 +1,50 @@
+# pipeline/secuencias.py
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+#Ventanas deslizantes para el LSTM sin copiar cada ventana: la matriz de variables se
+#convierte una vez a un array float32 contiguo y las ventanas son vistas con strides
+#sobre ella. Varios lookback y strides comparten la misma matriz; solo se copia lo que
+#se materializa explicitamente (p.ej. un lote)
+
+
+def matriz_float32(df: pd.DataFrame, columnas) -> np.ndarray:
+    #Matriz (dias, variables) contigua en float32, la unica copia de las variables
+    return np.ascontiguousarray(df[list(columnas)].to_numpy(dtype="float32"))
+
+
+def ventanas(matriz: np.ndarray, lookback: int, stride: int = 1) -> np.ndarray:
+    """
+    Vista (n, lookback, variables) de las ventanas que preceden a cada objetivo:
+    la ventana k cubre las filas [i - lookback, i) con i = lookback + k * stride.
+    Es de solo lectura y no ocupa memoria propia.
+    """
+    if lookback < 1 or stride < 1:
+        raise ValueError(f"lookback y stride deben ser >= 1 (lookback={lookback}, stride={stride})")
+    if len(matriz) <= lookback:
+        return np.empty((0, lookback, matriz.shape[1]), dtype=matriz.dtype)
+    #sliding_window_view da (n + 1, 1, lookback, variables); la ultima ventana no tiene objetivo
+    vista = sliding_window_view(matriz, (lookback, matriz.shape[1]))[:-1, 0]
+    return vista[::stride]
+
+
+def objetivos(serie: np.ndarray, lookback: int, stride: int = 1) -> np.ndarray:
+    #Objetivo de cada ventana de ventanas(): la fila siguiente a la ventana
+    return serie[lookback::stride]
+
+
+def ventanas_por_lookback(matriz: np.ndarray, serie: np.ndarray, lookbacks, stride: int = 1) -> dict:
+    """
+    lookback -> (X, y) para varios lookback sobre la misma matriz (p.ej. para
+    comparar configuraciones) sin materializar ninguna ventana
+    """
+    return {lookback: (ventanas(matriz, lookback, stride), objetivos(serie, lookback, stride))
+            for lookback in lookbacks}
+
+
+def memoria_ventanas_mb(X: np.ndarray) -> float:
+    #Memoria que ocupan realmente las ventanas (el tramo de la matriz que recorren), no n * lookback
+    inicio, fin = np.byte_bounds(X)
+    return round((fin - inicio) / 2**20, 1)
@@ -0,0 +1,159 @@
+# pipeline/subida_artefactos.py
+
+import os
+import gzip
+import queue
+import shutil
+import logging
+import threading
+import tempfile
+import mlflow
+from mlflow.tracking import MlflowClient
+
+#Subida de artefactos a MLflow en segundo plano: las etapas encolan y siguen
+#trabajando; un hilo comprime y sube. El flow espera al final con esperar_subidas()
+SUBIDA_ASINCRONA = os.getenv("MLFLOW_ASYNC_UPLOAD", "1") == "1"
+#Extensiones que se comprimen con gzip antes de subir (Parquet ya va comprimido)
+EXTENSIONES_COMPRIMIBLES = (".csv", ".json", ".txt")
+
+_cola = queue.Queue()
+_errores = []
+_lock = threading.Lock()
+_hilo = None
+
+
+def _comprimir(ruta: str, directorio_tmp: str) -> str:
+    destino = os.path.join(directorio_tmp, os.path.basename(ruta) + ".gz")
+    with open(ruta, "rb") as origen, gzip.open(destino, "wb", compresslevel=6) as salida:
+        shutil.copyfileobj(origen, salida, length=1024 * 1024)
+    return destino
+
+
+def _enlazar_o_copiar(origen: str, destino: str) -> None:
+    #Enlace duro (sin copiar datos) si el sistema de ficheros lo permite; si no, copia
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+
+def _instantanea(ruta: str) -> str:
+    """
+    Copia de la ruta en un directorio temporal propio, para poder subirla aunque el
+    original se modifique o borre despues de encolar (p.ej. al compactar el raw)
+    """
+    directorio = tempfile.mkdtemp(prefix="subida_")
+    destino = os.path.join(directorio, os.path.basename(os.path.normpath(ruta)))
+    if os.path.isdir(ruta):
+        shutil.copytree(ruta, destino, copy_function=_enlazar_o_copiar)
+    else:
+        _enlazar_o_copiar(ruta, destino)
+    return destino
+
+
+def _subir(tarea: dict) -> None:
+    """
+    1) Comprime el fichero si procede (en un directorio temporal)
+    2) Sube fichero o directorio (o su instantanea) al run indicado con MlflowClient
+    3) Ejecuta el callback de exito, si lo hay
+    """
+    client = MlflowClient(tracking_uri=tarea["tracking_uri"])
+    ruta = tarea["instantanea"] or tarea["ruta"]
+    with tempfile.TemporaryDirectory() as tmp:
+        if os.path.isdir(ruta):
+            client.log_artifacts(tarea["run_id"], ruta, artifact_path=tarea["artifact_path"])
+        else:
+            if tarea["comprimir"] and ruta.lower().endswith(EXTENSIONES_COMPRIMIBLES):
+                ruta = _comprimir(ruta, tmp)
+            client.log_artifact(tarea["run_id"], ruta, artifact_path=tarea["artifact_path"])
+    if tarea["al_completar"] is not None:
+        tarea["al_completar"]()
+    logging.info(f"Artefacto subido: {tarea['ruta']} -> {tarea['artifact_path']} (run {tarea['run_id']})")
+
+
+def _trabajador() -> None:
+    while True:
+        tarea = _cola.get()
+        try:
+            _subir(tarea)
+        except Exception as e:
+            #Los fallos se acumulan y se lanzan en esperar_subidas()
+            logging.error(f"Error subiendo {tarea['ruta']} a MLflow: {str(e)}")
+            with _lock:
+                _errores.append((tarea["ruta"], e))
+        finally:
+            if tarea["instantanea"] is not None:
+                shutil.rmtree(os.path.dirname(tarea["instantanea"]), ignore_errors=True)
+            _cola.task_done()
+
+
+def _arrancar_hilo() -> None:
+    global _hilo
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_trabajador, name="subida_artefactos", daemon=True)
+            _hilo.start()
+
+
+def encolar_artefacto(ruta: str, artifact_path: str = None, run_id: str = None,
+                      comprimir: bool = True, al_completar=None, copiar: bool = False) -> None:
+    """
+    Encola la subida de un fichero o directorio al run activo (o a run_id).
+    La ruta no debe modificarse hasta que termine esperar_subidas(), salvo con
+    copiar=True: se encola una instantanea (enlaces duros o copia) que el hilo
+    borra tras subirla, y el original se puede modificar o borrar enseguida.
+    al_completar: funcion sin argumentos que se ejecuta solo si la subida va bien.
+    """
+    if run_id is None:
+        run_id = mlflow.active_run().info.run_id
+    tarea = {
+        "ruta": ruta,
+        "artifact_path": artifact_path,
+        "run_id": run_id,
+        "tracking_uri": mlflow.get_tracking_uri(),
+        "comprimir": comprimir,
+        "al_completar": al_completar,
+        "instantanea": None,
+    }
+    if not SUBIDA_ASINCRONA:
+        _subir(tarea)
+        return
+    if copiar:
+        tarea["instantanea"] = _instantanea(ruta)
+    _arrancar_hilo()
+    _cola.put(tarea)
+    logging.info(f"Subida encolada: {ruta} -> {artifact_path} ({_cola.qsize()} pendientes)")
+
+
+def esperar_subidas() -> None:
+    """
+    Bloquea hasta que terminan todas las subidas pendientes.
+    Si alguna ha fallado, lanza RuntimeError con el detalle.
+    """
+    if _cola.unfinished_tasks:
+        logging.info(f"Esperando {_cola.unfinished_tasks} subidas pendientes a MLflow...")
+    _cola.join()
+    with _lock:
+        fallos = list(_errores)
+        _errores.clear()
+    if fallos:
+        detalle = "; ".join(f"{ruta}: {error}" for ruta, error in fallos)
+        raise RuntimeError(f"Fallaron {len(fallos)} subidas de artefactos a MLflow: {detalle}")
+
+
+if __name__ == "__main__":
+    #Comprobacion contra un MLflow local en fichero (sin servidor)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    directorio = tempfile.mkdtemp()
+    mlflow.set_tracking_uri(f"file:{os.path.join(directorio, 'mlruns')}")
+    fichero = os.path.join(directorio, "prueba.csv")
+    with open(fichero, "w", encoding="utf-8") as f:
+        f.write("a,b\n" + "1,2\n" * 10000)
+
+    with mlflow.start_run(run_name="Prueba_Subida") as run:
+        encolar_artefacto(fichero, artifact_path="prueba")
+    esperar_subidas()
+
+    subidos = [a.path for a in MlflowClient().list_artifacts(run.info.run_id, "prueba")]
+    print(f"Artefactos en el run {run.info.run_id}: {subidos}")
+    shutil.rmtree(directorio)
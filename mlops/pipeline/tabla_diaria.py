@@ -0,0 +1,80 @@
+# pipeline/tabla_diaria.py
+
+import os
+import logging
+import pandas as pd
+from esquema import COLUMNAS_POR_ETAPA, compactar, columnas_tabla, leer_tabla
+from calendario import COLUMNAS_DIA
+from features import calcular_features
+
+#Tabla diaria de entrenamiento: una fila por dia con las variables del modelo y los
+#dos targets. La materializa el preprocesamiento y el entrenamiento la lee directamente
+#(~1.100 filas) en lugar de releer y agregar el dataset por billete
+TABLA_DIARIA_PATH = os.getenv("TABLA_DIARIA_PATH", "data/processed/dataset_diario.parquet")
+
+#Variables del modelo (las de entrenamiento sin la fecha ni la clase de billete)
+COLUMNAS_FEATURES = [c for c in COLUMNAS_POR_ETAPA["training"] if c not in ("fecha_embarque", "tipo_agrupacion")]
+#Target -> valor de tipo_agrupacion que cuenta
+TARGETS = {"total_pasajeros": 1, "total_vehiculos": 0}
+
+#Tabla por salida (opcional): una fila por con_bacoope con su ocupacion
+COLUMNAS_SALIDA = [
+    "con_bacoope", "con_fecha", "buq_nombre", "capacidad_pasajeros", "capacidad_vehiculos",
+    "total_pasajeros", "total_vehiculos", "porc_ocupacion_pasajeros", "porc_ocupacion_vehiculos"
+] + COLUMNAS_DIA + ["hora_embarque"]
+
+
+def agregar_dias(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agregado parcial por fecha_embarque sobre filas por billete (salida de preprocessing_02):
+    las variables de la primera fila de cada dia (mismo criterio que drop_duplicates en
+    el entrenamiento) y el numero de billetes de cada target
+    """
+    dias = df.drop_duplicates("fecha_embarque").set_index("fecha_embarque")[COLUMNAS_FEATURES]
+    conteos = df.groupby(["fecha_embarque", "tipo_agrupacion"]).size().unstack(fill_value=0)
+    for target, tipo in TARGETS.items():
+        dias[target] = conteos[tipo].reindex(dias.index, fill_value=0) if tipo in conteos else 0
+    return dias.reset_index()
+
+
+def completar_dias(dias: pd.DataFrame) -> pd.DataFrame:
+    """
+    Serie diaria continua entre el primer y el ultimo dia: los dias sin billetes
+    toman las variables del dia anterior (0 si no hay) y target 0
+    """
+    dias = dias.dropna(subset=["fecha_embarque"]).set_index("fecha_embarque").sort_index()
+    fechas = pd.date_range(start=dias.index.min(), end=dias.index.max(), freq="D")
+    diario = dias.reindex(fechas)
+    for col in COLUMNAS_FEATURES:
+        diario[col] = diario[col].fillna(method="ffill").fillna(0)
+    for target in TARGETS:
+        diario[target] = diario[target].fillna(0).astype("int64")
+    return compactar(diario.rename_axis("fecha_embarque").reset_index())
+
+
+def tabla_diaria(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tabla diaria (variables + targets) a partir de las filas por billete
+    """
+    return completar_dias(agregar_dias(df))
+
+
+def tabla_por_salida(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Una fila por salida (con_bacoope) a partir de la salida de preprocessing_01,
+    con su ocupacion, el calendario y las variables de fecha de features.py
+    """
+    salidas = df.dropna(subset=["con_bacoope"]).drop_duplicates("con_bacoope")
+    salidas = salidas[[c for c in COLUMNAS_SALIDA if c in salidas.columns]].reset_index(drop=True)
+    return compactar(pd.concat([salidas, calcular_features(salidas["con_fecha"])], axis=1))
+
+
+def leer_tabla_diaria(path: str = TABLA_DIARIA_PATH) -> pd.DataFrame:
+    """
+    Lee la tabla diaria (Parquet o CSV). Si path es el dataset por billete de
+    preprocessing_02 (generado antes de existir la tabla) la construye a partir de el
+    """
+    if all(target in columnas_tabla(path) for target in TARGETS):
+        return leer_tabla(path)
+    logging.info(f"{path} es el dataset por billete: se agrega a tabla diaria")
+    return tabla_diaria(leer_tabla(path, COLUMNAS_POR_ETAPA["training"]))
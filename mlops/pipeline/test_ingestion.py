@@ -0,0 +1,119 @@
+# pipeline/test_ingestion.py
+
+import glob
+import sqlite3
+import threading
+import pytest
+import pandas as pd
+import mlflow
+from mlflow.tracking import MlflowClient
+from sqlalchemy import create_engine
+from generador_sintetico import generar
+from preprocessing_01 import preprocessing_01
+import ingestion
+import subida_artefactos
+
+#Pruebas de la ingesta contra una BD SQLite sintetica en lugar de MySQL.
+#Se ejecutan desde pipeline/: python -m pytest -q test_ingestion.py
+
+FILAS = 2_000
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    #BD sintetica, MLflow en fichero y rutas relativas (marca de agua, cache) dentro de tmp_path
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DB_URI", f"sqlite:///{tmp_path / 'contador.db'}")
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", f"file:{tmp_path / 'mlruns'}")
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    generar(FILAS, (2023, 2024), formato="sqlite", ruta=f"sqlite:///{tmp_path / 'contador.db'}")
+    return tmp_path
+
+
+def añadir_filas_nuevas(db: str, desde: str) -> int:
+    #Copia las filas con con_fecha >= desde como filas nuevas (con_clave posterior a la maxima)
+    con = sqlite3.connect(db)
+    maxima = con.execute("SELECT MAX(con_clave) FROM contador").fetchone()[0]
+    columnas = [fila[1] for fila in con.execute("PRAGMA table_info(contador)")]
+    select = ", ".join(f"con_clave + {maxima}" if col == "con_clave" else col for col in columnas)
+    con.execute(f"INSERT INTO contador ({', '.join(columnas)}) SELECT {select} FROM contador WHERE con_fecha >= '{desde}'")
+    con.commit()
+    nuevas = con.execute(f"SELECT COUNT(*) FROM contador WHERE con_clave > {maxima} AND con_cliente = '03'").fetchone()[0]
+    con.close()
+    return nuevas
+
+
+def test_incremental_compacta_con_subidas_pendientes(entorno, monkeypatch):
+    #La compactacion borra los ficheros inc-* mientras su subida sigue en cola: se sube la instantanea
+    salida = str(entorno / "raw")
+    ingestion.ingest_data(output_path=salida, workers=1, usar_cache=False)
+    subida_artefactos.esperar_subidas()
+    assert añadir_filas_nuevas(str(entorno / "contador.db"), "2024-12-01") > 0
+
+    #El hilo de subida no empieza hasta que la ingesta incremental (con compactacion) ha terminado
+    liberar = threading.Event()
+    subir = subida_artefactos._subir
+
+    def subir_tras_compactar(tarea):
+        liberar.wait(timeout=60)
+        subir(tarea)
+
+    monkeypatch.setattr(subida_artefactos, "_subir", subir_tras_compactar)
+    ingestion.ingest_data(output_path=salida, incremental=True, usar_cache=False)
+    assert not glob.glob(str(entorno / "raw" / "anio=*" / "mes=*" / "inc-*.parquet"))
+    liberar.set()
+    subida_artefactos.esperar_subidas()
+
+    run = MlflowClient().search_runs(
+        [mlflow.get_experiment_by_name("Default").experiment_id],
+        filter_string="params.mode = 'incremental'")[0]
+    particiones = [a.path for a in MlflowClient().list_artifacts(run.info.run_id, "raw_data/incremental")]
+    subidos = [f.path for p in particiones for mes in MlflowClient().list_artifacts(run.info.run_id, p)
+               for f in MlflowClient().list_artifacts(run.info.run_id, mes.path)]
+    assert subidos and all(ruta.rsplit("/", 1)[-1].startswith("inc-") for ruta in subidos)
+
+
+def reemitir_cupon(uri: str, dias: int = 3) -> pd.Series:
+    """
+    Reemite un billete valido sin duplicados: copia con con_clave nueva (la mayor de
+    la tabla) y con_fecha 'dias' antes, de modo que el orden por con_clave y el
+    orden por con_fecha no coinciden
+    """
+    engine = create_engine(uri)
+    original = pd.read_sql("""
+        SELECT * FROM contador
+        WHERE con_cliente = '03' AND con_incidencia IS NULL AND con_tipobillete = '1'
+          AND con_fecha >= '2024-06-01'
+          AND (con_codigo, con_cupon, con_tipobillete) IN (
+              SELECT con_codigo, con_cupon, con_tipobillete FROM contador
+              GROUP BY con_codigo, con_cupon, con_tipobillete HAVING COUNT(*) = 1)
+        ORDER BY con_clave LIMIT 1
+    """, engine)
+    maxima = pd.read_sql("SELECT MAX(con_clave) AS maxima FROM contador", engine)["maxima"].iloc[0]
+    reemitido = original.assign(con_clave=maxima + 1,
+                                con_fecha=pd.to_datetime(original["con_fecha"]) - pd.Timedelta(days=dias))
+    reemitido.to_sql("contador", engine, if_exists="append", index=False)
+    engine.dispose()
+    return original.iloc[0]
+
+
+def test_agregados_igual_a_filas_con_cupon_reemitido(entorno):
+    #Los conteos diarios resueltos en la BD coinciden con los de la extraccion por filas +
+    #preprocessing_01, tambien cuando el duplicado con mayor con_clave tiene con_fecha anterior
+    original = reemitir_cupon(f"sqlite:///{entorno / 'contador.db'}")
+    raw = str(entorno / "raw")
+    ingestion.ingest_data(output_path=raw, workers=1, usar_cache=False)
+    subida_artefactos.esperar_subidas()
+    salida_01 = str(entorno / "pos_EDA_1.csv")
+    preprocessing_01(raw, salida_01, None)
+
+    billetes = pd.read_csv(salida_01, usecols=["con_fecha", "agrupacion_billete"], parse_dates=["con_fecha"])
+    filas = (billetes.groupby([billetes["con_fecha"].dt.normalize().rename("fecha_embarque"), "agrupacion_billete"])
+             .size().unstack(fill_value=0)
+             .reindex(columns=[1, 0, 2], fill_value=0))
+    filas.columns = ["total_pasajeros", "total_vehiculos", "total_otros"]
+    agregados = ingestion.generate_aggregates(grain="dia").set_index("fecha_embarque")[filas.columns]
+
+    dia_original = pd.Timestamp(original["con_fecha"]).normalize()
+    assert filas.loc[dia_original, "total_pasajeros"] == agregados.loc[dia_original, "total_pasajeros"]
+    pd.testing.assert_frame_equal(agregados.astype("int64"), filas.astype("int64"), check_names=False)
@@ -0,0 +1,71 @@
+# pipeline/test_preprocessing.py
+
+import os
+import shutil
+import filecmp
+import pytest
+from generador_sintetico import generar
+from raw_store import read_raw_dataset, write_raw_dataset
+from indice_claves import INDICE_CLAVES
+from preprocessing_01 import preprocessing_01
+from preprocessing import preprocessing
+from benchmarks import comparar_csv
+
+#Pruebas de paridad del preprocesamiento sobre datos sinteticos: cada variante
+#optimizada debe dar la misma salida que el modo en memoria.
+#Se ejecutan desde pipeline/: python -m pytest -q test_preprocessing.py
+
+FILAS = 30_000
+CHUNKSIZE = 500
+
+
+@pytest.fixture(scope="module")
+def raw(tmp_path_factory):
+    #Dataset raw particionado con indice de claves, como la ingesta
+    return generar(FILAS, formato="parquet", ruta=str(tmp_path_factory.mktemp("raw") / "raw"))
+
+
+@pytest.fixture(scope="module")
+def raw_sin_indice(raw, tmp_path_factory):
+    #Mismo dataset sin indice de claves: se deduplica por la clave de 64 bits
+    ruta = str(tmp_path_factory.mktemp("raw_sin_indice") / "raw")
+    shutil.copytree(raw, ruta, ignore=shutil.ignore_patterns(INDICE_CLAVES))
+    return ruta
+
+
+@pytest.fixture(scope="module")
+def raw_desembarcado(raw, tmp_path_factory):
+    #Todas las filas DESEMBARCADO: no sobrevive ninguna a los filtros
+    df = read_raw_dataset(raw)
+    df["con_incidencia"] = "DESEMBARCADO"
+    ruta = str(tmp_path_factory.mktemp("raw_desembarcado") / "raw")
+    write_raw_dataset(df, ruta, overwrite=True)
+    return ruta
+
+
+@pytest.mark.parametrize("dataset", ["raw", "raw_sin_indice", "raw_desembarcado"])
+def test_preprocessing_01_bloques_igual_a_memoria(dataset, request, tmp_path):
+    #preprocessing_01 por bloques (dos pasadas) escribe el mismo fichero que en memoria
+    input_path = request.getfixturevalue(dataset)
+    salida_memoria = str(tmp_path / "memoria.csv")
+    salida_bloques = str(tmp_path / "bloques.csv")
+    preprocessing_01(input_path, salida_memoria, None)
+    preprocessing_01(input_path, salida_bloques, CHUNKSIZE)
+
+    assert os.path.exists(salida_bloques)
+    assert comparar_csv(salida_memoria, salida_bloques) == []
+    assert filecmp.cmp(salida_memoria, salida_bloques, shallow=False)
+
+
+@pytest.mark.parametrize("dataset", ["raw", "raw_sin_indice"])
+def test_motor_duckdb_igual_a_pandas(dataset, request, tmp_path):
+    #El motor DuckDB da el mismo checkpoint de preprocessing_01 y la misma salida final que pandas
+    pytest.importorskip("duckdb")
+    input_path = request.getfixturevalue(dataset)
+    rutas = {}
+    for motor in ("pandas", "duckdb"):
+        rutas[motor] = (str(tmp_path / f"{motor}_02.csv"), str(tmp_path / f"{motor}_01.csv"))
+        preprocessing(input_path, rutas[motor][0], rutas[motor][1], None, motor, str(tmp_path / f"{motor}_diario.csv"))
+
+    assert comparar_csv(rutas["pandas"][1], rutas["duckdb"][1]) == []
+    assert comparar_csv(rutas["pandas"][0], rutas["duckdb"][0]) == []
@@ -0,0 +1,110 @@
+# pipeline/vistas_eda.py
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+from esquema import dtypes_lectura, aplicar_esquema, clasificar_billetes
+
+#Vistas de EDA sobre la salida de preprocessing_01 (antes df_festivo, df_rutas y
+#df_prop dentro de preprocessing_02). No las usa el modelo: se calculan solo
+#cuando un informe las pide, cada una una vez y sin bucles por fila
+
+DIAS_SEMANA_ES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+#Orden de prioridad del tipo de festivo de un dia (el primero que aplica)
+TIPOS_FESTIVO = [
+    ("is_eid_aladha", "Eid al-Adha"),
+    ("is_eid_alfitr", "Eid al-Fitr"),
+    ("is_mawlid_nabi", "Mawlid"),
+    ("is_festivo_nacional", "Festivo Nacional"),
+    ("is_festivo_local", "Festivo Local"),
+]
+
+
+def base_eda(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnas comunes a todas las vistas: años, clase de billete, mes y nombre del dia
+    """
+    clase = clasificar_billetes(df["con_tipobillete"])
+    return df.assign(
+        anio_con_fecha=df["con_fecha"].dt.year,
+        anio_con_dateticket=df["con_dateticket"].dt.year,
+        tipo_billete_clasificado=clase,
+        fecha_mensual=df["con_fecha"].dt.to_period("M").dt.to_timestamp(),
+        #day_of_week va de 1 (lunes) a 7 (domingo) (calendario.py: dayofweek + 1). Antes se mapeaba
+        #con range(7): el domingo quedaba sin nombre (NaN) y el resto de dias, desplazados uno
+        nombre_dia=df["day_of_week"].map(dict(zip(range(1, 8), DIAS_SEMANA_ES))),
+    )
+
+
+def tipo_festivo(df: pd.DataFrame) -> np.ndarray:
+    #Tipo de festivo de cada fila segun TIPOS_FESTIVO (None si no es festivo)
+    condiciones = [df[col].fillna(0).to_numpy() == 1 if col in df else np.zeros(len(df), dtype=bool)
+                   for col, _ in TIPOS_FESTIVO]
+    return np.select(condiciones, [nombre for _, nombre in TIPOS_FESTIVO], default=None)
+
+
+def vista_festivos(base: pd.DataFrame) -> pd.DataFrame:
+    return base.assign(tipo_festivo=tipo_festivo(base))
+
+
+def vista_rutas(base: pd.DataFrame) -> pd.DataFrame:
+    return base
+
+
+def vista_proporciones(base: pd.DataFrame) -> pd.DataFrame:
+    return base.assign(categoria_billete=base["tipo_billete_clasificado"])
+
+
+VISTAS_EDA = {
+    "festivos": vista_festivos,
+    "rutas": vista_rutas,
+    "proporciones": vista_proporciones,
+}
+
+
+def vistas_eda(df: pd.DataFrame, nombres=None) -> dict:
+    """
+    Calcula solo las vistas pedidas (todas por defecto):
+    1) Columnas comunes (una vez, y solo si se pide alguna vista)
+    2) Cada vista añade sus columnas sobre la base
+    """
+    nombres = list(nombres or VISTAS_EDA)
+    desconocidas = [n for n in nombres if n not in VISTAS_EDA]
+    if desconocidas:
+        raise ValueError(f"Vistas de EDA desconocidas: {desconocidas} (opciones: {list(VISTAS_EDA)})")
+    if not nombres:
+        return {}
+    base = base_eda(df)
+    return {nombre: VISTAS_EDA[nombre](base) for nombre in nombres}
+
+
+def generar_vistas(input_path: str = "data/processed/dataset_empresa_03_pos_EDA_1.csv",
+                   output_dir: str = "data/processed/eda", nombres=None) -> dict:
+    """
+    Genera las vistas pedidas a partir del CSV de preprocessing_01 (el checkpoint
+    de preprocessing.py) y las guarda en output_dir. Devuelve nombre -> ruta.
+    """
+    df = aplicar_esquema(pd.read_csv(input_path, dtype=dtypes_lectura(), low_memory=False))
+    os.makedirs(output_dir, exist_ok=True)
+    rutas = {}
+    for nombre, vista in vistas_eda(df, nombres).items():
+        rutas[nombre] = os.path.join(output_dir, f"{nombre}.csv")
+        vista.to_csv(rutas[nombre], index=False)
+        logging.info(f"Vista de EDA '{nombre}': {len(vista)} filas en {rutas[nombre]}")
+    return rutas
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vistas de EDA bajo demanda")
+    parser.add_argument("--input", default="data/processed/dataset_empresa_03_pos_EDA_1.csv",
+                        help="Salida de preprocessing_01 (checkpoint de preprocessing.py)")
+    parser.add_argument("--output-dir", default="data/processed/eda")
+    parser.add_argument("--vistas", nargs="*", choices=list(VISTAS_EDA), help="Por defecto, todas")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    generar_vistas(args.input, args.output_dir, args.vistas)
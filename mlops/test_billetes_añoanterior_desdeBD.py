@@ -1,11 +1,18 @@
-import mysql.connector
+import os
 import sys
+import mysql.connector
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline'))
+from esquema import TIPOS_PASAJEROS, TIPOS_VEHICULOS
+
+load_dotenv()
 
-# Parámetros de conexión
-DB_HOST     = 
-DB_USER     = 
-DB_PASSWORD = 
-DB_NAME     = 
+# Parámetros de conexión (mismas variables de entorno que la ingesta)
+DB_HOST     = os.getenv("DB_HOST", "")
+DB_USER     = os.getenv("DB_USER", "")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+DB_NAME     = os.getenv("DB_NAME", "")
 
 def main(fecha_str, cliente='03'):
     try:
@@ -21,10 +28,11 @@ def main(fecha_str, cliente='03'):
 
     cursor = cnx.cursor()
 
-    query = """
+    #Clasificacion de con_tipobillete del esquema compartido con el pipeline
+    query = f"""
     SELECT
-      COALESCE(SUM(CASE WHEN con_tipobillete IN ('1','2','3') THEN 1 ELSE 0 END), 0) AS total_pasajeros,
-      COALESCE(SUM(CASE WHEN con_tipobillete IN ('0','5','6','7','8','9') THEN 1 ELSE 0 END), 0) AS total_vehiculos
+      COALESCE(SUM(CASE WHEN con_tipobillete IN {TIPOS_PASAJEROS} THEN 1 ELSE 0 END), 0) AS total_pasajeros,
+      COALESCE(SUM(CASE WHEN con_tipobillete IN {TIPOS_VEHICULOS} THEN 1 ELSE 0 END), 0) AS total_vehiculos
     FROM contador
     WHERE DATE(con_dateticket) = %s
       AND con_cliente = %s
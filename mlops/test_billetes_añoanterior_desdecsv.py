@@ -1,19 +1,22 @@
+import os
+import sys
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline'))
+from raw_store import RAW_DATASET_PATH, read_raw_dataset
+from esquema import TIPOS_PASAJEROS, TIPOS_VEHICULOS, dtypes_lectura, aplicar_esquema
+
 def main():
  
-    csv_path = 'data/raw/dataset_empresa_03.csv'
- 
-    df = pd.read_csv(
-        csv_path,
-        low_memory=False,
-        dtype={'con_tipobillete': str}
+    #Solo se cargan las dos columnas necesarias del dataset raw, tipadas segun el esquema
+    columnas = ['con_tipobillete', 'con_dateticket']
+    df = read_raw_dataset(
+        RAW_DATASET_PATH,
+        columns=columnas,
+        dtype=dtypes_lectura(columnas)
     )
+    df = aplicar_esquema(df)
     
-    df['con_dateticket'] = pd.to_datetime(
-        df['con_dateticket'],
-        errors='coerce'
-    )
     df = df.dropna(subset=['con_dateticket'])
     df['fecha_ticket'] = df['con_dateticket'].dt.date
     
@@ -21,11 +24,8 @@ def main():
     
     df_fecha = df[df['fecha_ticket'] == fecha_obj]
     
-    pasajeros_vals = ['1', '2', '3']
-    vehiculos_vals = ['0', '5', '6', '7', '8', '9']
-    
-    total_pasajeros = df_fecha['con_tipobillete'].isin(pasajeros_vals).sum()
-    total_vehiculos = df_fecha['con_tipobillete'].isin(vehiculos_vals).sum()
+    total_pasajeros = df_fecha['con_tipobillete'].isin(TIPOS_PASAJEROS).sum()
+    total_vehiculos = df_fecha['con_tipobillete'].isin(TIPOS_VEHICULOS).sum()
     
     print(f"Fecha analizada    : {fecha_obj}")
     print(f"Total pasajeros    : {total_pasajeros}")